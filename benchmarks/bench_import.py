@@ -0,0 +1,55 @@
+"""Import time of library modules, in a fresh interpreter each time"""
+
+import sys
+import subprocess
+
+from .common import SRCDIR
+
+# import time budgets in seconds, about 1.3 times the times measured with numpy 2.4 and
+# matplotlib 3.11 on one machine, checked by run.py --check-imports only
+IMPORT_BUDGET = {
+    'rankAxis':0.2,
+    'distribution':0.2,
+    'jointDistribution':0.2,
+    'condStats':0.2,
+    'regrid':0.2,
+    'plot1D':0.6,
+    'plot1DInvLog':0.6,
+    'plot2D':0.5,
+    'plotCondPDFs':0.6,
+}
+
+# modules that importing the library must not import
+IMPORT_FORBIDDEN = ['matplotlib.pyplot','scipy','matplotlib.backends.backend_agg']
+
+def importTime(module):
+    """Cumulative import time of module (s), from python -X importtime"""
+
+    out = subprocess.run([sys.executable,'-X','importtime','-c','import %s'%module],
+                         cwd=SRCDIR,capture_output=True,text=True,check=True).stderr
+    for line in out.splitlines()[::-1]:
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1])*1e-6
+
+    return float('nan')
+
+def importedModules(module, names=IMPORT_FORBIDDEN):
+    """Modules among names imported by importing module in a fresh interpreter"""
+
+    code = 'import sys, %s; print(",".join(m for m in %r if m in sys.modules))'%(module,list(names))
+    out = subprocess.run([sys.executable,'-c',code],cwd=SRCDIR,capture_output=True,text=True,
+                         check=True).stdout.strip()
+
+    return out.split(',') if out else []
+
+
+class ImportTime:
+
+    params = [list(IMPORT_BUDGET)]
+    param_names = ['module']
+
+    def track_import(self, module):
+        return importTime(module)
+
+    track_import.unit = 'seconds'
@@ -0,0 +1,81 @@
+"""Benchmarks of inverse-log frames and curves in plot1D"""
+
+from .common import newAxes,draw,savefig,rankCurve
+
+import plot1D
+
+
+class SetFrame:
+
+    params = [[2,5,8]]
+    param_names = ['ndecades']
+    number = 1
+    repeat = 3
+
+    def setup(self, ndecades):
+        self.fig, self.ax = newAxes()
+        self.rankmax = 100*(1-10.**-ndecades)
+
+    def time_setFrame(self, ndecades):
+        plot1D.setFrame(self.ax,rankmax=self.rankmax)
+
+    def time_setFrame_draw(self, ndecades):
+        plot1D.setFrame(self.ax,rankmax=self.rankmax)
+        draw(self.fig)
+
+
+class ShowData:
+
+    params = [[10**2,10**4,10**6,10**7]]
+    param_names = ['npoints']
+    number = 1
+    repeat = 3
+
+    def setup(self, npoints):
+        self.fig, self.ax = newAxes()
+        self.ranks, self.values = rankCurve(npoints)
+
+    def time_showData(self, npoints):
+        plot1D.showData(self.ax,self.ranks,self.values,rankmax=99.999)
+
+    def time_showData_draw(self, npoints):
+        plot1D.showData(self.ax,self.ranks,self.values,rankmax=99.999)
+        draw(self.fig)
+
+
+class SubplotRanksILog:
+
+    params = [[1,10,100,500],[False,True]]
+    param_names = ['ncurves','batch']
+    number = 1
+    repeat = 3
+
+    def setup(self, ncurves, batch):
+        self.fig, self.ax = newAxes()
+        ranks, values = rankCurve(500)
+        self.ranks = [ranks]*ncurves
+        self.y = [values+i for i in range(ncurves)]
+        if ncurves == 1:
+            self.ranks, self.y = self.ranks[0], self.y[0]
+
+    def time_subplotRanksILog(self, ncurves, batch):
+        plot1D.subplotRanksILog(self.ax,self.ranks,self.y,batch=batch)
+
+    def time_subplotRanksILog_draw(self, ncurves, batch):
+        plot1D.subplotRanksILog(self.ax,self.ranks,self.y,batch=batch)
+        draw(self.fig)
+
+
+class SubplotRanksILogSavefig:
+
+    params = [[1,10,100,500],[False,True],['png','pdf']]
+    param_names = ['ncurves','batch','format']
+    number = 1
+    repeat = 3
+
+    def setup(self, ncurves, batch, fmt):
+        SubplotRanksILog.setup(self,ncurves,batch)
+
+    def time_subplotRanksILog_savefig(self, ncurves, batch, fmt):
+        plot1D.subplotRanksILog(self.ax,self.ranks,self.y,batch=batch)
+        savefig(self.fig,fmt)
@@ -0,0 +1,127 @@
+"""Benchmarks of joint histograms and smoothed 2D fields in plot2D"""
+
+import numpy as np
+
+from .common import newAxes,draw,savefig
+
+import plot2D
+from rankAxis import invLogToRanks
+
+
+class JointHistogram:
+
+    params = [[100,500,1000,2000]]
+    param_names = ['nbins']
+    number = 1
+    repeat = 3
+
+    def setup(self, nbins):
+        self.fig, self.ax = newAxes(figsize=(6,6))
+        self.ranks = invLogToRanks(np.linspace(0,4,nbins))
+        rng = np.random.default_rng(0)
+        self.values = rng.random((nbins,nbins))
+
+    def time_setFrameIL_showJointHistogram(self, nbins):
+        plot2D.setFrameIL(self.ax,self.ranks,self.ranks)
+        plot2D.showJointHistogram(self.ax,self.values,xranks=self.ranks,yranks=self.ranks)
+
+    def time_setFrameIL_showJointHistogram_draw(self, nbins):
+        plot2D.setFrameIL(self.ax,self.ranks,self.ranks)
+        plot2D.showJointHistogram(self.ax,self.values,xranks=self.ranks,yranks=self.ranks)
+        draw(self.fig)
+
+
+class JointHistogramSavefig:
+
+    params = [[100,500,1000,2000],['png','pdf']]
+    param_names = ['nbins','format']
+    number = 1
+    repeat = 3
+
+    def setup(self, nbins, fmt):
+        JointHistogram.setup(self,nbins)
+
+    def time_setFrameIL_showJointHistogram_savefig(self, nbins, fmt):
+        plot2D.setFrameIL(self.ax,self.ranks,self.ranks)
+        plot2D.showJointHistogram(self.ax,self.values,xranks=self.ranks,yranks=self.ranks)
+        savefig(self.fig,fmt)
+
+
+class Smooth2D:
+
+    params = [[50,200,1000]]
+    param_names = ['nx']
+    number = 1
+    repeat = 3
+
+    def setup(self, nx):
+        self.fig, self.ax = newAxes()
+        self.x = np.linspace(0,10,nx)
+        self.y = np.linspace(0,1,nx//2)
+        self.Z = np.sin(self.x)[None,:]*np.cos(3*self.y)[:,None]
+        self.Z[:,:nx//10] = np.nan
+
+    def time_subplotSmooth2D(self, nx):
+        plot2D.subplotSmooth2D(self.ax,self.x,self.y,self.Z,xmin=0,xmax=10,nx=nx)
+
+
+class Smooth2DSavefig:
+
+    params = [[50,200,1000],['png','pdf']]
+    param_names = ['nx','format']
+    number = 1
+    repeat = 3
+
+    def setup(self, nx, fmt):
+        Smooth2D.setup(self,nx)
+
+    def time_subplotSmooth2D_savefig(self, nx, fmt):
+        plot2D.subplotSmooth2D(self.ax,self.x,self.y,self.Z,xmin=0,xmax=10,nx=nx)
+        savefig(self.fig,fmt)
+
+
+class RasterizedJointHistogram:
+
+    params = [[100,300],[False,True]]
+    param_names = ['nbins','rasterized']
+    number = 1
+    repeat = 3
+
+    def setup(self, nbins, rasterized):
+        self.fig, self.ax = newAxes(figsize=(6,6))
+        ranks = invLogToRanks(np.linspace(0,4,nbins))
+        rng = np.random.default_rng(0)
+        plot2D.setFrameIL(self.ax,ranks,ranks)
+        plot2D.showJointHistogram(self.ax,rng.random((nbins,nbins)),xranks=ranks,yranks=ranks,
+                                  rasterized=rasterized)
+        savefig(self.fig,'pdf')
+
+    def time_savefig_pdf_again(self, nbins, rasterized):
+        savefig(self.fig,'pdf')
+
+
+class MidpointNorm:
+
+    params = [[1000,4000],['linear','log']]
+    param_names = ['n','scale']
+    number = 1
+    repeat = 3
+
+    def setup(self, n, scale):
+        rng = np.random.default_rng(0)
+        if scale == 'linear':
+            self.values = 50*rng.normal(size=(n,n))
+            self.norm = plot2D.MidpointNormalize(vmin=-100,vmax=100,midpoint=20)
+        else:
+            self.values = 10**rng.normal(size=(n,n))
+            self.norm = plot2D.MidpointLogNorm(vmin=1e-2,vmax=1e2,midpoint=1)
+        self.out = np.empty_like(self.values)
+
+    def time_normalize(self, n, scale):
+        self.norm(self.values)
+
+    def time_normalize_out(self, n, scale):
+        self.norm(self.values,out=self.out)
+
+    def time_inverse(self, n, scale):
+        self.norm.inverse(self.out)
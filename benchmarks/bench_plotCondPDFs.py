@@ -0,0 +1,43 @@
+"""Benchmarks of conditional profiles in plotCondPDFs"""
+
+import numpy as np
+
+from .common import newAxes,draw,savefig
+
+import plotCondPDFs
+
+
+class ConditionalProfiles:
+
+    params = [[10,100,500]]
+    param_names = ['nprofiles']
+    number = 1
+    repeat = 3
+
+    def setup(self, nprofiles):
+        self.fig, self.ax = newAxes()
+        self.z = np.linspace(0,15,80)
+        self.refbins = np.linspace(0,30,nprofiles)
+        self.profiles = np.exp(-self.z/5)[:,None]*self.refbins[None,:]
+
+    def time_subplotConditionalProfiles(self, nprofiles):
+        plotCondPDFs.subplotConditionalProfiles(self.ax,self.z,self.profiles,refbins=self.refbins)
+
+    def time_subplotConditionalProfiles_draw(self, nprofiles):
+        plotCondPDFs.subplotConditionalProfiles(self.ax,self.z,self.profiles,refbins=self.refbins)
+        draw(self.fig)
+
+
+class ConditionalProfilesSavefig:
+
+    params = [[10,100,500],['png','pdf']]
+    param_names = ['nprofiles','format']
+    number = 1
+    repeat = 3
+
+    def setup(self, nprofiles, fmt):
+        ConditionalProfiles.setup(self,nprofiles)
+
+    def time_subplotConditionalProfiles_savefig(self, nprofiles, fmt):
+        plotCondPDFs.subplotConditionalProfiles(self.ax,self.z,self.profiles,refbins=self.refbins)
+        savefig(self.fig,fmt)
@@ -0,0 +1,46 @@
+"""
+Shared helpers for benchmarks: path to the library modules in src/, headless
+figures and reproducible inputs.
+"""
+
+import os
+import sys
+import io
+
+import numpy as np
+
+SRCDIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),'src')
+if SRCDIR not in sys.path:
+    sys.path.insert(0,SRCDIR)
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+def newAxes(figsize=(6,4.5)):
+    """Figure and axes, without pyplot"""
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+
+    return fig, ax
+
+def draw(fig):
+
+    fig.canvas.draw()
+
+def savefig(fig, fmt):
+    """Save figure to memory in format fmt"""
+
+    fig.savefig(io.BytesIO(),format=fmt)
+
+def rankCurve(npoints, rankmax=99.999, seed=0):
+    """Ranks regularly spaced on the inverse-log axis and increasing percentiles"""
+
+    from rankAxis import invLogToRanks,ranksToInvLog
+    k = np.linspace(0,ranksToInvLog(rankmax),npoints)
+    rng = np.random.default_rng(seed)
+
+    return invLogToRanks(k), np.cumsum(rng.random(npoints))
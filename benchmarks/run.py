@@ -0,0 +1,94 @@
+"""
+Offline runner for the asv-style benchmarks of this directory, for use
+without asv installed:
+
+python -m benchmarks.run                      # all benchmarks
+python -m benchmarks.run --quick -k plot1D    # smallest sizes, matching names
+python -m benchmarks.run --json results.json  # save results
+python -m benchmarks.run --check-imports      # fail if an import exceeds its budget
+
+Each benchmark calls setup before each of its repeats and reports the minimum
+time. With asv, the same classes are run with 'asv run'.
+"""
+
+import os
+import sys
+import json
+import time
+import glob
+import argparse
+import itertools
+import importlib
+
+BENCHDIR = os.path.dirname(os.path.abspath(__file__))
+
+def iterBenchmarks(pattern=None, quick=False):
+    """(name, class, method, params) for all benchmarks matching pattern"""
+
+    for path in sorted(glob.glob(os.path.join(BENCHDIR,'bench_*.py'))):
+        modname = os.path.splitext(os.path.basename(path))[0]
+        module = importlib.import_module('benchmarks.'+modname)
+        for clsname, cls in vars(module).items():
+            if not isinstance(cls,type) or cls.__module__ != module.__name__:
+                continue
+            params = getattr(cls,'params',[])
+            if quick:
+                params = [p[:1] for p in params]
+            for methname in sorted(vars(cls)):
+                if not methname.startswith(('time_','track_')):
+                    continue
+                for p in itertools.product(*params):
+                    name = '%s.%s.%s(%s)'%(modname,clsname,methname,','.join(str(v) for v in p))
+                    if pattern is None or pattern in name:
+                        yield name, cls, methname, p
+
+def runBenchmark(cls, methname, p):
+    """Minimum time over repeats (time_), or tracked value (track_)"""
+
+    results = []
+    for i in range(getattr(cls,'repeat',3) if methname.startswith('time_') else 1):
+        bench = cls()
+        if hasattr(bench,'setup'):
+            bench.setup(*p)
+        t0 = time.perf_counter()
+        value = getattr(bench,methname)(*p)
+        t1 = time.perf_counter()
+        if hasattr(bench,'teardown'):
+            bench.teardown(*p)
+        results.append(t1-t0 if methname.startswith('time_') else value)
+
+    return min(results)
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description='Run benchmarks without asv')
+    parser.add_argument('-k',dest='pattern',default=None,help='only run benchmarks whose name contains this')
+    parser.add_argument('--quick',action='store_true',help='only run the smallest parameter values')
+    parser.add_argument('--json',default=None,help='write results to this JSON file')
+    parser.add_argument('--check-imports',action='store_true',help='check import times against budgets')
+    args = parser.parse_args(argv)
+
+    if args.check_imports:
+        from benchmarks.bench_import import IMPORT_BUDGET,importTime
+        failed = 0
+        for module, budget in IMPORT_BUDGET.items():
+            t = importTime(module)
+            status = 'ok' if t <= budget else 'OVER BUDGET'
+            failed += t > budget
+            print('import %-20s %7.3fs (budget %.2fs) %s'%(module,t,budget,status))
+        return int(failed > 0)
+
+    results = {}
+    for name, cls, methname, p in iterBenchmarks(args.pattern,args.quick):
+        results[name] = runBenchmark(cls,methname,p)
+        print('%-90s %10.4f'%(name,results[name]),flush=True)
+
+    if args.json is not None:
+        with open(args.json,'w') as f:
+            json.dump(results,f,indent=1)
+
+    return 0
+
+if __name__ == '__main__':
+    sys.path.insert(0,os.path.dirname(BENCHDIR))
+    sys.exit(main())
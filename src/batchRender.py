@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module batchRender
+
+Headless rendering of many figures from a declarative spec (JSON or YAML),
+across a pool of worker processes using the Agg backend and no pyplot state.
+
+Spec format:
+
+{
+  "defaults": {"figsize": [6,4.5], "dpi": 150},
+  "figures": [
+    {"output": "out/ranks.png",
+     "ncols": 2, "figsize": [12,4.5],
+     "panels": [
+        [{"function": "plot1D.subplotRanksILog",
+          "arrays": {"ranks": "data/dist.npz:ranks", "y": "data/dist.npz:percentiles"},
+          "kwargs": {"rankmax": 99.99, "col": "k"}}],
+        [{"function": "plot2D.setFrameIL",
+          "arrays": {"xranks": "data/jh.npz:xranks", "yranks": "data/jh.npz:yranks"}},
+         {"function": "plot2D.showJointHistogram",
+          "arrays": {"values": "data/jh.npz:density", "xranks": "data/jh.npz:xranks",
+                     "yranks": "data/jh.npz:yranks"},
+          "kwargs": {"scale": "log", "vmin": 0.01, "vmax": 100}}]
+     ],
+     "set": [{"xlabel": "Ranks Q (%)"}, {"xlabel": "X ranks", "ylabel": "Y ranks"}]}
+  ]
+}
+
+Each panel is a list of calls function(ax, **arrays, **entries, **kwargs). Arrays are
+given as 'file.npy' or 'file.npz:key', or lists of these for lists of arrays.
+Entries of a store.DistributionStore are given as 'store_directory:name', e.g.
+
+{"function": "plot1D.subplotRanksILog", "entries": {"ranks": "data/dists:pr_tropics"}}
+
+and are memory-mapped, so that all workers share the page cache.
+
+Figures whose inputs (array contents, parameters, library version) did not
+change since a previous run are copied from a renderCache.RenderCache if a
+cache directory is given.
+
+Command line:
+
+python batchRender.py spec.json --processes 8 --report timing.json --cache ~/.cache/plotting
+
+@author: bfildier
+"""
+
+#---- Modules ----#
+
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+#---- Parameters ----#
+
+# library modules whose functions can be called from a spec
+MODULES = ['plot1D','plot1DInvLog','plot2D','plotCondPDFs']
+
+# maximum number of files and store entries kept open by each worker
+LOADED_MAXSIZE = 32
+
+#---- Functions ----#
+
+def loadSpec(path):
+    """Read a figure spec from a JSON or YAML file"""
+
+    with open(path) as f:
+        if os.path.splitext(path)[1] in ['.yaml','.yml']:
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+def _initWorker():
+    """Select Agg backend and import library modules once per worker"""
+
+    import matplotlib
+    matplotlib.use('Agg')
+    for module in MODULES:
+        importlib.import_module(module)
+
+# files and store entries opened by this worker, least recently used first
+_loaded = OrderedDict()
+
+def _cached(key, load):
+    """Object of key from the worker cache, loaded with load() if needed. At most
+    LOADED_MAXSIZE objects are kept, evicted npz files are closed"""
+
+    if key in _loaded:
+        _loaded.move_to_end(key)
+        return _loaded[key]
+    obj = _loaded[key] = load()
+    while len(_loaded) > LOADED_MAXSIZE:
+        _, evicted = _loaded.popitem(last=False)
+        if hasattr(evicted,'close'):
+            evicted.close()
+
+    return obj
+
+def loadArray(ref):
+    """Array from 'file.npy' (memory-mapped) or 'file.npz:key', or list of arrays"""
+
+    if isinstance(ref,list):
+        return [loadArray(r) for r in ref]
+    path, _, key = ref.partition(':')
+    data = _cached(path,lambda: np.load(path,mmap_mode='r'))
+
+    return data[key] if key else data
+
+def loadEntry(ref):
+    """Store entry from its 'store_directory:name' reference"""
+
+    from store import openEntry
+
+    return _cached(ref,lambda: openEntry(ref))
+
+def getFunction(name):
+    """Library function from its 'module.function' name"""
+
+    module, _, func = name.rpartition('.')
+    if module not in MODULES:
+        raise ValueError("unknown module '%s' in '%s'"%(module,name))
+
+    return getattr(importlib.import_module(module),func)
+
+def renderFigure(figspec, defaults=None, cache=None):
+    """Render and save one figure from its spec, or copy it from cache (a RenderCache)
+    if it was rendered with the same inputs. Returns timing information"""
+
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    spec = dict(defaults or {},**figspec)
+    timing = {'output':spec['output']}
+    t0 = time.perf_counter()
+
+    # load arrays
+    calls = [[(getFunction(c['function']),
+               dict({k:loadArray(v) for k,v in c.get('arrays',{}).items()},
+                    **{k:loadEntry(v) for k,v in c.get('entries',{}).items()}),
+               c.get('kwargs',{})) for c in panel] for panel in spec['panels']]
+    t1 = time.perf_counter()
+    timing['load'] = t1-t0
+
+    # copy from cache, keyed on array contents and all other parameters
+    outdir = os.path.dirname(spec['output'])
+    if outdir:
+        os.makedirs(outdir,exist_ok=True)
+    if cache is not None:
+        from renderCache import hashInputs
+        key = hashInputs({k:v for k,v in spec.items() if k not in ['output','panels']},calls,
+                         os.path.splitext(spec['output'])[1])
+        if cache.fetch(key,spec['output']):
+            timing['cache'] = 'hit'
+            timing['render'] = timing['save'] = 0.
+            timing['total'] = time.perf_counter()-t0
+            return timing
+        timing['cache'] = 'miss'
+
+    # draw panels
+    fig = Figure(figsize=spec.get('figsize'),dpi=spec.get('dpi'))
+    FigureCanvasAgg(fig)
+    axs = fig.subplots(nrows=spec.get('nrows',1),ncols=spec.get('ncols',1),squeeze=False).flatten()
+    for ax, panel in zip(axs,calls):
+        for func, arrays, kwargs in panel:
+            func(ax,**arrays,**kwargs)
+    for ax, props in zip(axs,spec.get('set',[])):
+        ax.set(**props)
+    t2 = time.perf_counter()
+    timing['render'] = t2-t1
+
+    # save
+    fig.savefig(spec['output'],**spec.get('savefig',{}))
+    if cache is not None:
+        cache.store(key,spec['output'])
+    t3 = time.perf_counter()
+    timing['save'] = t3-t2
+    timing['total'] = t3-t0
+
+    return timing
+
+# render cache of this worker, kept across figures so that its size estimate is
+# reused instead of rescanning the cache directory at every store
+_renderCache = None
+
+def _workerCache(path, maxbytes):
+    """RenderCache of directory path for this worker, created once"""
+
+    global _renderCache
+    if _renderCache is None or (_renderCache.path,_renderCache.maxbytes) != (path,maxbytes):
+        from renderCache import RenderCache
+        _renderCache = RenderCache(path,maxbytes=maxbytes)
+
+    return _renderCache
+
+def _renderTask(task):
+
+    figspec, defaults, cache = task
+    try:
+        if cache is not None:
+            cache = _workerCache(*cache)
+        return renderFigure(figspec,defaults,cache)
+    except Exception as e:
+        return {'output':figspec.get('output'),'error':'%s: %s'%(type(e).__name__,e)}
+
+def renderSpec(spec, processes=None, chunksize=1, cache=None):
+    """Render all figures of spec (dict or path) in a pool of processes, worker
+    processes are reused across figures. Unchanged figures are copied from cache
+    (RenderCache) if given. Yields timing of each figure in the order of the spec"""
+
+    if isinstance(spec,str):
+        spec = loadSpec(spec)
+    defaults = spec.get('defaults',{})
+    # workers open the cache from its directory and size only
+    cache_args = None if cache is None else (cache.path,cache.maxbytes)
+    tasks = [(figspec,defaults,cache_args) for figspec in spec['figures']]
+
+    if processes == 1:
+        global _renderCache
+        _initWorker()
+        _renderCache = cache
+        for task in tasks:
+            yield _renderTask(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=processes,initializer=_initWorker) as executor:
+        for timing in executor.map(_renderTask,tasks,chunksize=chunksize):
+            yield timing
+
+#---- Main ----#
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description='Render figures from a JSON or YAML spec')
+    parser.add_argument('spec',help='path to spec file')
+    parser.add_argument('-p','--processes',type=int,default=None,help='number of worker processes')
+    parser.add_argument('-r','--report',default=None,help='write per-figure timing to this JSON file')
+    parser.add_argument('-c','--cache',default=None,help='directory of the render cache')
+    parser.add_argument('--cache-size',type=float,default=1.,help='maximum size of the render cache, in GB')
+    args = parser.parse_args(argv)
+
+    cache = None
+    if args.cache is not None:
+        from renderCache import RenderCache
+        cache = RenderCache(args.cache,maxbytes=int(args.cache_size*2**30))
+
+    timings = []
+    t0 = time.perf_counter()
+    for timing in renderSpec(args.spec,processes=args.processes,cache=cache):
+        timings.append(timing)
+        if 'error' in timing:
+            print('FAILED %s: %s'%(timing['output'],timing['error']))
+        elif timing.get('cache') == 'hit':
+            print('%s: %.3fs (cached)'%(timing['output'],timing['total']))
+        else:
+            print('%s: %.3fs (load %.3fs, render %.3fs, save %.3fs)'%(timing['output'],
+                  timing['total'],timing['load'],timing['render'],timing['save']))
+    print('%d figures in %.2fs'%(len(timings),time.perf_counter()-t0))
+    if cache is not None:
+        hits = sum(t.get('cache') == 'hit' for t in timings)
+        misses = sum(t.get('cache') == 'miss' for t in timings)
+        print('cache: %d hits, %d misses'%(hits,misses))
+
+    if args.report is not None:
+        with open(args.report,'w') as f:
+            json.dump(timings,f,indent=1)
+
+    return int(any('error' in t for t in timings))
+
+if __name__ == '__main__':
+    sys.exit(main())
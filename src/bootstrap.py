@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module bootstrap
+
+Bootstrap confidence bands of tail percentiles on the inverse-log rank grid,
+to be displayed with plot1DInvLog.subplotYShadingRanksILog.
+
+Percentiles above rank q only depend on the n(1-q/100) largest values, so
+that only the top values of the sample are kept (one chunked pass) and sorted.
+Replicates use Poisson(1) weights on these sorted values (Poisson bootstrap,
+equivalent to multinomial resampling for large samples), drawn in blocks of
+replicates with independent seeds spawned from one seed, so that results are
+reproducible whatever the number of processes.
+
+Example :
+
+ranks, y_BCs = bootstrapPercentiles(values,rankmin=99,rankmax=99.999,nboot=1000,processes=8)
+subplotYShadingRanksILog(ax,ranks,y_BCs,col='b')
+
+@author: bfildier
+"""
+
+#---- Modules ----#
+
+import numpy as np
+
+from rankAxis import rankGrid
+from jointDistribution import iterChunks,CHUNKSIZE
+
+#---- Parameters ----#
+
+# number of bootstrap replicates drawn in each task
+NBOOT_PER_TASK = 50
+
+#---- Functions ----#
+
+def topValues(values, k, chunksize=CHUNKSIZE):
+    """Largest k values of values (NaNs ignored) in decreasing order, and the number
+    of valid values, in one chunked pass with memory bounded by k+chunksize"""
+
+    top = np.empty(0)
+    n = 0
+    for sl in iterChunks(len(values),chunksize):
+        chunk = np.asarray(values[sl],dtype=float)
+        chunk = chunk[~np.isnan(chunk)]
+        n += chunk.size
+        top = np.concatenate([top,chunk])
+        if top.size > k:
+            top = np.partition(top,top.size-k)[top.size-k:]
+
+    return np.sort(top)[::-1], n
+
+def _bootstrapTask(task):
+    """Percentiles of nboot Poisson-weighted replicates of top values, at positions
+    d (counted from the largest value)"""
+
+    top, d, nboot, seed = task
+    rng = np.random.default_rng(seed)
+    replicates = np.empty((nboot,d.size))
+    for b in range(nboot):
+        cumweights = np.cumsum(rng.poisson(1.,size=top.size))
+        i = np.searchsorted(cumweights,d,side='right')
+        replicates[b] = top[np.minimum(i,top.size-1)]
+
+    return replicates
+
+def bootstrapReplicates(top, n, ranks, nboot=1000, seed=0, processes=None):
+    """Percentiles at ranks (nboot,Nranks) of bootstrap replicates of a sample of
+    size n, given its top values in decreasing order"""
+
+    # position of percentiles counted from the largest value
+    d = (1-np.asarray(ranks)/100.)*(n-1)
+    if np.any(d >= top.size):
+        raise ValueError('not enough top values for rank %2.4f'%np.min(ranks))
+
+    # fixed blocks of replicates with their own seeds, for reproducibility
+    nblocks = int(np.ceil(nboot/NBOOT_PER_TASK))
+    seeds = np.random.SeedSequence(seed).spawn(nblocks)
+    sizes = [min(NBOOT_PER_TASK,nboot-i*NBOOT_PER_TASK) for i in range(nblocks)]
+    tasks = [(top,d,size,s) for size,s in zip(sizes,seeds)]
+    if processes is None:
+        results = [_bootstrapTask(task) for task in tasks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(_bootstrapTask,tasks))
+
+    return np.concatenate(results)
+
+def bootstrapPercentiles(values, ranks=None, rankmin=99, rankmax=99.999, dk=0.1,
+                         nboot=1000, confidence=0.95, seed=0, processes=None, chunksize=CHUNKSIZE):
+    """
+    Confidence band of percentiles on the inverse-log rank grid (or at ranks).
+
+    Arguments:
+        - values: 1D array of samples, possibly memory-mapped
+        - ranks: ranks (in %) where percentiles are computed, on rankGrid(rankmin,rankmax,dk) if None
+        - nboot: number of bootstrap replicates
+        - confidence: confidence level of the band
+        - seed: seed of the random generator, results do not depend on processes
+        - processes: number of worker processes, None to run serially
+
+    Returns ranks and y_BCs, the (2,Nranks) lower and upper bounds of the band.
+    """
+
+    if ranks is None:
+        ranks = rankGrid(rankmin,rankmax,dk)
+        ranks = ranks[ranks >= rankmin]
+    ranks = np.asarray(ranks)
+
+    # keep enough top values for the lowest rank, with a margin for resampling
+    d_max = (1-ranks.min()/100.)*(len(values)-1)
+    k = int(np.ceil(d_max+10*np.sqrt(d_max+1)+10))
+    top, n = topValues(values,k,chunksize=chunksize)
+
+    replicates = bootstrapReplicates(top,n,ranks,nboot=nboot,seed=seed,processes=processes)
+    a = (1-confidence)/2*100
+    y_BCs = np.percentile(replicates,[a,100-a],axis=0)
+
+    return ranks, y_BCs
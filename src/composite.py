@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module composite
+
+Composites of 3D fields (time, level, column) conditioned on inverse-log rank
+bins of a reference variable (time, column), e.g. vertical profiles of
+humidity binned by precipitation percentile, for display with
+plot2D.subplotSmooth2D.
+
+Inputs are read chunk by chunk along time: numpy arrays, memory-mapped .npy
+files or netCDF variables (netCDF4 is only imported when reading .nc files).
+Sums and counts per (level, bin) are accumulated with condStats.ConditionalStatistics
+(vectorized bincount), and chunks can be processed in a pool of processes.
+Files given by path are opened in each worker, so that chunks are read in
+parallel and never pickled.
+
+Example :
+
+x, y, Z = computeComposite('hus.npy','pr.npy',xranks=rankGrid(0,99.99,0.5),levels=z,processes=4)
+subplotSmooth2D(ax,x,y,Z)
+
+x, y, Z = computeComposite(('hus.nc','hus'),('pr.nc','pr'),xranks=xranks,processes=4)
+
+@author: bfildier
+"""
+
+#---- Modules ----#
+
+import functools
+
+import numpy as np
+
+from jointDistribution import iterChunks,mapChunks,sketchEdges,CHUNKSIZE
+from distribution import QuantileSketch
+from condStats import ConditionalStatistics
+
+#---- Functions ----#
+
+@functools.lru_cache(maxsize=16)
+def openField(path, varname=None):
+    """Lazy array of a field on disk: memory-mapped .npy file, or variable varname of a
+    netCDF file. Opened fields are cached per process"""
+
+    if path.endswith('.npy'):
+        return np.load(path,mmap_mode='r')
+    if path.endswith('.nc'):
+        import netCDF4
+        if varname is None:
+            raise ValueError("a variable name is required to read netCDF file %s"%path)
+        return netCDF4.Dataset(path,'r').variables[varname]
+
+    raise ValueError("unknown format of field file %s (.npy or .nc)"%path)
+
+def _field(source):
+    """Array-like of a source: array, path or (path,varname)"""
+
+    if isinstance(source,str):
+        return openField(source)
+    if isinstance(source,tuple):
+        return openField(*source)
+
+    return source
+
+def readChunk(source, sl):
+    """Chunk sl along the first axis of a source, as float array with NaNs for masked values"""
+
+    chunk = _field(source)[sl]
+
+    return np.ma.filled(np.ma.asarray(chunk,dtype=float),np.nan)
+
+def _chunkSource(source, sl):
+    """(source,slice) of a chunk task: files are read in workers, arrays are sliced here"""
+
+    if isinstance(source,(str,tuple)):
+        return (source,sl)
+
+    return (np.asarray(source[sl]),slice(None))
+
+def _compositeTask(task):
+    """Conditional sums of one chunk of time steps"""
+
+    field, field_sl, ref, ref_sl, levelaxis, ref_edges = task
+    Y = np.moveaxis(readChunk(field,field_sl),levelaxis,-1)
+    Y = Y.reshape(-1,Y.shape[-1])
+
+    return ConditionalStatistics(ref_edges,Y.shape[1]).update(readChunk(ref,ref_sl).ravel(),Y)
+
+def computeComposite(field, ref, xranks=None, ref_edges=None, levels=None, levelaxis=1,
+                     chunksize=None, processes=None, return_counts=False):
+    """
+    Composite mean of field in bins of ref, in one pass over chunks of time steps.
+
+    Arguments:
+        - field: values (time,level,column...), as array, .npy path or (.nc path,varname)
+        - ref: reference variable (time,column...), same kinds of sources
+        - xranks: ranks (in %) of inverse-log rank bins of ref, whose value edges are
+        estimated with a QuantileSketch in one pass over ref
+        - ref_edges: value edges of bins of ref, instead of xranks
+        - levels: coordinate of levels (e.g. heights), default level indices
+        - levelaxis: axis of levels in field
+        - chunksize: number of time steps per chunk, default about CHUNKSIZE//16 values
+        - processes: number of worker processes, None to run serially
+    NaNs (and masked values) of field and ref are ignored.
+
+    Returns x (xranks, or centers of ref_edges), y (levels) and Z (Nlevel,Nbin),
+    NaN in empty bins, as expected by subplotSmooth2D(ax,x,y,Z), and counts
+    (Nlevel,Nbin) if return_counts.
+    """
+
+    shape = _field(field).shape
+    Nt, Nz = shape[0], shape[levelaxis]
+    if _field(ref).shape[0] != Nt:
+        raise ValueError("field and ref have different numbers of time steps (%d, %d)"%(Nt,_field(ref).shape[0]))
+    if chunksize is None:
+        chunksize = max(1,(CHUNKSIZE//16)//max(int(np.prod(shape[1:])),1))
+
+    if ref_edges is None:
+        # unbounded, as in percentileEdges: ref (e.g. precipitation) spans many decades
+        sketch = QuantileSketch(alpha=0.001,maxbins=None)
+        for sl in iterChunks(Nt,chunksize*Nz):
+            sketch.update(readChunk(ref,sl))
+        ref_edges = sketchEdges(sketch,xranks)
+        x = np.asarray(xranks)
+    else:
+        ref_edges = np.asarray(ref_edges,dtype=float)
+        x = (ref_edges[:-1]+ref_edges[1:])/2
+    y = np.arange(Nz) if levels is None else np.asarray(levels)
+
+    tasks = (_chunkSource(field,sl)+_chunkSource(ref,sl)+(levelaxis,ref_edges)
+             for sl in iterChunks(Nt,chunksize))
+    stats = None
+    for chunk_stats in mapChunks(_compositeTask,tasks,processes=processes):
+        stats = chunk_stats if stats is None else stats.merge(chunk_stats)
+
+    if return_counts:
+        return x, y, stats.mean(), stats.counts.reshape(stats.shape)
+    return x, y, stats.mean()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module condStats
+
+Statistics of profiles conditioned on bins of a reference variable, computed
+in one pass over chunks of samples with vectorized bin assignment and
+bincount, to be displayed with plotCondPDFs.subplotConditionalProfiles.
+
+ConditionalStatistics accumulates the mean, variance and percentiles of many
+variables Y in inverse-log rank bins of X. Accumulators of separate chunks
+merge exactly (percentiles within relative accuracy alpha), so that chunks
+can be processed in a pool of processes.
+
+Example :
+
+refbins, mean, quant, counts = computeConditionalProfiles(profiles,ref,ref_edges,quantiles=[10,50,90])
+subplotConditionalProfiles(ax,z,mean,refbins=refbins)
+
+xranks, mean, var, perc, counts = computeConditionalStatistics(Y,x,xranks=rankGrid(0,99.9,0.5),
+                                                               percentiles=[10,50,90,99])
+subplotDistributions(ax,perc[:,0,:],[10,50,90,99],xranks)
+
+@author: bfildier
+"""
+
+#---- Modules ----#
+
+import numpy as np
+
+from jointDistribution import iterChunks,mapChunks,binIndices,percentileEdges,CHUNKSIZE
+from distribution import GroupedQuantileSketch
+
+#---- Functions ----#
+
+def _histogramQuantiles(hist, value_edges, quantiles):
+    """Quantiles (in %) from histograms along the last axis, interpolated linearly
+    within bins. Outer bins are open, their values are bounded by the inner edges"""
+
+    cum = np.cumsum(hist,axis=-1)
+    n = cum[...,-1:]
+    # finite positions of edges, open outer bins collapsed on inner edges
+    edges = np.concatenate([value_edges[1:2],value_edges[1:-1],value_edges[-2:-1]])
+    q_all = []
+    for q in quantiles:
+        target = q/100.*n
+        i = np.minimum(np.sum(cum < target,axis=-1,keepdims=True),hist.shape[-1]-1)
+        c_lo = np.take_along_axis(np.concatenate([np.zeros_like(n),cum],axis=-1),i,axis=-1)
+        h = np.take_along_axis(hist,i,axis=-1)
+        with np.errstate(divide='ignore',invalid='ignore'):
+            frac = np.clip(np.where(h > 0,(target-c_lo)/h,0.),0,1)
+        x = edges[i]+frac*(edges[i+1]-edges[i])
+        x[n == 0] = np.nan
+        q_all.append(x[...,0])
+
+    return np.array(q_all)
+
+def valueRange(values, chunksize=CHUNKSIZE):
+    """Minimum and maximum of the finite values of an array (possibly memory-mapped),
+    in one pass over chunks along the first axis. Returns (nan,nan) if there are none"""
+
+    vmin, vmax = np.inf, -np.inf
+    for sl in iterChunks(len(values),chunksize):
+        chunk = np.asarray(values[sl],dtype=float)
+        chunk = chunk[np.isfinite(chunk)]
+        if chunk.size:
+            vmin, vmax = min(vmin,chunk.min()), max(vmax,chunk.max())
+    if vmin > vmax:
+        return np.nan, np.nan
+
+    return vmin, vmax
+
+def computeConditionalProfiles(profiles, ref, ref_edges, quantiles=None, value_edges=None,
+                               nvaluebins=200, chunksize=CHUNKSIZE//16):
+    """
+    Mean and quantile profiles of profiles (sample,z) in bins of ref (sample,), in one pass
+    (two if quantiles are computed without value_edges).
+
+    Arguments:
+        - profiles: array (sample,z), possibly memory-mapped; NaNs are ignored
+        - ref: reference variable (sample,)
+        - ref_edges: edges of the Nbin bins of ref
+        - quantiles: quantiles (in %) to compute, from histograms of profile values
+        on value_edges (nvaluebins bins over the range of all profile values if None,
+        found in a first pass over profiles)
+        - chunksize: number of samples processed at once
+
+    Returns refbins (bin centers), mean (z,Nbin), quant (Nq,z,Nbin) or None, and counts (z,Nbin),
+    shaped for subplotConditionalProfiles.
+    """
+
+    ref_edges = np.asarray(ref_edges,dtype=float)
+    Nbin = len(ref_edges)-1
+    Nz = profiles.shape[1]
+    sums = np.zeros(Nbin*Nz)
+    counts = np.zeros(Nbin*Nz,dtype=np.int64)
+    hist = None
+    if quantiles is not None:
+        if value_edges is None:
+            vmin, vmax = valueRange(profiles,chunksize)
+            if np.isnan(vmin):
+                vmin, vmax = 0., 1.
+            value_edges = np.linspace(vmin,vmax,nvaluebins+1)
+        # open outer bins for values out of value_edges
+        value_edges = np.concatenate([[-np.inf],np.asarray(value_edges,dtype=float),[np.inf]])
+        Nv = len(value_edges)-1
+        hist = np.zeros(Nbin*Nz*Nv,dtype=np.int64)
+
+    for sl in iterChunks(len(ref),chunksize):
+
+        chunk = np.asarray(profiles[sl],dtype=float)
+        ibin = binIndices(np.asarray(ref[sl],dtype=float),ref_edges)
+        # flat (bin,z) index of each value
+        i_flat = (ibin[:,None]*Nz+np.arange(Nz)[None,:])
+        valid = (ibin[:,None] >= 0) & ~np.isnan(chunk)
+        i_flat = i_flat[valid]
+        values = chunk[valid]
+        sums += np.bincount(i_flat,weights=values,minlength=Nbin*Nz)
+        counts += np.bincount(i_flat,minlength=Nbin*Nz)
+
+        if quantiles is not None:
+            iv = np.searchsorted(value_edges,values,side='right')-1
+            hist += np.bincount(i_flat*Nv+iv,minlength=Nbin*Nz*Nv)
+
+    with np.errstate(divide='ignore',invalid='ignore'):
+        mean = (sums/counts).reshape(Nbin,Nz).T
+    counts = counts.reshape(Nbin,Nz).T
+    refbins = (ref_edges[:-1]+ref_edges[1:])/2
+
+    quant = None
+    if quantiles is not None:
+        hist = hist.reshape(Nbin,Nz,-1)
+        quant = np.swapaxes(_histogramQuantiles(hist,value_edges,quantiles),1,2)
+
+    return refbins, mean, quant, counts
+
+#---- Conditional statistics of many variables ----#
+
+class ConditionalStatistics():
+    """
+    Count, mean, variance and percentiles of nvar variables in bins of x.
+
+    Arguments:
+        - x_edges: increasing edges of the Nbin bins of x
+        - nvar: number of variables
+        - percentiles: ranks (in %) of percentiles to estimate, None for moments only
+        - alpha: relative accuracy on percentiles (see distribution.QuantileSketch)
+    """
+
+    def __init__(self, x_edges, nvar, percentiles=None, alpha=0.01):
+        self.x_edges = np.asarray(x_edges,dtype=float)
+        self.nvar = nvar
+        self.percentiles = percentiles
+        Ng = (len(x_edges)-1)*nvar
+        self.counts = np.zeros(Ng,dtype=np.int64)
+        self._mean = np.zeros(Ng)
+        self._m2 = np.zeros(Ng)
+        self.sketch = None
+        if percentiles is not None:
+            self.sketch = GroupedQuantileSketch(Ng,alpha=alpha)
+
+    @property
+    def shape(self):
+        return (self.nvar,len(self.x_edges)-1)
+
+    def _mergeMoments(self, n, mean, m2):
+        """Combine moments of a new set of groups (Chan et al. parallel algorithm)"""
+
+        n_tot = self.counts+n
+        with np.errstate(divide='ignore',invalid='ignore'):
+            delta = mean-self._mean
+            w = np.where(n_tot > 0,n/n_tot,0.)
+            self._mean += np.where(n > 0,delta*w,0.)
+            self._m2 += np.where(n > 0,m2+delta**2*self.counts*w,0.)
+        self.counts = n_tot
+
+    def update(self, x, Y):
+        """Add samples x (n,) and values Y (n,nvar); NaNs in Y are ignored"""
+
+        Y = np.asarray(Y,dtype=float).reshape(len(x),self.nvar)
+        ibin = binIndices(np.asarray(x,dtype=float),self.x_edges)
+        # flat (var,bin) group of each value
+        groups = np.arange(self.nvar)[None,:]*(len(self.x_edges)-1)+ibin[:,None]
+        valid = (ibin[:,None] >= 0) & ~np.isnan(Y)
+        groups = groups[valid]
+        values = Y[valid]
+
+        Ng = self.counts.size
+        n = np.bincount(groups,minlength=Ng)
+        with np.errstate(divide='ignore',invalid='ignore'):
+            mean = np.bincount(groups,weights=values,minlength=Ng)/n
+        m2 = np.bincount(groups,weights=(values-mean[groups])**2,minlength=Ng)
+        self._mergeMoments(n,mean,m2)
+        if self.sketch is not None:
+            self.sketch.update(groups,values)
+
+        return self
+
+    def merge(self, other):
+        """Add statistics of another accumulator on the same bins, in place"""
+
+        self._mergeMoments(other.counts,other._mean,other._m2)
+        if self.sketch is not None:
+            self.sketch.merge(other.sketch)
+
+        return self
+
+    def mean(self):
+        """Mean (nvar,Nbin), NaN in empty bins"""
+
+        return np.where(self.counts > 0,self._mean,np.nan).reshape(self.shape)
+
+    def variance(self, ddof=0):
+        """Variance (nvar,Nbin), NaN in bins with ddof samples or less"""
+
+        with np.errstate(divide='ignore',invalid='ignore'):
+            var = np.where(self.counts > ddof,self._m2/(self.counts-ddof),np.nan)
+
+        return var.reshape(self.shape)
+
+    def quantiles(self):
+        """Percentiles (Nq,nvar,Nbin), or None if no percentiles were requested"""
+
+        if self.sketch is None:
+            return None
+
+        return self.sketch.quantiles(self.percentiles).reshape((-1,)+self.shape)
+
+def _conditionalTask(task):
+    """Conditional statistics of one chunk"""
+
+    x, Y, x_edges, percentiles, alpha = task
+
+    return ConditionalStatistics(x_edges,Y.shape[1],percentiles,alpha).update(x,Y)
+
+def _stackVariables(Y, sl):
+    """Chunk sl of variables Y (sample,nvar) or list of (sample,) arrays, as (n,nvar)"""
+
+    if isinstance(Y,(list,tuple)):
+        return np.column_stack([np.asarray(y[sl],dtype=float) for y in Y])
+    chunk = np.asarray(Y[sl],dtype=float)
+
+    return chunk.reshape(chunk.shape[0],-1)
+
+def computeConditionalStatistics(Y, x, xranks=None, x_edges=None, percentiles=None, alpha=0.01,
+                                 chunksize=CHUNKSIZE//16, processes=None):
+    """
+    Mean, variance and percentiles of variables Y in bins of x, in one pass over chunks.
+
+    Arguments:
+        - Y: values (sample,nvar), or list of nvar arrays (sample,), possibly memory-mapped
+        - x: conditioning variable (sample,)
+        - xranks: ranks (in %) of inverse-log rank bins of x, whose value edges
+        are estimated with jointDistribution.percentileEdges (one pass over x only)
+        - x_edges: value edges of bins of x, instead of xranks
+        - percentiles: ranks (in %) of percentiles of Y in each bin
+        - alpha: relative accuracy on percentiles
+        - processes: number of worker processes, None to run serially
+
+    Returns refbins (xranks, or centers of x_edges), mean and variance (nvar,Nbin),
+    percentiles (Nq,nvar,Nbin) or None, and counts (nvar,Nbin). mean is shaped
+    like profiles of subplotConditionalProfiles (with variables as z), and
+    percentiles[:,i,:] like distributions of subplotDistributions.
+    """
+
+    if x_edges is None:
+        x_edges = percentileEdges(x,xranks,chunksize=chunksize)
+        refbins = np.asarray(xranks)
+    else:
+        x_edges = np.asarray(x_edges,dtype=float)
+        refbins = (x_edges[:-1]+x_edges[1:])/2
+
+    tasks = ((np.asarray(x[sl]),_stackVariables(Y,sl),x_edges,percentiles,alpha)
+             for sl in iterChunks(len(x),chunksize))
+    stats = None
+    for chunk_stats in mapChunks(_conditionalTask,tasks,processes=processes):
+        stats = chunk_stats if stats is None else stats.merge(chunk_stats)
+
+    return refbins, stats.mean(), stats.variance(), stats.quantiles(), stats.counts.reshape(stats.shape)
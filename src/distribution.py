@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module distribution
+
+Streaming and mergeable estimation of distributions too large to be sorted
+in memory, to feed the inverse-logarithmic plots of plot1D and plot1DInvLog.
+
+The quantile sketch bins values on a logarithmic grid of ratio
+gamma = (1+alpha)/(1-alpha) (as in DDSketch), so that every percentile is
+returned with a relative error below alpha, including far in the tail
+(99.999th percentile and beyond). Counts are integers, so that sketches
+computed on separate chunks, processes or nodes merge exactly.
+
+Example :
+
+sketch = QuantileSketch(alpha=0.005)
+for chunk in chunks:
+    sketch.update(chunk)
+ranks, percentiles = sketch.percentiles(rankmin=0,rankmax=99.999)
+subplotRanksILog(ax,ranks,percentiles)
+
+@author: bfildier
+"""
+
+#---- Modules ----#
+
+import numpy as np
+
+from rankAxis import rankGrid
+
+#---- Classes ----#
+
+class _DenseStore():
+    """Bucket counts for consecutive integer keys, starting at key offset"""
+
+    def __init__(self, maxbins=None):
+        self.counts = np.zeros(0,dtype=np.int64)
+        self.offset = 0
+        self.maxbins = maxbins
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def _extend(self, kmin, kmax):
+        """Grow the bucket array so that it covers keys kmin to kmax"""
+
+        if self.counts.size == 0:
+            self.offset = kmin
+            self.counts = np.zeros(kmax-kmin+1,dtype=np.int64)
+            return
+        new_offset = min(kmin,self.offset)
+        new_size = max(kmax+1,self.offset+self.counts.size)-new_offset
+        if new_offset != self.offset or new_size != self.counts.size:
+            counts = np.zeros(new_size,dtype=np.int64)
+            i0 = self.offset-new_offset
+            counts[i0:i0+self.counts.size] = self.counts
+            self.counts = counts
+            self.offset = new_offset
+
+    def _collapse(self):
+        """Fold lowest buckets into one when exceeding maxbins, so that
+        memory stays bounded while keeping the upper tail exact"""
+
+        if self.maxbins is None or self.counts.size <= self.maxbins:
+            return
+        n_fold = self.counts.size-self.maxbins
+        self.counts[n_fold] += self.counts[:n_fold].sum()
+        self.counts = self.counts[n_fold:].copy()
+        self.offset += n_fold
+
+    def add(self, keys):
+
+        if keys.size == 0:
+            return
+        kmin, kmax = int(keys.min()), int(keys.max())
+        self._extend(kmin,kmax)
+        self.counts += np.bincount(keys-self.offset,minlength=self.counts.size)
+        self._collapse()
+
+    def merge(self, other):
+
+        if other.counts.size == 0:
+            return
+        self._extend(other.offset,other.offset+other.counts.size-1)
+        i0 = other.offset-self.offset
+        self.counts[i0:i0+other.counts.size] += other.counts
+        self._collapse()
+
+class _GroupedDenseStore(_DenseStore):
+    """Bucket counts (ngroups,nkeys) for consecutive integer keys of several groups
+    sharing the same key range, starting at key offset"""
+
+    def __init__(self, ngroups, maxbins=None):
+        self.ngroups = ngroups
+        self.counts = np.zeros((ngroups,0),dtype=np.int64)
+        self.offset = 0
+        self.maxbins = maxbins
+
+    @property
+    def count(self):
+        return self.counts.sum(axis=1)
+
+    def _extend(self, kmin, kmax):
+
+        size = self.counts.shape[1]
+        if size == 0:
+            self.offset = kmin
+            self.counts = np.zeros((self.ngroups,kmax-kmin+1),dtype=np.int64)
+            return
+        new_offset = min(kmin,self.offset)
+        new_size = max(kmax+1,self.offset+size)-new_offset
+        if new_offset != self.offset or new_size != size:
+            counts = np.zeros((self.ngroups,new_size),dtype=np.int64)
+            i0 = self.offset-new_offset
+            counts[:,i0:i0+size] = self.counts
+            self.counts = counts
+            self.offset = new_offset
+
+    def _collapse(self):
+        """Fold lowest buckets of all groups into one when exceeding maxbins"""
+
+        size = self.counts.shape[1]
+        if self.maxbins is None or size <= self.maxbins:
+            return
+        n_fold = size-self.maxbins
+        self.counts[:,n_fold] += self.counts[:,:n_fold].sum(axis=1)
+        self.counts = self.counts[:,n_fold:].copy()
+        self.offset += n_fold
+
+    def add(self, groups, keys):
+
+        if keys.size == 0:
+            return
+        self._extend(int(keys.min()),int(keys.max()))
+        size = self.counts.shape[1]
+        self.counts += np.bincount(groups*size+keys-self.offset,
+                                   minlength=self.counts.size).reshape(self.counts.shape)
+        self._collapse()
+
+    def merge(self, other):
+
+        if other.counts.shape[1] == 0:
+            return
+        size = other.counts.shape[1]
+        self._extend(other.offset,other.offset+size-1)
+        i0 = other.offset-self.offset
+        self.counts[:,i0:i0+size] += other.counts
+        self._collapse()
+
+class QuantileSketch():
+    """
+    Mergeable quantile sketch with relative accuracy alpha on percentile values.
+
+    Arguments:
+        - alpha: relative accuracy on percentiles
+        - minvalue: absolute values below minvalue are counted as zeros
+        - maxbins: maximum number of buckets for positive and negative values
+        each; lowest buckets are merged beyond, degrading accuracy in the
+        bulk only
+    """
+
+    def __init__(self, alpha=0.005, minvalue=1e-9, maxbins=4096):
+        self.alpha = alpha
+        self.gamma = (1+alpha)/(1-alpha)
+        self.minvalue = minvalue
+        self._inv_lngamma = 1/np.log(self.gamma)
+        self.positive = _DenseStore(maxbins)
+        self.negative = _DenseStore(maxbins)
+        self.zero_count = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self):
+        return self.positive.count+self.negative.count+self.zero_count
+
+    def _keys(self, values):
+
+        return np.ceil(np.log(values)*self._inv_lngamma).astype(np.int64)
+
+    def _values(self, keys):
+        """Representative value of buckets, within alpha of all values in bucket"""
+
+        return 2*np.power(self.gamma,keys)/(self.gamma+1)
+
+    def update(self, values):
+        """Add a chunk of values (any shape, NaNs ignored)"""
+
+        values = np.asarray(values,dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        self.min = min(self.min,values.min())
+        self.max = max(self.max,values.max())
+        is_pos = values > self.minvalue
+        is_neg = values < -self.minvalue
+        self.positive.add(self._keys(values[is_pos]))
+        self.negative.add(self._keys(-values[is_neg]))
+        self.zero_count += int(values.size-is_pos.sum()-is_neg.sum())
+
+        return self
+
+    def merge(self, other):
+        """Add the counts of another sketch with the same alpha, in place"""
+
+        if other.gamma != self.gamma:
+            raise ValueError('cannot merge sketches with different accuracies')
+        self.positive.merge(other.positive)
+        self.negative.merge(other.negative)
+        self.zero_count += other.zero_count
+        self.min = min(self.min,other.min)
+        self.max = max(self.max,other.max)
+
+        return self
+
+    def quantiles(self, ranks):
+        """Percentiles at ranks (in %)"""
+
+        ranks = np.asarray(ranks,dtype=float)
+        n = self.count
+        if n == 0:
+            return np.full(ranks.shape,np.nan)
+
+        # buckets in increasing order of values, negative ones first
+        n_neg = self.negative.counts.size
+        keys_neg = self.negative.offset+np.arange(n_neg)
+        keys_pos = self.positive.offset+np.arange(self.positive.counts.size)
+        bucket_values = np.concatenate([-self._values(keys_neg[::-1]),[0.],
+                                        self._values(keys_pos)])
+        bucket_counts = np.concatenate([self.negative.counts[::-1],[self.zero_count],
+                                        self.positive.counts])
+        cumcounts = np.cumsum(bucket_counts)
+
+        # position of rank among sorted values
+        i_rank = ranks/100.*(n-1)
+        i_bucket = np.searchsorted(cumcounts,i_rank,side='right')
+        i_bucket = np.clip(i_bucket,0,bucket_values.size-1)
+        percentiles = np.clip(bucket_values[i_bucket],self.min,self.max)
+
+        return percentiles
+
+    def percentiles(self, rankmin=0, rankmax=99.999, dk=0.1, ranks=None):
+        """Ranks and percentiles on the inverse-log grid of setFrame (or on ranks)"""
+
+        if ranks is None:
+            ranks = rankGrid(rankmin,rankmax,dk)
+
+        return ranks, self.quantiles(ranks)
+
+class GroupedQuantileSketch(QuantileSketch):
+    """
+    Quantile sketches of ngroups groups of values with the same relative
+    accuracy alpha, updated at once from values and their group indices
+    (e.g. bins of a conditioning variable times variables).
+
+    Arguments:
+        - ngroups: number of groups
+        - alpha: relative accuracy on percentiles
+        - minvalue: absolute values below minvalue are counted as zeros
+        - maxbins: maximum number of buckets for positive and negative values
+        each, shared by all groups; lowest buckets are merged beyond
+    """
+
+    def __init__(self, ngroups, alpha=0.005, minvalue=1e-9, maxbins=4096):
+        self.ngroups = ngroups
+        self.alpha = alpha
+        self.gamma = (1+alpha)/(1-alpha)
+        self.minvalue = minvalue
+        self._inv_lngamma = 1/np.log(self.gamma)
+        self.positive = _GroupedDenseStore(ngroups,maxbins)
+        self.negative = _GroupedDenseStore(ngroups,maxbins)
+        self.zero_count = np.zeros(ngroups,dtype=np.int64)
+        self.min = np.full(ngroups,np.inf)
+        self.max = np.full(ngroups,-np.inf)
+
+    def update(self, groups, values):
+        """Add values (1D, NaNs ignored) to their groups (1D integer indices)"""
+
+        values = np.asarray(values,dtype=float).ravel()
+        groups = np.asarray(groups).ravel()
+        valid = ~np.isnan(values)
+        values, groups = values[valid], groups[valid]
+        if values.size == 0:
+            return self
+        np.minimum.at(self.min,groups,values)
+        np.maximum.at(self.max,groups,values)
+        is_pos = values > self.minvalue
+        is_neg = values < -self.minvalue
+        is_zero = ~(is_pos | is_neg)
+        self.positive.add(groups[is_pos],self._keys(values[is_pos]))
+        self.negative.add(groups[is_neg],self._keys(-values[is_neg]))
+        self.zero_count += np.bincount(groups[is_zero],minlength=self.ngroups)
+
+        return self
+
+    def merge(self, other):
+        """Add the counts of another grouped sketch with the same alpha and groups, in place"""
+
+        if other.gamma != self.gamma or other.ngroups != self.ngroups:
+            raise ValueError('cannot merge sketches with different accuracies or groups')
+        self.positive.merge(other.positive)
+        self.negative.merge(other.negative)
+        self.zero_count += other.zero_count
+        self.min = np.minimum(self.min,other.min)
+        self.max = np.maximum(self.max,other.max)
+
+        return self
+
+    def quantiles(self, ranks):
+        """Percentiles at ranks (in %) of each group, (Nranks,ngroups)"""
+
+        ranks = np.asarray(ranks,dtype=float)
+        n = self.count
+
+        # buckets in increasing order of values, negative ones first
+        n_neg = self.negative.counts.shape[1]
+        keys_neg = self.negative.offset+np.arange(n_neg)
+        keys_pos = self.positive.offset+np.arange(self.positive.counts.shape[1])
+        bucket_values = np.concatenate([-self._values(keys_neg[::-1]),[0.],
+                                        self._values(keys_pos)])
+        bucket_counts = np.concatenate([self.negative.counts[:,::-1],self.zero_count[:,None],
+                                        self.positive.counts],axis=1)
+        cumcounts = np.cumsum(bucket_counts,axis=1)
+
+        percentiles = np.full((ranks.size,self.ngroups),np.nan)
+        for i, rank in enumerate(ranks):
+            # position of rank among sorted values, same as searchsorted(side='right')
+            i_rank = rank/100.*(n-1)
+            i_bucket = np.sum(cumcounts <= i_rank[:,None],axis=1)
+            i_bucket = np.clip(i_bucket,0,bucket_values.size-1)
+            percentiles[i] = np.clip(bucket_values[i_bucket],self.min,self.max)
+        percentiles[:,n == 0] = np.nan
+
+        return percentiles
+
+#---- Functions ----#
+
+def computeSketch(chunks, alpha=0.005, **kwargs):
+    """Ingest an iterable of arrays into a new QuantileSketch"""
+
+    sketch = QuantileSketch(alpha=alpha,**kwargs)
+    for chunk in chunks:
+        sketch.update(chunk)
+
+    return sketch
+
+def mergeSketches(sketches):
+    """Merge sketches computed separately (e.g. returned by worker processes)"""
+
+    sketches = list(sketches)
+    merged = QuantileSketch(alpha=sketches[0].alpha,minvalue=sketches[0].minvalue,
+                            maxbins=sketches[0].positive.maxbins)
+    for sketch in sketches:
+        merged.merge(sketch)
+
+    return merged
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module frameTemplate
+
+Render long series of frames that share the same inverse-log frame (e.g. one
+joint histogram per day, one conditional profile per hour) without rebuilding
+the frame each time. The figure is drawn once without its data artists, the
+rendered background is cached, and each new frame only restores the
+background, updates the data of the artists (as returned by showData,
+subplotRanksILog, showJointHistogram, ...) and draws them (blitting).
+
+Lines updated with new values only keep their x coordinates, so they must
+have one point per rank: draw them without decimation (decimate=False in
+showData), since long curves are decimated by default.
+
+Example :
+
+fig,ax = plt.subplots()
+setFrame(ax,rankmin=0,rankmax=99.99)
+h = showData(ax,ranks,values[0],decimate=False)
+template = FrameTemplate(fig,h)
+for i,v in enumerate(values):
+    template.update(v)
+    template.saveFrame('frame_%04d.png'%i)
+
+@author: bfildier
+"""
+
+#---- Modules ----#
+
+import numpy as np
+from matplotlib.image import AxesImage,imsave
+from matplotlib.lines import Line2D
+from matplotlib.collections import LineCollection,QuadMesh
+
+#---- Functions ----#
+
+def flattenArtists(artists):
+    """Flat list of artists from handles (artist, or nested lists/tuples of artists)"""
+
+    if isinstance(artists,(list,tuple)):
+        return [a for h in artists for a in flattenArtists(h)]
+
+    return [artists]
+
+def setArtistData(artist, data):
+    """Replace data of artist: values or (x,values) for lines, 2D arrays for images
+    and meshes, segments for line collections"""
+
+    if isinstance(artist,Line2D):
+        if isinstance(data,tuple):
+            artist.set_data(*data)
+        else:
+            artist.set_ydata(data)
+    elif isinstance(artist,AxesImage):
+        artist.set_data(data)
+    elif isinstance(artist,QuadMesh):
+        artist.set_array(np.asarray(data).ravel())
+    elif isinstance(artist,LineCollection):
+        artist.set_segments(data)
+    else:
+        raise TypeError('cannot update data of %s'%type(artist).__name__)
+
+#---- Classes ----#
+
+class FrameTemplate():
+    """
+    Figure with a cached background, where only data artists are redrawn.
+
+    Arguments:
+        - fig: figure with frame and data artists already set
+        - artists: data artists (or handles containing them), redrawn on update
+    Lines updated with values only must not be decimated.
+    """
+
+    def __init__(self, fig, artists):
+        self.fig = fig
+        self.canvas = fig.canvas
+        self.artists = flattenArtists(artists)
+        for artist in self.artists:
+            artist.set_animated(True)
+        self.background = None
+        # refresh the background when the figure is drawn in full (e.g. resize)
+        self._cid = self.canvas.mpl_connect('draw_event',self._onDraw)
+        self.canvas.draw()
+
+    def _onDraw(self, event):
+
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._drawArtists()
+
+    def _drawArtists(self):
+
+        for artist in self.artists:
+            artist.axes.draw_artist(artist)
+
+    def update(self, *data):
+        """Set new data for each artist (in order) and redraw them over the background"""
+
+        for artist, d in zip(self.artists,data):
+            setArtistData(artist,d)
+        self.canvas.restore_region(self.background)
+        self._drawArtists()
+        self.canvas.blit(self.fig.bbox)
+
+    def rgba(self):
+        """Current frame as an (height,width,4) uint8 array"""
+
+        return np.array(self.canvas.buffer_rgba())
+
+    def saveFrame(self, fname):
+        """Save current frame as an image, without rendering the figure again"""
+
+        imsave(fname,np.asarray(self.canvas.buffer_rgba()))
+
+    def close(self):
+        """Stop tracking redraws and restore artists for normal rendering"""
+
+        self.canvas.mpl_disconnect(self._cid)
+        for artist in self.artists:
+            artist.set_animated(False)
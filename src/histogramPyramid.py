@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module histogramPyramid
+
+Level-of-detail display of large joint histograms on inverse-log axes, for
+interactive zoom and pan.
+
+Counts are summed over 2x2 blocks into successive levels, so that densities
+computed from counts and rank-bin widths stay consistent across levels. Only
+the window of the level matching the current view and pixel size is drawn:
+when axes limits, window size or dpi change, the mesh is rebuilt from the
+appropriate level and window at the next draw, so that the number of drawn
+cells stays close to the number of pixels whatever the size of the
+histogram. Scales, limits and ticks set by setFrameIL are not modified.
+
+Example :
+
+setFrameIL(ax,xranks,yranks)
+view = showJointHistogramLOD(ax,counts,xranks,yranks,scale='log',vmin=1e-2,vmax=1e2)
+
+@author: bfildier
+"""
+
+#---- Modules ----#
+
+import numpy as np
+from matplotlib.artist import Artist
+
+from rankAxis import meshEdges
+from jointDistribution import rankBinEdges
+
+#---- Functions ----#
+
+def downsampleEdges(edges):
+    """Edges of bins merged by pairs, the last bin is kept alone for an odd number of bins"""
+
+    coarse = edges[::2]
+    if len(edges) % 2 == 0:
+        coarse = np.append(coarse,edges[-1])
+
+    return coarse
+
+def downsampleSum(a):
+    """Sum of a (Ny,Nx) over 2x2 blocks, padding odd dimensions with zeros"""
+
+    Ny, Nx = a.shape
+    a = np.pad(a,((0,Ny % 2),(0,Nx % 2)))
+
+    return a.reshape(a.shape[0]//2,2,a.shape[1]//2,2).sum(axis=(1,3))
+
+#---- Classes ----#
+
+class HistogramPyramid():
+    """
+    Joint counts (Ny,Nx) on rank bins and their 2x-downsampled levels, down to
+    minsize bins along the largest dimension.
+
+    Arguments:
+        - counts: joint counts (Ny,Nx)
+        - xranks, yranks: rank bin centers or edges (arrays or RankAxis)
+        - density: values are the joint density of ranks (True), or mean counts
+        per bin of the full-resolution grid (False)
+    """
+
+    def __init__(self, counts, xranks, yranks, density=True, minsize=64):
+        counts = np.asarray(counts)
+        Ny, Nx = counts.shape
+        self.density = density
+        self.total = counts.sum()
+        self.counts = [counts]
+        self.x_edges = [np.asarray(meshEdges(xranks,Nx),dtype=float)]
+        self.y_edges = [np.asarray(meshEdges(yranks,Ny),dtype=float)]
+        # bin widths, in rank for density or in number of full-resolution bins
+        if density:
+            dqx = np.diff(rankBinEdges(xranks))/100. if len(xranks) == Nx else np.diff(xranks)/100.
+            dqy = np.diff(rankBinEdges(yranks))/100. if len(yranks) == Ny else np.diff(yranks)/100.
+        else:
+            dqx, dqy = np.ones(Nx), np.ones(Ny)
+        self.dqx = [dqx]
+        self.dqy = [dqy]
+
+        while max(self.counts[-1].shape) > minsize:
+            self.counts.append(downsampleSum(self.counts[-1]))
+            self.x_edges.append(downsampleEdges(self.x_edges[-1]))
+            self.y_edges.append(downsampleEdges(self.y_edges[-1]))
+            self.dqx.append(downsampleSum(self.dqx[-1][None,:])[0])
+            self.dqy.append(downsampleSum(self.dqy[-1][None,:])[0])
+
+    @property
+    def nlevels(self):
+        return len(self.counts)
+
+    def values(self, level, ywin=slice(None), xwin=slice(None)):
+        """Density (or mean counts per bin) in a window of a level"""
+
+        area = np.outer(self.dqy[level][ywin],self.dqx[level][xwin])
+        norm = self.total if self.density else 1
+
+        with np.errstate(divide='ignore',invalid='ignore'):
+            return self.counts[level][ywin,xwin]/norm/area
+
+    def select(self, xlim, ylim, width, height, oversampling=1.):
+        """Level and index windows (ywin,xwin) covering limits xlim and ylim (ranks)
+        drawn on width x height pixels"""
+
+        x_edges, y_edges = self.x_edges[0], self.y_edges[0]
+        i0, i1 = np.searchsorted(x_edges,sorted(xlim))
+        j0, j1 = np.searchsorted(y_edges,sorted(ylim))
+        # level where the number of visible bins is close to the number of pixels
+        nx = max(i1-i0+1,1)/(width*oversampling)
+        ny = max(j1-j0+1,1)/(height*oversampling)
+        level = int(np.clip(np.ceil(np.log2(max(nx,ny,1))),0,self.nlevels-1))
+        # window at level, with one bin of margin
+        xwin = slice(max((i0>>level)-1,0),(i1>>level)+1)
+        ywin = slice(max((j0>>level)-1,0),(j1>>level)+1)
+
+        return level, ywin, xwin
+
+class _PyramidArtist(Artist):
+    """Artist of a PyramidView in the axes, which selects the level and window
+    on each draw before drawing the mesh"""
+
+    def __init__(self, view):
+        super().__init__()
+        self.view = view
+
+    def draw(self, renderer):
+
+        if self.view.follow:
+            self.view.update()
+        if self.view.mesh is not None:
+            self.view.mesh.draw(renderer)
+        self.stale = False
+
+class PyramidView():
+    """
+    QuadMesh of a HistogramPyramid on axes, rebuilt from the level and window
+    matching the view when the axes are drawn: after changes of limits, but also
+    of window size or savefig dpi, which change the number of pixels. The window
+    is extended by margin times its size on each side, so that small pans reuse
+    the mesh. The mesh is drawn by an artist of the axes but is not itself in
+    the axes, so that it does not change data limits.
+    """
+
+    def __init__(self, ax, pyramid, norm=None, cmap=None, oversampling=1., margin=0.25):
+        self.ax = ax
+        self.pyramid = pyramid
+        self.norm = norm
+        self.cmap = cmap
+        self.oversampling = oversampling
+        self.margin = margin
+        self.mesh = None
+        self.state = None
+        self.follow = True
+        self.artist = ax.add_artist(_PyramidArtist(self))
+        self.update()
+
+    def _extend(self, win, n):
+
+        size = win.stop-win.start
+        pad = int(np.ceil(self.margin*size))
+
+        return slice(max(win.start-pad,0),min(win.stop+pad,n))
+
+    def update(self):
+        """Rebuild the mesh if the view needs another level or leaves the current window"""
+
+        from matplotlib.collections import QuadMesh
+
+        ax = self.ax
+        level, ywin, xwin = self.pyramid.select(ax.get_xlim(),ax.get_ylim(),ax.bbox.width,
+                                                ax.bbox.height,self.oversampling)
+        if self.state is not None:
+            level0, ywin0, xwin0 = self.state
+            if level == level0 and ywin0.start <= ywin.start and ywin.stop <= ywin0.stop \
+               and xwin0.start <= xwin.start and xwin.stop <= xwin0.stop:
+                return
+
+        Ny, Nx = self.pyramid.counts[level].shape
+        ywin, xwin = self._extend(ywin,Ny), self._extend(xwin,Nx)
+        x_edges = self.pyramid.x_edges[level][xwin.start:xwin.stop+1]
+        y_edges = self.pyramid.y_edges[level][ywin.start:ywin.stop+1]
+        coords = np.stack(np.meshgrid(x_edges,y_edges),axis=-1)
+        mesh = QuadMesh(coords,array=self.pyramid.values(level,ywin,xwin).ravel(),
+                        norm=self.norm,cmap=self.cmap)
+        # drawn by self.artist, the frame of setFrameIL is kept
+        mesh.set_figure(ax.figure)
+        mesh.axes = ax
+        mesh.set_transform(ax.transData)
+        mesh.set_clip_path(ax.patch)
+        self.mesh = mesh
+        self.state = (level,ywin,xwin)
+        self.artist.stale = True
+
+    def disconnect(self):
+        """Stop following the view, the current mesh is kept"""
+
+        self.follow = False
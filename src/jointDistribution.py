@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module jointDistribution
+
+Compute joint histograms of (x,y) samples on inverse-logarithmic rank bins,
+to be displayed with plot2D.setFrameIL and plot2D.showJointHistogram.
+
+Bins are the percentile intervals of x and y around ranks of the inverse-log
+grid (e.g. rankAxis.rankGrid), so that the joint density of ranks is 1
+everywhere when x and y are independent. Samples are processed in chunks with
+vectorized searchsorted/bincount, so that memory stays bounded whatever the
+number of samples, optionally in parallel over chunks.
+
+Counts are smoothed into a kernel density estimate in the transformed
+coordinates k = -log10(1-q/100), where rank grids are regular: a Gaussian
+kernel is applied by FFT along each axis of the binned counts, with a wider
+kernel where samples are sparse (adaptive bandwidth), so that the cost does
+not depend on the number of samples once they are binned.
+
+Example :
+
+xranks = yranks = rankGrid(0,99.99)
+counts, density, xranks, yranks = computeJointHistogram(x,y,xranks,yranks)
+setFrameIL(ax,xranks,yranks)
+showJointHistogram(ax,density,scale='log',vmin=1e-2,vmax=1e2,xranks=xranks,yranks=yranks)
+
+smoothed, density, xranks, yranks = computeJointKDE(x,y,xranks,yranks,bandwidth=0.1,adaptive=True)
+
+@author: bfildier
+"""
+
+#---- Modules ----#
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor,as_completed,wait,FIRST_COMPLETED
+
+from rankAxis import RankAxis,rankEdges,ranksToInvLog
+from distribution import QuantileSketch
+
+#---- Parameters ----#
+
+# default number of samples per chunk
+CHUNKSIZE = 2**22
+
+#---- Functions ----#
+
+def iterChunks(n, chunksize=CHUNKSIZE):
+    """Slices of consecutive chunks covering range(n)"""
+
+    for i0 in range(0,n,chunksize):
+        yield slice(i0,min(i0+chunksize,n))
+
+def mapChunks(func, tasks, processes=None):
+    """Apply func to tasks, in a pool of processes if processes is not None.
+    At most 2 tasks per process are in flight, to keep memory bounded.
+    Results are yielded in order of completion"""
+
+    if processes is None:
+        for task in tasks:
+            yield func(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        pending = set()
+        for task in tasks:
+            pending.add(executor.submit(func,task))
+            if len(pending) >= 2*processes:
+                done, pending = wait(pending,return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in as_completed(pending):
+            yield future.result()
+
+def rankBinEdges(ranks):
+    """Edges of rank bins centered on ranks on the inverse-log axis, bounded by 0 and 100"""
+
+    edges = np.array(ranks.edges if isinstance(ranks,RankAxis) else rankEdges(ranks),dtype=float)
+    edges[0] = max(edges[0],0.)
+    edges[-1] = 100.
+
+    return edges
+
+def percentileEdges(values, ranks, alpha=0.001, chunksize=CHUNKSIZE):
+    """Value edges of the rank bins centered on ranks, estimated in one pass
+    with a QuantileSketch. The outer edges are infinite so that all samples
+    are binned"""
+
+    # no bound on buckets: collapsing the lowest ones would merge edges in the
+    # bulk of values spanning many decades
+    sketch = QuantileSketch(alpha=alpha,maxbins=None)
+    for sl in iterChunks(len(values),chunksize):
+        sketch.update(values[sl])
+
+    return sketchEdges(sketch,ranks)
+
+def sketchEdges(sketch, ranks):
+    """Value edges of the rank bins centered on ranks, from a QuantileSketch of values"""
+
+    edges = sketch.quantiles(rankBinEdges(ranks))
+    edges[0] = -np.inf
+    edges[-1] = np.inf
+
+    return edges
+
+def binIndices(values, edges):
+    """Index of bins [edges[i],edges[i+1]) containing values, -1 if outside or NaN"""
+
+    i = np.searchsorted(edges,values,side='right')-1
+    i[(i >= len(edges)-1) | np.isnan(values)] = -1
+
+    return i
+
+def _jointCounts(task):
+    """Joint counts of one chunk, flattened on the (Ny,Nx) grid"""
+
+    x, y, x_edges, y_edges = task
+    Nx, Ny = len(x_edges)-1, len(y_edges)-1
+    ix = binIndices(np.asarray(x),x_edges)
+    iy = binIndices(np.asarray(y),y_edges)
+    valid = (ix >= 0) & (iy >= 0)
+
+    return np.bincount(iy[valid]*Nx+ix[valid],minlength=Nx*Ny)
+
+def computeJointCounts(x, y, x_edges, y_edges, chunksize=CHUNKSIZE, processes=None):
+    """
+    Count (x,y) pairs in bins of edges x_edges and y_edges, returned as a (Ny,Nx) array.
+
+    Arguments:
+        - x, y: 1D arrays of samples, possibly memory-mapped
+        - x_edges, y_edges: increasing bin edges in value space
+        - chunksize: number of samples processed at once
+        - processes: number of worker processes, None to run serially
+    """
+
+    Nx, Ny = len(x_edges)-1, len(y_edges)-1
+    tasks = ((x[sl],y[sl],x_edges,y_edges) for sl in iterChunks(len(x),chunksize))
+    counts = np.zeros(Nx*Ny,dtype=np.int64)
+    for chunk_counts in mapChunks(_jointCounts,tasks,processes=processes):
+        counts += chunk_counts
+
+    return counts.reshape(Ny,Nx)
+
+def countsToDensity(counts, xranks, yranks):
+    """Joint density of ranks: frequencies divided by the product of the marginal
+    rank-bin widths, equal to 1 for independent variables"""
+
+    dqx = np.diff(rankBinEdges(xranks))/100.
+    dqy = np.diff(rankBinEdges(yranks))/100.
+    N = counts.sum()
+
+    with np.errstate(divide='ignore',invalid='ignore'):
+        return counts/N/(dqy[:,None]*dqx[None,:])
+
+def computeJointHistogram(x, y, xranks, yranks, x_edges=None, y_edges=None,
+                          chunksize=CHUNKSIZE, processes=None):
+    """
+    Joint histogram of (x,y) on inverse-log rank bins centered on xranks and yranks.
+
+    Value edges of bins are estimated with percentileEdges if not provided
+    (one extra pass over the data). Returns counts and density, both (Ny,Nx),
+    and the rank axes xranks and yranks, ready for setFrameIL and showJointHistogram.
+    """
+
+    if x_edges is None:
+        x_edges = percentileEdges(x,xranks,chunksize=chunksize)
+    if y_edges is None:
+        y_edges = percentileEdges(y,yranks,chunksize=chunksize)
+
+    counts = computeJointCounts(x,y,x_edges,y_edges,chunksize=chunksize,processes=processes)
+    density = countsToDensity(counts,xranks,yranks)
+
+    return counts, density, xranks, yranks
+
+def gaussianKernel(sigma):
+    """Gaussian weights of standard deviation sigma (in bins) on offsets -pad..pad,
+    with pad = ceil(4*sigma), normalized to a unit sum"""
+
+    pad = int(np.ceil(4*sigma))
+    weights = np.exp(-0.5*(np.arange(-pad,pad+1)/sigma)**2)
+
+    return weights/weights.sum()
+
+def gaussianSmooth(a, sigma, axis=-1):
+    """Convolve a along axis with a Gaussian of standard deviation sigma (in bins), by FFT.
+    The kernel is sampled in bin space and truncated at 4 sigma, so that it is nonnegative
+    and smoothed nonnegative counts do not ring. Boundaries are mirrored over 4 sigma, so
+    that no mass is lost at the edges. Values further than 4 sigma from nonzero input are
+    exactly zero (no FFT round-off)"""
+
+    if sigma <= 0:
+        return a
+    weights = gaussianKernel(sigma)
+    pad = len(weights)//2
+    a = np.moveaxis(a,axis,-1)
+    n = a.shape[-1]
+    padded = np.pad(a,[(0,0)]*(a.ndim-1)+[(pad,pad)],mode='symmetric')
+    m = padded.shape[-1]
+    # kernel centered on index 0 of the periodic signal, wrapping only affects the padding
+    kernel = np.zeros(m)
+    kernel[:pad+1] = weights[pad:]
+    kernel[m-pad:] = weights[:pad]
+    smoothed = np.fft.irfft(np.fft.rfft(padded,axis=-1)*np.fft.rfft(kernel),n=m,axis=-1)
+
+    # support: within pad of nonzero values, from exact cumulative counts
+    nonzero = np.cumsum(padded != 0,axis=-1)
+    nonzero = np.concatenate([np.zeros(nonzero.shape[:-1]+(1,),dtype=nonzero.dtype),nonzero],axis=-1)
+    i = np.arange(pad,pad+n)
+    support = nonzero[...,np.minimum(i+pad+1,m)] > nonzero[...,i-pad]
+    smoothed = np.where(support,smoothed[...,pad:pad+n],0.)
+
+    return np.moveaxis(smoothed,-1,axis)
+
+def gridSpacing(ranks):
+    """Spacing of a regular grid of ranks on the inverse-log axis (e.g. rankGrid)"""
+
+    k = ranksToInvLog(ranks)
+    dk = np.diff(k[np.isfinite(k)])
+    if not np.allclose(dk,dk[0],rtol=1e-3):
+        raise ValueError('ranks are not regularly spaced on the inverse-log axis')
+
+    return dk[0]
+
+def smoothJointCounts(counts, xranks, yranks, bandwidth=0.1, adaptive=False, sensitivity=0.5,
+                      maxfactor=10., nlevels=8):
+    """
+    Gaussian kernel smoothing of joint counts (Ny,Nx) on regular inverse-log grids.
+
+    Arguments:
+        - bandwidth: standard deviation of the kernel in decades of the inverse-log
+        axis, (x,y) or same for both
+        - adaptive: widen the kernel where samples are sparse, by a factor
+        (pilot/g)**(-sensitivity) capped at maxfactor, where pilot is the fixed-kernel
+        estimate and g its geometric mean over samples (Abramson). Bins are grouped
+        into nlevels bandwidths and each group is smoothed separately, so that
+        total counts are conserved
+
+    Returns smoothed counts (Ny,Nx), with the same total as counts (within the
+    truncation of the kernel at 4 standard deviations).
+    """
+
+    bw_x, bw_y = np.broadcast_to(bandwidth,(2,))
+    sigma_x = bw_x/gridSpacing(xranks)
+    sigma_y = bw_y/gridSpacing(yranks)
+    counts = np.asarray(counts,dtype=float)
+
+    def smooth(a, factor=1.):
+        return gaussianSmooth(gaussianSmooth(a,factor*sigma_x,axis=1),factor*sigma_y,axis=0)
+
+    pilot = np.maximum(smooth(counts),0)
+    if not adaptive:
+        return pilot
+
+    # bandwidth factor of each bin, from the pilot density at its samples. The pilot of
+    # a bin with data is at least its own counts times the central kernel weight
+    has_data = counts > 0
+    center = gaussianKernel(sigma_x)[int(np.ceil(4*sigma_x))] if sigma_x > 0 else 1.
+    center *= gaussianKernel(sigma_y)[int(np.ceil(4*sigma_y))] if sigma_y > 0 else 1.
+    pilot = np.where(has_data,np.maximum(pilot,center*counts),pilot)
+    log_g = np.sum(counts[has_data]*np.log(pilot[has_data]))/counts.sum()
+    with np.errstate(divide='ignore'):
+        factor = np.clip(np.exp(-sensitivity*(np.log(pilot)-log_g)),1,maxfactor)
+    levels = np.geomspace(1,maxfactor,nlevels)
+    i_level = np.argmin(np.abs(np.log(factor)[...,None]-np.log(levels)),axis=-1)
+
+    smoothed = np.zeros_like(counts)
+    for i, level in enumerate(levels):
+        in_level = has_data & (i_level == i)
+        if np.any(in_level):
+            smoothed += smooth(np.where(in_level,counts,0.),level)
+
+    return np.maximum(smoothed,0)
+
+def computeJointKDE(x, y, xranks, yranks, bandwidth=0.1, adaptive=False, x_edges=None, y_edges=None,
+                    chunksize=CHUNKSIZE, processes=None, **kwargs):
+    """
+    Kernel density estimate of (x,y) on inverse-log rank bins centered on regular
+    grids xranks and yranks (e.g. rankGrid): samples are binned in chunks as in
+    computeJointHistogram, then counts are smoothed with smoothJointCounts (kwargs).
+
+    Returns smoothed counts and density, both (Ny,Nx), and the rank axes xranks
+    and yranks, ready for setFrameIL and showJointHistogram.
+    """
+
+    counts, _, xranks, yranks = computeJointHistogram(x,y,xranks,yranks,x_edges=x_edges,y_edges=y_edges,
+                                                      chunksize=chunksize,processes=processes)
+    smoothed = smoothJointCounts(counts,xranks,yranks,bandwidth=bandwidth,adaptive=adaptive,**kwargs)
+    density = countsToDensity(smoothed,xranks,yranks)
+
+    return smoothed, density, xranks, yranks
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module liveDistribution
+
+Incremental joint histograms and percentile curves for data streams (e.g. a
+running simulation), tied to the artists that display them.
+
+Each new batch of samples updates the accumulated state in O(batch): joint
+counts on fixed inverse-log bins (binned with jointDistribution), and a
+QuantileSketch for percentiles. A refresh only sets the data of the attached
+artists (QuadMesh of showJointHistogram, lines of showData or
+subplotRanksILog) and requests a redraw, the frame is never rebuilt.
+
+Bin edges in value space are fixed when the accumulator is created, from
+given edges or from a first batch of samples (outer edges are infinite, so
+that all later samples are counted).
+
+Example :
+
+live = LiveJointHistogram.fromSample(x0,y0,xranks,yranks)
+live.show(ax,scale='log',vmin=1e-2,vmax=1e2)
+for x,y in stream:
+    live.update(x,y)
+    live.refresh()
+
+For blitted refreshes, pass the artists to a frameTemplate.FrameTemplate and
+call template.update(*live.data()) instead of live.refresh().
+
+@author: bfildier
+"""
+
+#---- Modules ----#
+
+import numpy as np
+
+from distribution import QuantileSketch
+from jointDistribution import percentileEdges,countsToDensity,_jointCounts
+from frameTemplate import flattenArtists,setArtistData
+
+#---- Classes ----#
+
+class _LiveAccumulator():
+    """Attached artists and refresh, common to live accumulators"""
+
+    def attach(self, artists):
+        """Set artists (or handles containing them) updated on refresh"""
+
+        self.artists = flattenArtists(artists)
+
+        return self
+
+    def refresh(self, draw=True):
+        """Set current data to attached artists and request a redraw of their figures"""
+
+        data = self.data()
+        for artist, d in zip(self.artists,data):
+            setArtistData(artist,d)
+        if self.rescale:
+            for ax in {artist.axes for artist in self.artists}:
+                ax.relim()
+                ax.autoscale_view()
+        if draw:
+            for canvas in {artist.figure.canvas for artist in self.artists}:
+                canvas.draw_idle()
+
+class LiveJointHistogram(_LiveAccumulator):
+    """
+    Joint histogram of (x,y) accumulated over batches, on fixed value edges of
+    the rank bins centered on xranks and yranks.
+
+    Arguments:
+        - x_edges, y_edges: increasing bin edges in value space
+        - xranks, yranks: ranks (in %) of bin centers, for density and display
+        - density: show joint density of ranks (True) or counts (False)
+    """
+
+    def __init__(self, x_edges, y_edges, xranks, yranks, density=True):
+        self.x_edges = np.asarray(x_edges,dtype=float)
+        self.y_edges = np.asarray(y_edges,dtype=float)
+        self.xranks = xranks
+        self.yranks = yranks
+        self.density = density
+        self.counts = np.zeros((len(y_edges)-1,len(x_edges)-1),dtype=np.int64)
+        self.artists = []
+        self.rescale = False
+
+    @classmethod
+    def fromSample(cls, x, y, xranks, yranks, density=True):
+        """Accumulator with edges estimated on a first sample, which is counted"""
+
+        live = cls(percentileEdges(x,xranks),percentileEdges(y,yranks),xranks,yranks,density=density)
+
+        return live.update(x,y)
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def update(self, x, y):
+        """Add a batch of (x,y) samples"""
+
+        chunk_counts = _jointCounts((np.ravel(x),np.ravel(y),self.x_edges,self.y_edges))
+        self.counts += chunk_counts.reshape(self.counts.shape)
+
+        return self
+
+    def values(self):
+        """Current density (or counts), (Ny,Nx)"""
+
+        if self.density:
+            return countsToDensity(self.counts,self.xranks,self.yranks)
+        return self.counts
+
+    def data(self):
+
+        return [self.values()]
+
+    def show(self, ax, scale='linear', vmin=1e-3, vmax=1, cmap=None):
+        """Set inverse-log frame, show current values and attach the mesh"""
+
+        from plot2D import setFrameIL,showJointHistogram
+        setFrameIL(ax,self.xranks,self.yranks)
+        h = showJointHistogram(ax,self.values(),scale=scale,vmin=vmin,vmax=vmax,cmap=cmap,
+                               xranks=self.xranks,yranks=self.yranks)
+
+        return self.attach(h)
+
+class LiveQuantiles(_LiveAccumulator):
+    """
+    Percentiles at fixed ranks of values accumulated over batches, with relative
+    accuracy alpha (see distribution.QuantileSketch).
+
+    Arguments:
+        - ranks: ranks (in %) of the percentile curve, e.g. rankAxis.rankGrid(0,99.999)
+        - alpha: relative accuracy on percentiles
+        - rescale: autoscale axes to the curve on refresh
+    Attached lines must have one point per rank (not decimated).
+    """
+
+    def __init__(self, ranks, alpha=0.005, rescale=True, **kwargs):
+        self.ranks = np.asarray(ranks)
+        self.sketch = QuantileSketch(alpha=alpha,**kwargs)
+        self.artists = []
+        self.rescale = rescale
+
+    @property
+    def count(self):
+        return self.sketch.count
+
+    def update(self, values):
+        """Add a batch of values (any shape, NaNs ignored)"""
+
+        self.sketch.update(values)
+
+        return self
+
+    def values(self):
+        """Current percentiles at ranks"""
+
+        return self.sketch.quantiles(self.ranks)
+
+    def data(self):
+
+        return [self.values()]*len(self.artists)
+
+    def show(self, ax, rankmin=0, rankmax=99.999, **kwargs):
+        """Set inverse-log frame, show current percentiles and attach the curve"""
+
+        from plot1D import subplotRanksILog
+        ax_frame, h = subplotRanksILog(ax,self.ranks,self.values(),rankmin=rankmin,rankmax=rankmax,**kwargs)
+
+        return self.attach(h)
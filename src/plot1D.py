@@ -15,147 +15,219 @@ Includes new functions to
 
 #---- Modules ----#
 
-import matplotlib.pyplot as plt
 import numpy as np
-from math import log10,ceil
 from matplotlib.patches import Polygon
-from matplotlib.colors import LogNorm
+from matplotlib.colors import to_rgba_array
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
+
+import scaleInvLog # registers the 'invlog' scale
+from rankAxis import RankAxis,rankValues,decimateRanks
+from store import isEntry
+
+#---- Parameters ----#
+
+# curves with more points are decimated by default in showData
+DECIMATE_MIN_POINTS = 10**5
+# number of decimation columns per pixel of axes width, to allow for higher savefig dpi
+DECIMATE_OVERSAMPLING = 4
 
 #---- Functions ----#
 
 #-- Inverse logarithmic axes to display extremes with correct ticks
 #
-# The trick here is to duplicate the axis and rescale the background frame
-# so that the data, already correctly sampled on the transformed axis, can be displayed
-# independently from the figure frame
+# The axes use the 'invlog' scale registered in scaleInvLog, which maps ranks
+# onto -log10(1-ranks/100) and places ticks at 0, 90, 99, 99.9, etc. Data are
+# passed as ranks directly and frame, data and shadings share the same axes.
 #
-# Example : start with the setting the figure and duplicate y axis
+# Example :
 #
 # fig,ax = plt.subplots(figsize=(6,4.5))
-# ax_show = ax.twiny()
+# setFrame(ax,rankmin=0,rankmax=99.99)
+# showData(ax,ranks,values)
 
 
 #-- create inverse-log frame
 
 def setXaxisIL(ax,ranks,xtickrotation=0):
     
-    # define axes values
-    x = np.flipud(1./(1-ranks/100.))
-    Nx = len(x)
-    # display empty data
-    h = ax.plot(x,np.full((Nx,),np.nan))
-    ax.set_xscale('log')
-    # invert direction
-    ax.invert_xaxis()
+    # inverse-log scale, with its own ticks and labels
+    ax.set_xscale('invlog')
+    ax.set_xlim(ranks[0],ranks[-1])
     
     # axis position
     ax.xaxis.set_ticks_position('bottom')
-
-    # set xticks
-    xtick_pos = np.mod(np.round(np.log10(x),7),1) == 0
-    xticks = x[xtick_pos]
-    ks = np.round(np.log10(xticks),7)
-    xticklabels = np.array([("%%2.%1df"%max(0,k-2))%((1-10**(-k))*100) for k in np.flipud(ks)])
-    ax.set_xticks(xticks)
-    ax.set_xticklabels(xticklabels,rotation=xtickrotation)
-    # set labelpad
-    # ax.set_xlabel(labelpad=4.0)
+    ax.tick_params(axis='x',labelrotation=xtickrotation)
     
 def setYaxisIL(ax,ranks):
     
-    # define axes values
-    y = np.flipud(1./(1-ranks/100.))
-    Ny = len(y)
-    # display empty data
-    h = ax.plot(np.full((Ny,),np.nan),y)
-    ax.set_yscale('log')
-    # invert direction
-    ax.invert_yaxis()
+    # inverse-log scale, with its own ticks and labels
+    ax.set_yscale('invlog')
+    ax.set_ylim(ranks[0],ranks[-1])
     
     # axis position
     ax.yaxis.set_ticks_position('left')
 
-    # set xticks
-    ytick_pos = np.mod(np.log10(np.round(y,7)),1) == 0
-    yticks = y[ytick_pos]
-    ks = np.round(np.log10(yticks),7)    
-    yticklabels = np.array([("%%2.%1df"%max(0,k-2))%((1-10**(-k))*100) for k in np.flipud(ks)])
-    ax.set_yticks(yticks)
-    ax.set_yticklabels(yticklabels)
-
 def setFrame(ax,rankmin=0,rankmax=99.99,axisIL='x',xtickrotation=0):
     
-    #- duplicate axes for rescaling frame
-    ax_frame = ax.twiny()
-    
     # set ranks
-    k_min = -np.round(log10(1-rankmin/100))
-    k_max = -np.round(log10(1-rankmax/100))
-    dk = 0.1
-    scale_invlog = np.arange(k_min,k_max+dk,dk)
-    ranks_frame = (1 - np.power(10,-scale_invlog))*100
+    ranks_frame = RankAxis.grid(rankmin,rankmax)
     
     #- set axis
     if axisIL == 'x':
-        setXaxisIL(ax_frame,ranks_frame,xtickrotation=xtickrotation)
+        setXaxisIL(ax,ranks_frame,xtickrotation=xtickrotation)
     elif axisIL == 'y':
-        setXaxisIL(ax_frame,ranks_frame)
+        setYaxisIL(ax,ranks_frame)
         
-    return ax_frame
+    return ax
     
-def showData(ax,ranks,values,axisIL='x',rankmin=0,rankmax=99.99,**kwargs):
-    """Show data as it is, regardless of preset frame and ticks"""
+def decimationColumns(ax,axisIL='x'):
+    """Number of decimation columns along the inverse-log axis of ax"""
+
+    size = ax.bbox.width if axisIL == 'x' else ax.bbox.height
+
+    return int(np.ceil(size*DECIMATE_OVERSAMPLING))
+
+def showData(ax,ranks,values,axisIL='x',rankmin=0,rankmax=99.99,decimate=None,rankfull=None,
+             rasterized=None,**kwargs):
+    """Show data on inverse-logarithmic axis, with bounds rankmin and rankmax.
+    Curves are decimated with decimateRanks (min/max per pixel column on the
+    inverse-log axis) if decimate is True, or an int number of columns. By default
+    (None), curves longer than DECIMATE_MIN_POINTS are decimated. Ranks above
+    rankfull are always kept. Curves are rasterized in vector output if rasterized
+    is True (default set by rasterLayers.setRasterization)"""
+
+    from rasterLayers import rasterizeLayer
+
+    ranks = rankValues(ranks)
+    if decimate is None:
+        decimate = len(ranks) > DECIMATE_MIN_POINTS
+    if decimate is not False:
+        ncolumns = decimationColumns(ax,axisIL) if decimate is True else decimate
+        i_keep = decimateRanks(ranks,values,ncolumns,rankfull=rankfull)
+        ranks, values = np.asarray(ranks)[i_keep], np.asarray(values)[i_keep]
 
     if axisIL == 'x':
         
-        x = 1/(1-ranks/100.)
-        xmin = xmax = None
-        if rankmin is not None:
-            xmin = 1/(1-rankmin/100.)
-        if rankmax is not None:
-            xmax = 1/(1-rankmax/100.)
         # show
-        h = ax.plot(x,values,**kwargs)
-        # be careful that the x bounds are precisely the same as the background frame
+        h = ax.plot(ranks,values,**kwargs)
+        # log
+        ax.set_xscale('invlog')
+        # be careful that the x bounds are precisely the same as the frame
         ax.margins(x=0)
         # bounds
-        ax.set_xlim(xmin,xmax)
-        # log
-        ax.set_xscale ('log')
-        # remove ticks
-        ax.set_xticks([])
-        ax.set_xticks([], minor=True)
+        ax.set_xlim(rankmin,rankmax)
+        rasterizeLayer(h,rasterized)
         
         return h
 
     elif axisIL == 'y':
         
-        y = 1/(1-ranks/100.)
-        if rankmin is not None:
-            ymin = 1/(1-rankmin/100.)
-        if rankmax is not None:
-            ymax = 1/(1-rankmax/100.)
         # show
-        h = ax.plot(values,y,**kwargs)
-        # be careful that the y bounds are precisely the same as the background frame
+        h = ax.plot(values,ranks,**kwargs)
+        # log
+        ax.set_yscale('invlog')
+        # be careful that the y bounds are precisely the same as the frame
         ax.margins(y=0)
         # bounds
-        ax.set_ylim(ymin,ymax)
-        # log
-        ax.set_yscale ('log')
-        # remove ticks
-        ax.set_yticks([])
-        ax.set_yticks([], minor=True)
+        ax.set_ylim(rankmin,rankmax)
+        rasterizeLayer(h,rasterized)
 
         return h
 
+def showLineCollection(ax,segments,col=None,ltype=None,linewidth=None,alpha=None,labels=None):
+    """Draw all curves as a single LineCollection, with one color, line style, width
+    and alpha per curve. Labelled curves get an empty proxy line for legends.
+    Returns the collection and the list of legend handles"""
 
-def subplotRanksILog(ax,ranks,y,sl=slice(None,None),rankmin=0,rankmax=99.999,setframe=True,\
-                     col=None,ltype=None,linewidth=None,alpha=None,labels=None,offset=0,xtickrotation=0):
+    N = len(segments)
+    # per-curve styles, same defaults as individual curves
+    c = col if col is not None else ['k']*N
+    rgba = to_rgba_array(c)
+    if rgba.shape[0] == 1:
+        rgba = np.repeat(rgba,N,axis=0)
+    if alpha is not None:
+        rgba[:,3] = alpha
+    lt = ltype if isinstance(ltype,list) else [ltype if ltype is not None else '-']*N
+    lw = linewidth if linewidth is not None else 1.5
+    lw = np.broadcast_to(lw,(N,))
+    lc = LineCollection(segments,colors=rgba,linestyles=lt,linewidths=lw)
+    ax.add_collection(lc)
+    ax.autoscale_view()
+
+    # legend handles
+    h_all = []
+    if labels is not None:
+        for i in range(N):
+            if labels[i] is None:
+                continue
+            h = Line2D([],[],color=rgba[i],linestyle=lt[i],linewidth=lw[i],label=labels[i])
+            ax.add_line(h)
+            h_all.append(h)
+
+    return lc, h_all
+
+def showDataBatch(ax,ranks,values,axisIL='x',rankmin=0,rankmax=99.99,\
+                  col=None,ltype=None,linewidth=None,alpha=None,labels=None,rasterized=None):
+    """Show many curves at once on inverse-logarithmic axis, with a single artist.
+    ranks is either shared by all curves (1D array) or one array per curve.
+    The collection is rasterized in vector output if rasterized is True.
+    Returns the LineCollection and legend handles"""
+
+    from rasterLayers import rasterizeLayer
+
+    # stack all curves in one (N,n,2) array when they have the same length
+    ranks = rankValues(ranks)
+    if isinstance(ranks,np.ndarray) and ranks.ndim == 1:
+        ranks = np.broadcast_to(ranks,(len(values),ranks.size))
+    try:
+        r = np.asarray(ranks,dtype=float)
+        v = np.asarray(values,dtype=float)
+        pts = (r,v) if axisIL == 'x' else (v,r)
+        segments = np.stack(pts,axis=-1)
+    except ValueError:
+        pts = zip(ranks,values) if axisIL == 'x' else zip(values,ranks)
+        segments = [np.column_stack([a,b]) for a,b in pts]
+
+    lc, h_all = showLineCollection(ax,segments,col=col,ltype=ltype,linewidth=linewidth,
+                                   alpha=alpha,labels=labels)
+
+    # set scale and bounds once for all curves
+    if axisIL == 'x':
+        ax.set_xscale('invlog')
+        ax.margins(x=0)
+        ax.set_xlim(rankmin,rankmax)
+    elif axisIL == 'y':
+        ax.set_yscale('invlog')
+        ax.margins(y=0)
+        ax.set_ylim(rankmin,rankmax)
+    rasterizeLayer(lc,rasterized)
+
+    return lc, h_all
+
+
+def subplotRanksILog(ax,ranks,y=None,sl=slice(None,None),rankmin=0,rankmax=99.999,setframe=True,\
+                     col=None,ltype=None,linewidth=None,alpha=None,labels=None,offset=0,xtickrotation=0,
+                     batch=False,rasterized=None):
     """Display one or several curves on inverse=logarithmic axis.
-    To allow successive use of this method, set frame based on rankmin and rankmax, duplicate axis for frame, and use
-    axes given in argument to display curve"""
+    To allow successive use of this method, the frame is set based on rankmin and rankmax on the axes
+    given in argument, which is returned as ax_frame.
+    With batch=True, a list of curves is drawn as a single LineCollection (for large ensembles)
+    and the handles returned are the collection and the legend handles of labelled curves.
+    With rasterized=True, all curves are rasterized together in vector output, the frame is not.
+    ranks can also be a 'percentiles' entry of a store.DistributionStore, with y None"""
+
+    from rasterLayers import rasterizeLayer
     
+    #- curves from store entry, one per row of 2D percentiles
+    if isEntry(ranks,'percentiles'):
+        ranks, y = ranks['ranks'], ranks['percentiles']
+        if y.ndim > 1:
+            ranks, y = [ranks]*len(y), list(y)
+    # shared rank axis for a list of curves
+    if isinstance(ranks,RankAxis) and isinstance(y,list):
+        ranks = [ranks.ranks]*len(y)
+
     #- set frame
     ax_frame = None
     if setframe:
@@ -165,7 +237,11 @@ def subplotRanksILog(ax,ranks,y,sl=slice(None,None),rankmin=0,rankmax=99.999,set
     # init handle list
     h_all = []
     # show
-    if isinstance(y,list):
+    if isinstance(y,list) and batch:
+        h_all = showDataBatch(ax,ranks,y,axisIL='x',rankmin=rankmin,rankmax=rankmax,col=col,
+                              ltype=ltype,linewidth=linewidth,alpha=alpha,labels=labels,
+                              rasterized=rasterized)
+    elif isinstance(y,list):
         for i in range(len(y)):
             lab = None
             if labels is not None:
@@ -174,10 +250,11 @@ def subplotRanksILog(ax,ranks,y,sl=slice(None,None),rankmin=0,rankmax=99.999,set
             a = alpha[i] if alpha is not None else 1
             c = col[i] if col is not None else 'k'
             lw = linewidth[i] if linewidth is not None else 1.5
-            h = showData(ax,ranks[i],y[i],axisIL='x',rankmin=rankmin,rankmax=rankmax,c=c,alpha=a,linestyle=lt,linewidth=lw,label=lab)
+            h = showData(ax,ranks[i],y[i],axisIL='x',rankmin=rankmin,rankmax=rankmax,rasterized=False,c=c,alpha=a,linestyle=lt,linewidth=lw,label=lab)
             h_all.append(h)
+        rasterizeLayer(h_all,rasterized)
     else:
-        h_all = showData(ax,ranks,y,axisIL='x',rankmin=rankmin,rankmax=rankmax,c=col,alpha=alpha,linestyle=ltype,linewidth=linewidth,label=labels)
+        h_all = showData(ax,ranks,y,axisIL='x',rankmin=rankmin,rankmax=rankmax,rasterized=rasterized,c=col,alpha=alpha,linestyle=ltype,linewidth=linewidth,label=labels)
 
     return ax_frame, h_all
 
@@ -186,7 +263,7 @@ def addXHatch(ax,ranks,i_xlim,color='gray',hatch='//',
     alpha=1,fill=False,closed=True,**kwargs):
     """Add vertical shading"""
 
-    x = 1/(1-ranks/100.)
+    x = ranks
     
     ax.add_patch(Polygon([[x[i_xlim[0]], ax.get_ylim()[0]],\
                           [x[i_xlim[1]], ax.get_ylim()[0]],\
@@ -199,7 +276,7 @@ def addYHatch(ax,ranks,i_ylim,color='gray',hatch='//',
     alpha=1,fill=False,**kwargs):
     """Add horizontal shading"""
 
-    y = 1/(1-ranks/100.)
+    y = ranks
     
     ax.add_patch(Polygon([[ax.get_xlim()[0],y[i_ylim[0]]],\
                           [ax.get_xlim()[0],y[i_ylim[1]]],\
@@ -6,11 +6,13 @@ Functions to plot curves on inverse-logarithmic x-axis (extremes).
 
 #---- Modules ----#
 
-import matplotlib.pyplot as plt
 import numpy as np
 from math import log10,ceil
 from matplotlib.patches import Polygon
-from matplotlib.colors import LogNorm
+
+from plot1D import showLineCollection,decimationColumns,DECIMATE_MIN_POINTS
+from rankAxis import decimateRanks,invLogCoordinates
+from store import isEntry
 
 
 #---- Functions ----#
@@ -39,12 +41,29 @@ def renameYaxisIL(ax,y,offset=0):
             break
     ax.set_yticklabels(labels)
 
-def subplotRanksILog(ax,ranks,y,sl=slice(None,None),rankmin=None,rankmax=None,
+def subplotRanksILog(ax,ranks,y=None,sl=slice(None,None),rankmin=None,rankmax=None,
     col=None,ltype=None,linewidth=None,alpha=None,
-    labels=None,renameX=True,offset=0):
+    labels=None,renameX=True,offset=0,batch=False,decimate=None,rasterized=None):
+    """With batch=True, a list of curves sharing ranks is drawn as a single
+    LineCollection, and the collection and legend handles are returned.
+    Single curves are decimated as in plot1D.showData (decimate: None for
+    automatic, True, False or number of columns). Curves are rasterized
+    together in vector output if rasterized is True. ranks can also be a
+    'percentiles' entry of a store.DistributionStore, with y None"""
+
+    from rasterLayers import rasterizeLayer
     
+    h_all = None
+
+    if isEntry(ranks,'percentiles'):
+        ranks, y = ranks['ranks'], ranks['percentiles']
+        if y.ndim > 1:
+            y = list(y)
+
     ax.set_xscale('log')
 
+    x = invLogCoordinates(ranks)
+    ranks = np.asarray(ranks)
     if rankmin is not None:
         i_min = np.where(ranks >= rankmin)[0][0]
     else:
@@ -56,10 +75,16 @@ def subplotRanksILog(ax,ranks,y,sl=slice(None,None),rankmin=None,rankmax=None,
 
     sl = slice(i_min,i_max)
 
-    # define x-axis
-    x = 1/(1-ranks/100.)
     # plot
-    if isinstance(y,list):
+    if isinstance(y,list) and batch:
+        # all curves transformed at once into a (N,n,2) array
+        Y = np.asarray([y_i[sl] for y_i in y],dtype=float)
+        segments = np.stack(np.broadcast_arrays(x[sl][None,:],Y),axis=-1)
+        h_all = showLineCollection(ax,segments,col=col,ltype=ltype,linewidth=linewidth,
+                                   alpha=alpha,labels=labels)
+        rasterizeLayer(h_all[0],rasterized)
+    elif isinstance(y,list):
+        h_data = []
         for i in range(len(y)):
             lab = None
             if labels is not None:
@@ -68,20 +93,31 @@ def subplotRanksILog(ax,ranks,y,sl=slice(None,None),rankmin=None,rankmax=None,
             a = alpha[i] if alpha is not None else 1
             c = col[i] if col is not None else 1
             lw = linewidth[i] if linewidth is not None else 1.5
-            ax.plot(x[sl],y[i][sl],c=c,alpha=a,linestyle=lt,linewidth=lw,label=lab)
+            h_data.append(ax.plot(x[sl],y[i][sl],c=c,alpha=a,linestyle=lt,linewidth=lw,label=lab))
+        rasterizeLayer(h_data,rasterized)
     else:
-        ax.plot(x[sl],y[sl],c=col,alpha=alpha,linestyle=ltype,linewidth=linewidth,label=labels)
+        x_sl, y_sl = x[sl], y[sl]
+        if decimate is None:
+            decimate = x_sl.size > DECIMATE_MIN_POINTS
+        if decimate is not False:
+            ncolumns = decimationColumns(ax) if decimate is True else decimate
+            i_keep = decimateRanks(ranks[sl],y_sl,ncolumns)
+            x_sl, y_sl = x_sl[i_keep], y_sl[i_keep]
+        h_data = ax.plot(x_sl,y_sl,c=col,alpha=alpha,linestyle=ltype,linewidth=linewidth,label=labels)
+        rasterizeLayer(h_data,rasterized)
 
     # transform x-axis
     if renameX:
         renameXaxisIL(ax,x[sl],offset=offset)
+
+    return h_all
     
 def subplotYShadingRanksILog(ax,ranks,y_BCs,col,alpha=0.2,renameX=False):
     
     ax.set_xscale('log')
     
     # define x-axis
-    x = 1./(1-ranks/100.)
+    x = invLogCoordinates(ranks)
     # plot
     y1 = y_BCs[0]
     y2 = y_BCs[1]
@@ -101,7 +137,7 @@ def subplotXShadingRanksILog(ax,ranks,iQ_lims,alpha=0.2,col='0.75',renameX=False
     ax.set_xscale('log')
     
     # define x-axis
-    x = 1./(1-ranks/100.)
+    x = invLogCoordinates(ranks)
     if iQ_lims[0] >= x.size:
         return
     x0 = x[iQ_lims[0]]
@@ -121,7 +157,7 @@ def addXHatchRanksILog(ax,ranks,iQ_lims,color='gray',hatch='//',
 
     ax.set_xscale('log')
 
-    x = 1./(1-ranks/100.)
+    x = invLogCoordinates(ranks)
     ax.add_patch(Polygon([[x[iQ_lims[0]], ax.get_ylim()[0]],\
                           [x[iQ_lims[1]], ax.get_ylim()[0]],\
                           [x[iQ_lims[1]], ax.get_ylim()[1]],\
@@ -164,7 +200,7 @@ def add1to1Line(ax):
 
 def highlightPointRanksILog(ax,pt):
 
-    x_pt = 1./(1-pt[0]/100)
+    x_pt = invLogCoordinates(pt[0])
     y_pt = pt[1]
     # y axis, linear
     ylims = ax.get_ylim()
@@ -15,165 +15,360 @@ Includes functions to
 
 #---- Modules ----#
 
-from scipy.interpolate import griddata,interp2d
 import numpy as np
-import matplotlib.pyplot as plt
 from matplotlib import colors
 from matplotlib.colors import LogNorm
 
-# ## Plot vertical data (transect, or vertical profiles over time)
-# def subplotVerticalData(ax,x,y,Z,cmap=plt.cm.seismic,vmin=None,vmax=None,cbar=True):
-    
-#     """Arguments:
-#         - x and y are coordinate values
-#         - Z are the data values flattened"""
-    
-#     xs0,ys0 = np.meshgrid(x,y)
-#     xmin = min(x[0],x[-1])
-#     xmax = max(x[0],x[-1])
-#     ymin = min(y[0],y[-1])
-#     ymax = max(y[0],y[-1])
-#     X0 = np.vstack([xs0.flatten(),ys0.flatten()]).T
-  
-#     extent = (xmax,xmin,ymin,ymax)
-
-#     # New coordinates
-#     xs,ys = np.meshgrid(np.linspace(xmin,xmax,num=len(x)),
-#                         np.linspace(ymin,ymax,num=len(y)))
-#     X = np.vstack([xs.flatten(),ys.flatten()]).T
-
-#     # New values
-#     resampled = griddata(X0,Z,X, method='cubic')
-#     resampled_2D = np.reshape(resampled,xs.shape)
-
-#     im = ax.imshow(np.flipud(resampled_2D),extent=extent,interpolation='bilinear',
-#                    cmap=cmap,vmin=vmin,vmax=vmax,aspect='auto',origin='upper')
-#     if cbar:
-#         plt.colorbar(im,ax=ax)
-    
-#     if y[0] > y[-1]:
-#         plt.gca().invert_yaxis()
+import scaleInvLog # registers the 'invlog' scale
+from rankAxis import RankAxis,meshEdges
+from regrid import getRegridder,getTriangulationRegridder
+from store import isEntry
 
+#---- Parameters ----#
 
+# number of values normalized at once by MidpointNormalize, to stay in cache
+NORM_BLOCKSIZE = 2**16
 
 #---- Functions ----#
 
 
 #---- Transect or transformed x coordinate
 
+def verticalDataRegridder(x,y):
+    """Triangulation regridder from the (x,y) grid onto a regular grid of the same size"""
+
+    xs0,ys0 = np.meshgrid(x,y)
+    xmin = min(x[0],x[-1])
+    xmax = max(x[0],x[-1])
+    ymin = min(y[0],y[-1])
+    ymax = max(y[0],y[-1])
+    X0 = np.vstack([xs0.flatten(),ys0.flatten()]).T
+
+    # New coordinates
+    xs,ys = np.meshgrid(np.linspace(xmin,xmax,num=len(x)),
+                        np.linspace(ymin,ymax,num=len(y)))
+    X = np.vstack([xs.flatten(),ys.flatten()]).T
+
+    return getTriangulationRegridder(X0,X)
+
+def resampleVerticalData(x,y,Z):
+    """Resample Z on a regular grid, with shape (...,N) where N = len(x)*len(y) are the
+    flattened data values (e.g. (time,N) for a whole time series at once).
+    Returns an array of shape (...,len(y),len(x))"""
+
+    resampled = verticalDataRegridder(x,y)(Z)
+
+    return np.reshape(resampled,resampled.shape[:-1]+(len(y),len(x)))
+
+## Plot vertical data (transect, or vertical profiles over time)
+def subplotVerticalData(ax,x,y,Z,cmap='seismic',vmin=None,vmax=None,cbar=True,rasterized=None):
+    
+    """Arguments:
+        - x and y are coordinate values
+        - Z are the data values flattened
+        - rasterized: rasterize image in vector output (default set by rasterLayers.setRasterization)
+    The triangulation is cached, so that successive calls on the same coordinates
+    only interpolate the new values."""
+
+    from rasterLayers import rasterizeLayer
+    
+    xmin = min(x[0],x[-1])
+    xmax = max(x[0],x[-1])
+    ymin = min(y[0],y[-1])
+    ymax = max(y[0],y[-1])
+    extent = (xmax,xmin,ymin,ymax)
+
+    # New values
+    resampled_2D = resampleVerticalData(x,y,Z)
+
+    im = ax.imshow(np.flipud(resampled_2D),extent=extent,interpolation='bilinear',
+                   cmap=cmap,vmin=vmin,vmax=vmax,aspect='auto',origin='upper')
+    rasterizeLayer(im,rasterized)
+    if cbar:
+        ax.figure.colorbar(im,ax=ax)
+    
+    if y[0] > y[-1]:
+        ax.invert_yaxis()
+
+    return im
+
 # set the colormap and centre the colorbar
 class MidpointNormalize(colors.Normalize):
     """
     Normalise the colorbar so that diverging bars work their way either side from a prescribed midpoint value)
 
     e.g. im=ax1.imshow(array, norm=MidpointNormalize(midpoint=0.,vmin=-100, vmax=100))
+
+    Values are mapped in closed form, piecewise linearly from [vmin,midpoint] onto
+    [0,0.5] and from [midpoint,vmax] onto [0.5,1] (midpoint defaults to the center).
+    The result is written into out if given (a preallocated array, or the input
+    array itself to normalize in place). Masked values stay masked, NaNs stay NaN,
+    and values outside [vmin,vmax] map outside [0,1] (under/over colors) unless clip.
     """
     def __init__(self, vmin=None, vmax=None, midpoint=None, clip=False):
         self.midpoint = midpoint
         colors.Normalize.__init__(self, vmin, vmax, clip)
 
-    def __call__(self, value, clip=None):
-        # I'm ignoring masked values and all kinds of edge cases to make a
-        # simple example...
-        x, y = [self.vmin, self.midpoint, self.vmax], [0, 0.5, 1]
-        return np.ma.masked_array(np.interp(value, x, y), np.isnan(value))
+    def _forward(self, data, out):
+        """Data to the space where normalization is linear, into out"""
+
+        if not np.may_share_memory(out,data):
+            np.copyto(out,data,casting='unsafe')
+
+        return out
+
+    def _backward(self, a):
+
+        return a
+
+    def autoscale_None(self, A):
+        """Set unset vmin and vmax to the range of valid values of A"""
+
+        # new mask on the same data, the mask of A is not modified
+        data = np.ma.getdata(A)
+        mask = np.ma.getmaskarray(A) | ~np.isfinite(data)
+        super().autoscale_None(np.ma.array(data,mask=mask,copy=False))
+
+    def _limits(self):
+        """vmin, midpoint and vmax in the space where normalization is linear"""
+
+        vmin, vmax = self._forward(np.array([self.vmin,self.vmax],dtype=float),np.empty(2))
+        if self.midpoint is None:
+            mid = (vmin+vmax)/2
+        else:
+            mid = self._forward(np.array(self.midpoint,dtype=float),np.empty(()))[()]
+        if not vmin <= mid <= vmax:
+            raise ValueError("vmin <= midpoint <= vmax is required")
+
+        return vmin, mid, vmax
+
+    def _normalize(self, data, out):
+        """Normalize flat data into flat out, by blocks that fit in cache"""
+
+        vmin, mid, vmax = self._limits()
+        with np.errstate(divide='ignore',invalid='ignore'):
+            lo, hi = 0.5/(mid-vmin), 0.5/(vmax-mid)
+            tmp = np.empty(min(NORM_BLOCKSIZE,out.size),dtype=out.dtype)
+            for i0 in range(0,out.size,NORM_BLOCKSIZE):
+                o = self._forward(data[i0:i0+NORM_BLOCKSIZE],out[i0:i0+NORM_BLOCKSIZE])
+                if vmin == vmax:
+                    o[...] = 0
+                    continue
+                o -= mid
+                if np.isfinite(lo) and np.isfinite(hi):
+                    # branchless: lo*min(o,0)+hi*max(o,0)
+                    t = np.minimum(o,0,out=tmp[:len(o)])
+                    np.maximum(o,0,out=o)
+                    o *= hi
+                    t *= lo
+                    o += t
+                else:
+                    o[...] = np.where(o < 0,o*lo,o*hi)
+                o += 0.5
+
+    def __call__(self, value, clip=None, out=None):
+
+        if clip is None:
+            clip = self.clip
+        mask = np.ma.getmask(value)
+        data = np.ma.getdata(value)
+        if self.vmin is None or self.vmax is None:
+            self.autoscale_None(value)
+
+        if out is None:
+            out = np.empty(np.shape(data),dtype=np.result_type(data,np.float32))
+        contiguous = out.flags.c_contiguous
+        flat = out.reshape(-1) if contiguous else np.empty(out.size,dtype=out.dtype)
+        self._normalize(np.ravel(data),flat)
+        if not contiguous:
+            out[...] = flat.reshape(out.shape)
+        if clip:
+            np.clip(out,0,1,out=out)
+
+        if out.ndim == 0:
+            return out[()]
+        return np.ma.array(out,mask=mask,copy=False)
+
+    def inverse(self, value):
+
+        vmin, mid, vmax = self._limits()
+        d = np.array(np.ma.getdata(value),dtype=float)
+        d *= 2
+        d -= 1
+        out = np.minimum(d,0)
+        out *= mid-vmin
+        np.maximum(d,0,out=d)
+        d *= vmax-mid
+        out += d
+        out += mid
+        out = self._backward(out)
+
+        if out.ndim == 0:
+            return out[()]
+        return np.ma.array(out,mask=np.ma.getmask(value))
+
+class MidpointLogNorm(MidpointNormalize):
+    """
+    MidpointNormalize on log10 of values, for positive data shown with LogNorm
+    (e.g. joint densities diverging around 1). Values <= 0 are NaN (bad color).
+    Colorbars have a log scale, like those of LogNorm.
+    """
+    def __init__(self, vmin=None, vmax=None, midpoint=None, clip=False):
+        from matplotlib.scale import LogScale
+        MidpointNormalize.__init__(self, vmin, vmax, midpoint, clip)
+        self._scale = LogScale(axis=None)
+
+    def _forward(self, data, out):
+
+        np.log10(data,out=out,casting='unsafe')
+        out[np.isneginf(out)] = np.nan
+
+        return out
 
-def subplotSmooth2D(ax,x,y,Z,fplot='contourf',xmin=None,xmax=None,nx=50,nlev=50,vmin=None,vmax=None,**kwargs):
+    def _backward(self, a):
+
+        return 10**a
+
+    def autoscale_None(self, A):
+
+        super().autoscale_None(np.ma.masked_less_equal(A,0))
+
+def histogramNorm(scale='linear', vmin=1e-3, vmax=1, midpoint=None):
+    """Norm of histogram values for scale 'linear' or 'log', diverging around midpoint if given"""
+
+    if scale == 'linear':
+        if midpoint is not None:
+            return MidpointNormalize(vmin=vmin,vmax=vmax,midpoint=midpoint)
+        return colors.Normalize(vmin=vmin,vmax=vmax)
+    elif scale == 'log':
+        if midpoint is not None:
+            return MidpointLogNorm(vmin=vmin,vmax=vmax,midpoint=midpoint)
+        return LogNorm(vmin=vmin,vmax=vmax)
+
+    raise ValueError("unknown scale '%s', 'linear' or 'log'"%scale)
+
+def subplotSmooth2D(ax,x,y,Z,fplot='contourf',xmin=None,xmax=None,nx=50,nlev=50,vmin=None,vmax=None,
+                    regridder=None,rasterized=None,**kwargs):
     """
     Plot 2D contours (exact method is defined by fplot) with user-defined Z-range and x range.
+    Z is interpolated onto nx+1 points between xmin and xmax by a Regridder, whose weights are
+    reused across calls on the same (x,xmin,xmax,nx) grid; a regridder can also be passed directly.
+    Contours are rasterized in vector output if rasterized is True (default set by
+    rasterLayers.setRasterization), axes and labels stay vector graphics.
     """
+
+    from rasterLayers import rasterizeLayer
     
     # set levels
     levels = nlev
     if vmin is not None and vmax is not None:
         levels = np.linspace(vmin,vmax,nlev+1)
     
-    # only keep x_values where Z is not a nan
-    notanan_x = np.any(~np.isnan(Z)&np.isfinite(Z),axis=0)
-    notanan2d = np.vstack([notanan_x[None,:]]*Z.shape[0])
-    x_valid = x[notanan_x]
-    y_valid = y
-    Nx,Ny = len(x_valid), len(y_valid)
-    Z_valid=Z[notanan2d].reshape(Ny,Nx)
-
-    if xmin is not None and xmax is not None:
-        x_new = np.linspace(xmin,xmax,nx+1)
-        f_interp = interp2d(x_valid,y_valid,Z_valid,kind='cubic')
-        Z_new = f_interp(x_new,y_valid)
-    # else:
-    #     x_new = x_valid
-    X,Y = np.meshgrid(x_new,y_valid)
-
-
-    # remove values outside xrange
-    X_out = np.logical_or(X < np.nanmin(x_valid),X > np.nanmax(x_valid))
-    Z_new[X_out] = np.nan
+    if regridder is None and xmin is not None and xmax is not None:
+        regridder = getRegridder(x,np.linspace(xmin,xmax,nx+1))
+
+    if regridder is not None:
+        # interpolate on new x values, skipping x values where Z is all nan
+        x_new = regridder.x_new
+        Z_new = regridder(Z)
+    else:
+        # only keep x_values where Z is not a nan
+        notanan_x = np.any(np.isfinite(Z),axis=0)
+        x_new = x[notanan_x]
+        Z_new = Z[:,notanan_x]
+    X,Y = np.meshgrid(x_new,y)
 
     # plot
-    return getattr(ax,fplot)(X,Y,Z_new,levels=levels,**kwargs)
+    h = getattr(ax,fplot)(X,Y,Z_new,levels=levels,**kwargs)
+    rasterizeLayer(h,rasterized)
+
+    return h
 
 
 #---- 2D joint PDFs
 
 def computeTickLabels(xranks):
+    """Positions 1/(1-ranks/100) and labels of ticks at whole decades of xranks
+    (array or RankAxis), memoized on the range of the grid"""
     
-    # nonlinear transformation of ranks
-    x = np.flipud(1./(1-xranks/100.))
-    # linear scale
-    k_all = np.log10(np.round(x,5))
-    # tick positions
-    xtick_pos = np.mod(k_all,1) == 0
+    if not isinstance(xranks,RankAxis):
+        xranks = RankAxis(xranks)
+    # ranks and labels of ticks at 0, 90, 99, ...
+    tick_ranks, labels = xranks.ticks(mindigits=1)
     # positions of ticks on transformed axis
-    xticks = x[xtick_pos]
-    # linear ranks of ticks
-    ks = k_all[xtick_pos]
-    # n_digits in final tick labels
-    ndigits = [int(max(k-2,1)) for k in ks]
-    # labels
-    xlab_floats = np.array(xranks[xtick_pos])
-    # convert labels to strings
-    xticklabels = np.array([('%'+('2.%d'%ndig)+'f')%s for ndig,s in zip(np.flipud(ndigits),xlab_floats)])
+    xticks = 1./(1-tick_ranks/100.)
     
-    return xticks, xticklabels
+    return xticks, np.array(labels)
 
 def setFrameIL(ax,xranks,yranks,aspect='1'):
     """Set inverse-logarithmic axes on x and y axes"""
     
     ##-- create inverse-log frame
-    # define axes values
-    x = np.flipud(1./(1-xranks/100.))
-    y = np.flipud(1./(1-yranks/100.))
-    Nx = len(x)
-    Ny = len(y)
-    # h = subplotSmooth2D(ax,x,y,Z,fplot='contourf',xmin=ymin,xmax=ymin,nx=50,nlev=50,vmin=None,vmax=None)
-    ax.matshow(np.full((Nx,Ny),np.nan),origin='lower',extent=[x[0],x[-1],y[0],y[-1]],aspect=aspect)
-    ax.set_xscale('log')
-    ax.set_yscale('log')
+    # inverse-log scales, with their own ticks and labels
+    ax.set_xscale('invlog',mindigits=1)
+    ax.set_yscale('invlog',mindigits=1)
+    ax.set_xlim(xranks[0],xranks[-1])
+    ax.set_ylim(yranks[0],yranks[-1])
+    ax.set_aspect(aspect)
     # axes labels and positions
     ax.xaxis.set_ticks_position('bottom')
 
-    # set xticks
-    xticks, xticklabels = computeTickLabels(xranks)
-    ax.set_xticks(xticks)
-    ax.set_xticklabels(xticklabels)
-
-    # set yticks
-    yticks, yticklabels = computeTickLabels(yranks)
-    ax.set_yticks(yticks)
-    ax.set_yticklabels(yticklabels)
-
     return ax
 
 
-def showJointHistogram(ax,values,scale='linear',vmin=1e-3,vmax=1,cmap=None):
-    """Show matrix data as it is, regardless of preset frame and ticks"""
-
-    if scale == 'linear':
-        h = ax.matshow(values,vmin=vmin,vmax=vmax,origin='lower',cmap=cmap)
-    elif scale == 'log':
-        h = ax.matshow(values,norm=LogNorm(vmin=vmin,vmax=vmax),origin='lower',cmap=cmap)
+def showJointHistogram(ax,values,scale='linear',vmin=1e-3,vmax=1,cmap=None,xranks=None,yranks=None,
+                       rasterized=None,midpoint=None):
+    """Show matrix data as it is, regardless of preset frame and ticks.
+    If xranks and yranks (bin centers or edges) are given, show data on the
+    inverse-logarithmic frame set by setFrameIL on the same axes instead.
+    The histogram is rasterized in vector output if rasterized is True.
+    values can also be a 'joint' entry of a store.DistributionStore, whose
+    density (or counts if not stored) is shown on its rank axes.
+    If midpoint is given, a diverging colormap is centered on it (MidpointNormalize,
+    or MidpointLogNorm for scale 'log')"""
+
+    from rasterLayers import rasterizeLayer
+
+    if isEntry(values,'joint'):
+        xranks, yranks = values['xranks'], values['yranks']
+        values = values['density'] if 'density' in values else values['counts']
+
+    norm = histogramNorm(scale,vmin,vmax,midpoint)
+
+    if xranks is not None and yranks is not None:
+        
+        Ny,Nx = values.shape
+        x_edges = meshEdges(xranks,Nx)
+        y_edges = meshEdges(yranks,Ny)
+        h = ax.pcolormesh(x_edges,y_edges,values,norm=norm,cmap=cmap)
+        ax.set_xscale('invlog',mindigits=1)
+        ax.set_yscale('invlog',mindigits=1)
+        rasterizeLayer(h,rasterized)
+        
+        return h
+
+    h = ax.matshow(values,norm=norm,origin='lower',cmap=cmap)
+    rasterizeLayer(h,rasterized)
 
     ax.set_xticks([])
     ax.set_yticks([])
 
-    return h
\ No newline at end of file
+    return h
+
+
+def showJointHistogramLOD(ax,counts,xranks,yranks,scale='linear',vmin=1e-3,vmax=1,cmap=None,density=True,
+                          oversampling=1.,midpoint=None):
+    """Show large joint counts on the inverse-logarithmic frame set by setFrameIL, drawing
+    only the level of detail and window matching the current view (see histogramPyramid).
+    Values are the joint density of ranks, or mean counts per bin if density is False.
+    Returns the PyramidView, whose mesh is rebuilt when axes limits change"""
+
+    from histogramPyramid import HistogramPyramid,PyramidView
+
+    norm = histogramNorm(scale,vmin,vmax,midpoint)
+
+    ax.set_xscale('invlog',mindigits=1)
+    ax.set_yscale('invlog',mindigits=1)
+    pyramid = HistogramPyramid(counts,xranks,yranks,density=density)
+
+    return PyramidView(ax,pyramid,norm=norm,cmap=cmap,oversampling=oversampling)
@@ -1,11 +1,24 @@
 
-import matplotlib.pyplot as plt
 import matplotlib.colors as colors
+from matplotlib import colormaps
 import matplotlib.cm as cmx
 import numpy as np
 
+from plot1D import showLineCollection
+from store import isEntry
 
-def subplotConditionalProfiles(ax,z,profiles,refbins=[0],refmin=None,refmax=None,ls='-',labels=None,normfunction='Normalize'):
+
+def subplotConditionalProfiles(ax,z,profiles=None,refbins=[0],refmin=None,refmax=None,ls='-',labels=None,normfunction='Normalize',
+                               rasterized=None):
+    """Show profiles (z,Nprof) colored by their reference values refbins, as a single
+    LineCollection, rasterized in vector output if rasterized is True.
+    z can also be a 'profiles' entry of a store.DistributionStore, with profiles None.
+    Returns the collection and legend handles of labelled profiles"""
+
+    from rasterLayers import rasterizeLayer
+
+    if isEntry(z,'profiles'):
+        z, profiles, refbins = z['z'], z['profiles'], z['refbins']
     
     # Number of profiles
     Nprof = 1
@@ -17,59 +30,57 @@ def subplotConditionalProfiles(ax,z,profiles,refbins=[0],refmin=None,refmax=None
     if refmax is None: refmax = refbins[-1]
     
     # Color scale
-    colorInd = range(Nprof)
-    cm = plt.get_cmap('Spectral')
+    cm = colormaps['Spectral']
     cNorm = getattr(colors,normfunction)(vmin=refmin, vmax=refmax)
     scalarMap = cmx.ScalarMappable(norm=cNorm, cmap=cm)
+    colorVals = scalarMap.to_rgba(np.asarray(refbins[:Nprof],dtype=float))
+
+    # Plot all profiles at once, first bin on top
+    profiles_2D = np.reshape(profiles,(len(z),Nprof))
+    segments = np.stack(np.broadcast_arrays(profiles_2D.T,np.asarray(z)[None,:]),axis=-1)
+    if labels is not None: # suppose it's a list of the right size
+        labels = list(labels)[::-1]
+
+    lc, h_all = showLineCollection(ax,segments[::-1],col=colorVals[::-1],ltype=ls,labels=labels)
+    rasterizeLayer(lc,rasterized)
+
+    return lc, h_all
+
+def subplotDistributions(ax,distributions,perc,refbins=[0],refmin=None,refmax=None,ls='-',labels=None,normfunction='Normalize',
+                          rasterized=None):
+    """Show distributions (Nperc,Nd), values at percentiles perc in each of the Nd bins
+    of a reference variable, colored by their reference values refbins, as a single
+    LineCollection (e.g. percentiles[:,i,:] of condStats.computeConditionalStatistics).
+    Returns the collection and legend handles of labelled distributions"""
+
+    from rasterLayers import rasterizeLayer
+
+    # Number of distributions
+    Nd = 1
+    if len(distributions.shape) > 1:
+        Nd = distributions.shape[1]
+
+    # min-max for refvariable
+    if refmin is None: refmin = refbins[0]
+    if refmax is None: refmax = refbins[-1]
+
+    # Color scale
+    cm = colormaps['Spectral']
+    cNorm = getattr(colors,normfunction)(vmin=refmin, vmax=refmax)
+    scalarMap = cmx.ScalarMappable(norm=cNorm, cmap=cm)
+    colorVals = scalarMap.to_rgba(np.asarray(refbins[:Nd],dtype=float))
+
+    # Plot all distributions at once, first bin on top
+    distributions_2D = np.reshape(distributions,(len(perc),Nd))
+    segments = np.stack(np.broadcast_arrays(np.asarray(perc)[None,:],distributions_2D.T),axis=-1)
+    if labels is not None: # suppose it's a list of the right size
+        labels = list(labels)[::-1]
+
+    lc, h_all = showLineCollection(ax,segments[::-1],col=colorVals[::-1],ltype=ls,labels=labels)
+    rasterizeLayer(lc,rasterized)
+
+    return lc, h_all
 
-    # Plot
-    for i in np.flipud(range(Nprof)):
-        
-        # define label
-        if labels is not None: # suppose it's a list of the right size
-            lab = labels[i]
-        else:
-            lab = None
-            
-        colorVal = scalarMap.to_rgba(refbins[i])
-        if Nprof > 1:
-            ax.plot(profiles[:,i],z,c=colorVal,linestyle=ls,label=lab)
-        else:
-            ax.plot(profiles,z,c=colorVal,linestyle=ls,label=lab)
-
-# def subplotDistributions(ax,distributions,perc,SSTs,refmin=None,refmax=None,ls='-',labels=None,normfunction='Normalize'):
-    
-#     # Number of profiles
-#     Nd = 1
-#     if len(distributions.shape) > 1:
-#         Nd = distributions.shape[1]
-    
-#     # min-max for refvariable
-#     if refmin is None: refmin = refbins[0] 
-#     if refmax is None: refmax = refbins[-1]
-    
-#     # Color scale
-#     colorInd = range(Nd)
-#     cm = plt.get_cmap('Spectral') 
-#     cNorm = getattr(colors,normfunction)(vmin=refmin, vmax=refmax)
-#     scalarMap = cmx.ScalarMappable(norm=cNorm, cmap=cm)
-
-#     # Plot
-#     for i in np.flipud(range(Nd)):
-        
-#         # define label
-#         if labels is not None: # suppose it's a list of the right size
-#             lab = labels[i]
-#         else:
-#             lab = None
-            
-#         colorVal = scalarMap.to_rgba(SSTs[i])
-#         if len(refbins.shape) > 1:
-#             ax.plot(perc,distributions[:,i],c=colorVal,linestyle=ls,label=lab)
-#         else:
-#             ax.plot(perc,distributions,c=colorVal,linestyle=ls,label=lab)
-
-            
 def showColorBar(fig,axs,values,vmin=None,vmax=None,cbar_factor=11,label='',normfunction='Normalize'):
     
     if axs.__class__ != np.ndarray:
@@ -97,12 +108,12 @@ def showColorBar(fig,axs,values,vmin=None,vmax=None,cbar_factor=11,label='',norm
 
 
     # Color bar    
-    cm = plt.get_cmap('Spectral') 
+    cm = colormaps['Spectral'] 
     cNorm = getattr(colors,normfunction)(vmin=vmin, vmax=vmax)
     scalarMap = cmx.ScalarMappable(norm=cNorm, cmap=cm)
 
     dy = (y_top-y_bot)/60
-    cax = plt.axes([x_left,y_bot-cbar_factor*dy,x_right-x_left,dy])
+    cax = fig.add_axes([x_left,y_bot-cbar_factor*dy,x_right-x_left,dy])
     cbar = fig.colorbar(scalarMap, cax=cax, orientation='horizontal')
 
     return cbar.ax.set_xlabel(label)
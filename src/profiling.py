@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module profiling
+
+Opt-in instrumentation of the plotting modules. While enabled, every public
+function of plot1D, plot1DInvLog, plot2D and plotCondPDFs, as well as
+Figure.draw and Figure.savefig, records its wall time, the number of artists
+and axes it created, and the number of array elements passed to it.
+
+Functions are wrapped in their modules only while profiling is enabled, so
+that there is no cost at all when disabled. Calls must then go through module
+attributes (plot1D.showData, or functions calling each other), names imported
+with 'from plot1D import *' before enabling are not instrumented.
+
+Example :
+
+with profile('timing.json') as prof:
+    subplotRanksILog(ax,ranks,values)
+    fig.savefig('fig.png')
+print(prof.summary())
+
+@author: bfildier
+"""
+
+#---- Modules ----#
+
+import csv
+import json
+import time
+import inspect
+import importlib
+import functools
+
+import numpy as np
+
+#---- Parameters ----#
+
+# modules instrumented by default
+MODULES = ['plot1D','plot1DInvLog','plot2D','plotCondPDFs']
+
+#---- Functions ----#
+
+def _countElements(args):
+    """Total number of elements of arrays (or lists of arrays) in args"""
+
+    n = 0
+    for arg in args:
+        if isinstance(arg,np.ndarray):
+            n += arg.size
+        elif isinstance(arg,(list,tuple)) and len(arg) > 0 and isinstance(arg[0],np.ndarray):
+            n += sum(a.size for a in arg)
+
+    return n
+
+def _getFigure(args):
+    """Figure of the first Axes or Figure argument, if any"""
+
+    from matplotlib.axes import Axes
+    from matplotlib.figure import Figure
+    for arg in args[:1]:
+        if isinstance(arg,Axes):
+            return arg.figure
+        if isinstance(arg,Figure):
+            return arg
+
+    return None
+
+def _countArtists(fig):
+    """Number of axes and artists (direct children of all axes) in figure"""
+
+    if fig is None:
+        return 0, 0
+
+    return len(fig.axes), sum(len(ax.get_children()) for ax in fig.axes)
+
+#---- Classes ----#
+
+class Profiler():
+    """
+    Records of instrumented calls, with one dict per call: function, wall time,
+    nesting depth, axes and artists created, array elements in arguments.
+    """
+
+    def __init__(self, modules=MODULES, path=None):
+        self.modules = modules
+        self.path = path
+        self.records = []
+        self._depth = 0
+        self._originals = []
+
+    def _wrap(self, func, name):
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+
+            fig = _getFigure(args)
+            n_axes0, n_artists0 = _countArtists(fig)
+            record = {'function':name,'depth':self._depth,
+                      'n_elements':_countElements(args)+_countElements(kwargs.values())}
+            self.records.append(record)
+            self._depth += 1
+            t0 = time.perf_counter()
+            try:
+                return func(*args,**kwargs)
+            finally:
+                record['time'] = time.perf_counter()-t0
+                self._depth -= 1
+                n_axes1, n_artists1 = _countArtists(fig)
+                record['n_axes_created'] = n_axes1-n_axes0
+                record['n_artists_created'] = n_artists1-n_artists0
+
+        return wrapper
+
+    def _patch(self, owner, attr, name):
+
+        func = getattr(owner,attr)
+        self._originals.append((owner,attr,func))
+        setattr(owner,attr,self._wrap(func,name))
+
+    def enable(self):
+        """Wrap public functions of modules, and Figure.draw/savefig"""
+
+        from matplotlib.figure import Figure
+        for modname in self.modules:
+            module = importlib.import_module(modname)
+            for attr, obj in list(vars(module).items()):
+                if inspect.isfunction(obj) and obj.__module__ == modname and not attr.startswith('_'):
+                    self._patch(module,attr,'%s.%s'%(modname,attr))
+        self._patch(Figure,'draw','Figure.draw')
+        self._patch(Figure,'savefig','Figure.savefig')
+
+        return self
+
+    def disable(self):
+        """Restore original functions"""
+
+        for owner, attr, func in self._originals[::-1]:
+            setattr(owner,attr,func)
+        self._originals = []
+
+        return self
+
+    def summary(self):
+        """Number of calls, total and mean time per function, sorted by total time"""
+
+        stats = {}
+        for r in self.records:
+            s = stats.setdefault(r['function'],{'function':r['function'],'calls':0,'time':0.,
+                                                'n_artists_created':0,'n_axes_created':0})
+            s['calls'] += 1
+            s['time'] += r.get('time',0.)
+            s['n_artists_created'] += r.get('n_artists_created',0)
+            s['n_axes_created'] += r.get('n_axes_created',0)
+        for s in stats.values():
+            s['mean_time'] = s['time']/s['calls']
+
+        return sorted(stats.values(),key=lambda s: -s['time'])
+
+    def write(self, path):
+        """Write records to path, as CSV if path ends with .csv, JSON otherwise"""
+
+        if path.endswith('.csv'):
+            fields = ['function','depth','time','n_axes_created','n_artists_created','n_elements']
+            with open(path,'w',newline='') as f:
+                writer = csv.DictWriter(f,fieldnames=fields)
+                writer.writeheader()
+                writer.writerows(self.records)
+        else:
+            with open(path,'w') as f:
+                json.dump({'records':self.records,'summary':self.summary()},f,indent=1)
+
+    def __enter__(self):
+
+        return self.enable()
+
+    def __exit__(self, *exc):
+
+        self.disable()
+        if self.path is not None:
+            self.write(self.path)
+
+#---- Global switch ----#
+
+_profiler = None
+
+def profile(path=None, modules=MODULES):
+    """Context manager profiling calls in its block, writing records to path if given"""
+
+    return Profiler(modules,path=path)
+
+def enable(modules=MODULES):
+    """Start profiling globally, until disable() is called"""
+
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler(modules).enable()
+
+    return _profiler
+
+def disable(path=None):
+    """Stop global profiling, write records to path if given, and return the profiler"""
+
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.disable()
+        if path is not None:
+            profiler.write(path)
+
+    return profiler
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module rankAxis
+
+Inverse-logarithmic transformation of ranks (in %), used to display extremes:
+a rank r is displayed at position k = -log10(1-r/100), so that 0, 90, 99,
+99.9, ... are equally spaced. Only depends on numpy, so that computations on
+rank grids do not import matplotlib.
+
+RankAxis holds a rank grid with its coordinates computed once (with log1p,
+exact near 100%), bin edges, and tick positions and labels, so that panels
+sharing a grid do not recompute them. Grids from RankAxis.grid are shared,
+and ticks are memoized on the range of the grid. RankAxis objects are
+accepted wherever ranks are.
+
+@author: bfildier
+"""
+
+#---- Modules ----#
+
+import functools
+
+import numpy as np
+
+#---- Functions ----#
+
+def ranksToInvLog(ranks):
+    """Position k = -log10(1-ranks/100) of ranks (in %) on the inverse-log axis"""
+
+    with np.errstate(divide='ignore',invalid='ignore'):
+        return -np.log1p(-np.asarray(ranks,dtype=float)/100.)/np.log(10)
+
+def invLogToRanks(k):
+    """Ranks (in %) at positions k on the inverse-log axis, inverse of ranksToInvLog"""
+
+    with np.errstate(over='ignore',invalid='ignore'):
+        return -100.*np.expm1(-np.asarray(k,dtype=float)*np.log(10))
+
+def rankGrid(rankmin=0,rankmax=99.99,dk=0.1):
+    """Ranks regularly spaced by dk on the inverse-log axis, between the
+    closest decades of rankmin and rankmax"""
+
+    k_min = -np.round(np.log10(1-rankmin/100))
+    k_max = -np.round(np.log10(1-rankmax/100))
+    scale_invlog = np.arange(k_min,k_max+dk,dk)
+
+    return invLogToRanks(scale_invlog)
+
+def invLogEdges(k):
+    """Bin edges halfway between positions k on the inverse-log axis"""
+
+    k = np.asarray(k,dtype=float)
+    dk = np.diff(k)
+
+    return np.concatenate([[k[0]-dk[0]/2],k[:-1]+dk/2,[k[-1]+dk[-1]/2]])
+
+def rankEdges(ranks):
+    """Bin edges around ranks, taken halfway on the inverse-log axis"""
+
+    return invLogToRanks(invLogEdges(ranksToInvLog(ranks)))
+
+def formatRank(rank,k,mindigits=0):
+    """Label of rank at decade k, with as many digits as needed to show the 9s"""
+
+    ndigits = int(max(mindigits,np.round(k)-2))
+
+    return ('%%2.%df'%ndigits)%rank
+
+def decimateRanks(ranks, values, ncolumns, rankfull=None):
+    """
+    Indices of points to keep to draw values(ranks) on the inverse-log axis
+    with ncolumns columns (e.g. pixels): in each column of constant width in
+    -log10(1-ranks/100), only the first, last, minimum and maximum values are
+    kept, so that the drawn envelope is unchanged. Columns with few points,
+    as in the extreme tail, are kept at full resolution, as well as all ranks
+    above rankfull if given. ranks must be increasing.
+    """
+
+    ranks = np.asarray(ranks)
+    values = np.asarray(values)
+    n = ranks.size
+    k = ranksToInvLog(ranks)
+    finite = np.isfinite(k)
+    k_min, k_max = k[finite].min(), k[finite].max()
+    if n <= 4*ncolumns or k_max == k_min:
+        return np.arange(n)
+
+    # column of each point, contiguous since ranks are increasing
+    col = np.floor((np.where(finite,k,k_max)-k_min)/(k_max-k_min)*ncolumns)
+    col = np.clip(col,0,ncolumns-1)
+    starts = np.flatnonzero(np.concatenate([[True],col[1:] != col[:-1]]))
+    ends = np.concatenate([starts[1:],[n]])
+
+    keep = [starts,ends-1,np.flatnonzero(~finite)]
+    # first minimum and maximum of each column, NaNs ignored
+    with np.errstate(invalid='ignore'):
+        for reduce in [np.fmin,np.fmax]:
+            extreme = reduce.reduceat(values,starts)
+            is_extreme = np.flatnonzero(values == np.repeat(extreme,ends-starts))
+            i = np.searchsorted(is_extreme,starts)
+            found = i < is_extreme.size
+            i_extreme = is_extreme[np.minimum(i,is_extreme.size-1)]
+            keep.append(i_extreme[found & (i_extreme < ends)])
+    if rankfull is not None:
+        keep.append(np.flatnonzero(ranks >= rankfull))
+
+    return np.unique(np.concatenate(keep))
+
+@functools.lru_cache(maxsize=256)
+def decadeTicks(k_min, k_max, mindigits=0):
+    """Ranks and labels of ticks at whole decades between positions k_min and k_max
+    of the inverse-log axis, memoized"""
+
+    k = np.arange(np.ceil(k_min-1e-7),np.floor(k_max+1e-7)+1)
+    ranks = invLogToRanks(k)+0.
+    labels = tuple(formatRank(r,k_i,mindigits) for r,k_i in zip(ranks,k))
+    ranks.flags.writeable = False
+
+    return ranks, labels
+
+def _readOnly(array):
+
+    array.flags.writeable = False
+    return array
+
+#---- Classes ----#
+
+class RankAxis():
+    """
+    Immutable rank grid (in %) with cached inverse-log coordinates.
+
+    Arguments:
+        - ranks: increasing ranks (in %), or None if k is given
+        - k: positions -log10(1-ranks/100) on the inverse-log axis, instead of ranks
+        - dtype: storage of coordinates; with float32, only k and x are stored
+        in float32, ranks and edges are computed from k in float64 when first
+        used, since ranks near 100% cannot be represented in float32
+
+    Attributes (read-only arrays):
+        - ranks: ranks (in %)
+        - k: inverse-log positions -log10(1-ranks/100)
+        - x: 1/(1-ranks/100) = 10**k, coordinates on the log axis of plot1DInvLog
+        - edges: bin edges halfway between ranks on the inverse-log axis
+    """
+
+    def __init__(self, ranks=None, k=None, dtype=np.float64):
+        if k is None:
+            k = ranksToInvLog(ranks)
+        dtype = np.dtype(dtype)
+        object.__setattr__(self,'dtype',dtype)
+        object.__setattr__(self,'k',_readOnly(np.array(k,dtype=dtype)))
+        if dtype == np.float64:
+            ranks = invLogToRanks(k) if ranks is None else np.array(ranks,dtype=float)
+            object.__setattr__(self,'ranks',_readOnly(ranks))
+
+    @classmethod
+    @functools.lru_cache(maxsize=64)
+    def grid(cls, rankmin=0, rankmax=99.99, dk=0.1, dtype=np.float64):
+        """Shared RankAxis of rankGrid(rankmin,rankmax,dk), built from exact k positions"""
+
+        k_min = -np.round(np.log10(1-rankmin/100))
+        k_max = -np.round(np.log10(1-rankmax/100))
+
+        return cls(k=np.arange(k_min,k_max+dk,dk),dtype=dtype)
+
+    def __setattr__(self, name, value):
+
+        raise AttributeError('RankAxis is immutable')
+
+    @functools.cached_property
+    def ranks(self):
+        # set in __init__ for float64, in float64 from k otherwise
+        return _readOnly(invLogToRanks(self.k))
+
+    @functools.cached_property
+    def x(self):
+        return _readOnly(np.power(self.dtype.type(10),self.k))
+
+    @functools.cached_property
+    def edges(self):
+        # in float64 from k whatever dtype, edges near 100% are not distinct in float32
+        return _readOnly(invLogToRanks(invLogEdges(self.k)))
+
+    def ticks(self, mindigits=0):
+        """Ranks and labels of ticks at whole decades within the grid"""
+
+        k = self.k[np.isfinite(self.k)]
+
+        return decadeTicks(float(k[0]),float(k[-1]),mindigits)
+
+    def __len__(self):
+        return self.k.size
+
+    def __getitem__(self, i):
+        if 'ranks' in self.__dict__:
+            return self.ranks[i]
+        # only the requested ranks, without computing all of them
+        return invLogToRanks(self.k[i])
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.ranks,dtype=dtype)
+
+    def __eq__(self, other):
+        return isinstance(other,RankAxis) and self.dtype == other.dtype and \
+            np.array_equal(self.k,other.k)
+
+    def __hash__(self):
+        return hash((self.dtype.str,self.k.tobytes()))
+
+    def __repr__(self):
+        return 'RankAxis(%d ranks from %s to %s, %s)'%(len(self),self[0],self[-1],self.dtype)
+
+def rankValues(ranks):
+    """Ranks as an array if ranks is a RankAxis, unchanged otherwise"""
+
+    return ranks.ranks if isinstance(ranks,RankAxis) else ranks
+
+def meshEdges(ranks, nbins):
+    """Edges of nbins rank bins: ranks if they are edges already, or edges around
+    ranks (cached for a RankAxis)"""
+
+    if len(ranks) == nbins+1:
+        return rankValues(ranks)
+
+    return ranks.edges if isinstance(ranks,RankAxis) else rankEdges(ranks)
+
+def invLogCoordinates(ranks):
+    """1/(1-ranks/100) = 10**k, computed with log1p (cached for a RankAxis)"""
+
+    if isinstance(ranks,RankAxis):
+        return ranks.x
+
+    return np.power(10.,ranksToInvLog(ranks))
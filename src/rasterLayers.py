@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module rasterLayers
+
+Mixed-mode output for heavy data layers (joint histograms, dense contours,
+large ensembles of curves): data artists are rasterized at a chosen dpi while
+frames, ticks and labels stay vector graphics in PDF/SVG output.
+
+Rasterized layers are cached: the data artists are rendered once into an RGBA
+image that is drawn in their place, and only rendered again if their data,
+the axes limits or the figure size change. Saving the same figure in several
+formats, or several times, does not rasterize layers again.
+
+Rasterization is set per function (rasterized=True in showJointHistogram,
+subplotSmooth2D, subplotRanksILog, ...) or globally:
+
+setRasterization(True,dpi=200)
+
+@author: bfildier
+"""
+
+#---- Modules ----#
+
+import numpy as np
+from matplotlib.artist import Artist
+from matplotlib.image import AxesImage
+from matplotlib.backends.backend_agg import RendererAgg
+
+#---- Parameters ----#
+
+# global defaults, changed with setRasterization
+RASTER_SETTINGS = {'rasterized':False,'dpi':300,'cache':True}
+
+#---- Classes ----#
+
+class _LayerImage(AxesImage):
+    """Image over the whole axes, in axes coordinates"""
+
+    def get_extent(self):
+
+        return (0,1,0,1)
+
+class RasterLayer(Artist):
+    """
+    Image of data artists rendered offscreen at a given dpi, drawn in their
+    place over the whole axes. The artists are kept in the axes (for
+    autoscaling, legends and data updates) but their own draw is skipped, and
+    they are rendered again when they are changed or when the axes limits,
+    position or figure size change. The layer is not an image of the axes,
+    so that it does not count in data limits (relim, autoscale).
+    """
+
+    def __init__(self, ax, artists, dpi=300):
+        super().__init__()
+        self.artists = artists
+        self.dpi = dpi
+        self._key = None
+        self.image = _LayerImage(ax,origin='upper',interpolation='antialiased')
+        self.image.set_figure(ax.figure)
+        self.image.set_transform(ax.transAxes)
+        self.image.set_clip_path(ax.patch)
+        self.set_zorder(max(a.get_zorder() for a in artists))
+        for artist in artists:
+            artist.draw = self._skipDraw
+
+    @staticmethod
+    def _skipDraw(renderer):
+        pass
+
+    def _layerKey(self):
+
+        ax = self.axes
+        return (tuple(ax.viewLim.bounds),tuple(ax.get_position().bounds),
+                tuple(self.figure.get_size_inches()),ax.get_xscale(),ax.get_yscale())
+
+    def _render(self):
+        """Render artists alone at self.dpi, cropped to the axes"""
+
+        fig = self.figure
+        ax = self.axes
+        dpi0 = fig.dpi
+        fig.dpi = self.dpi
+        try:
+            width, height = fig.bbox.size
+            renderer = RendererAgg(int(np.ceil(width)),int(np.ceil(height)),self.dpi)
+            for artist in self.artists:
+                type(artist).draw(artist,renderer)
+            x0, y0, x1, y1 = ax.bbox.extents
+            buffer = np.asarray(renderer.buffer_rgba())
+            h = buffer.shape[0]
+            image = buffer[int(h-y1):int(np.ceil(h-y0)),int(x0):int(np.ceil(x1))].copy()
+        finally:
+            fig.dpi = dpi0
+        self.image.set_data(image)
+        self._key = self._layerKey()
+
+    def draw(self, renderer):
+
+        if self._key != self._layerKey() or any(a.stale for a in self.artists):
+            self._render()
+        self.image.draw(renderer)
+        self.stale = False
+
+    def remove(self):
+        """Remove layer and show artists again as vector graphics"""
+
+        for artist in self.artists:
+            del artist.draw
+        super().remove()
+
+#---- Functions ----#
+
+def setRasterization(rasterized=True, dpi=300, cache=True):
+    """Set global defaults for data layers: rasterization, raster dpi, and caching"""
+
+    RASTER_SETTINGS.update(rasterized=rasterized,dpi=dpi,cache=cache)
+
+def rasterizeLayer(artists, rasterized=None, dpi=None, cache=None):
+    """
+    Rasterize data artists (artist, or nested lists of artists as returned by
+    plotting functions) if rasterized (or the global default, if None) is True.
+    With caching, they are drawn through a RasterLayer at dpi; otherwise they
+    are rasterized by matplotlib at savefig dpi. Returns the RasterLayer or None.
+    """
+
+    if rasterized is None:
+        rasterized = RASTER_SETTINGS['rasterized']
+    if not rasterized:
+        return None
+    if dpi is None:
+        dpi = RASTER_SETTINGS['dpi']
+    if cache is None:
+        cache = RASTER_SETTINGS['cache']
+
+    from frameTemplate import flattenArtists
+    artists = [a for a in flattenArtists(artists) if hasattr(a,'draw')]
+    if not cache:
+        for artist in artists:
+            artist.set_rasterized(True)
+        return None
+
+    ax = artists[0].axes
+    layer = RasterLayer(ax,artists,dpi=dpi)
+    ax.add_artist(layer)
+
+    return layer
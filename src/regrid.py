@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module regrid
+
+Reusable interpolation of 2D fields Z(y,x) from a source grid onto a target
+grid. Interpolation weights are computed once per pair of grids and applied
+to any number of fields as a matrix product or a weighted gather, instead of
+fitting a new interpolant (or triangulation) for each field.
+
+Example :
+
+regridder = getRegridder(x,x_new)
+Z_new = regridder(Z)          # Z of shape (...,Ny,Nx), stacks allowed
+
+regridder = getTriangulationRegridder(points,points_new)
+Z_new = regridder(Z)          # Z of shape (...,N_points), stacks allowed
+
+@author: bfildier
+"""
+
+#---- Modules ----#
+
+import numpy as np
+
+#---- Parameters ----#
+
+# maximum number of regridders kept in cache by getRegridder and getTriangulationRegridder
+CACHE_SIZE = 32
+
+# maximum number of weight matrices (patterns of valid cells) kept by each Regridder
+WEIGHTS_CACHE_SIZE = 32
+
+_SPLINE_DEGREE = {'linear':1,'quadratic':2,'cubic':3}
+
+#---- Classes ----#
+
+class Regridder():
+    """
+    Spline interpolation along x from source coordinates x onto target coordinates
+    x_new, as a (Nx_new,Nx) weight matrix applied to the last axis of fields.
+
+    Cells of Z that are NaN (or infinite) are left out of the interpolation of
+    their row, with one weight matrix per pattern of valid cells (the last
+    WEIGHTS_CACHE_SIZE patterns are cached). Target points outside the range
+    of valid cells of a row are set to NaN.
+    """
+
+    def __init__(self, x, x_new, kind='cubic'):
+        self.x = np.asarray(x,dtype=float)
+        self.x_new = np.asarray(x_new,dtype=float)
+        self.kind = kind
+        self._weights = {}
+
+    def weights(self, valid):
+        """Weight matrix (Nx_new,N_valid) for valid source columns"""
+
+        key = valid.tobytes()
+        if key not in self._weights:
+            from scipy.interpolate import make_interp_spline
+            x_valid = self.x[valid]
+            k = min(_SPLINE_DEGREE[self.kind],x_valid.size-1)
+            # interpolating the identity gives the weights of each source point
+            W = make_interp_spline(x_valid,np.eye(x_valid.size),k=k)(self.x_new)
+            out = (self.x_new < x_valid.min()) | (self.x_new > x_valid.max())
+            W[out] = np.nan
+            if len(self._weights) >= WEIGHTS_CACHE_SIZE:
+                self._weights.pop(next(iter(self._weights)))
+            self._weights[key] = W
+
+        return self._weights[key]
+
+    def __call__(self, Z):
+        """Interpolate Z of shape (...,Ny,Nx) onto x_new, returns (...,Ny,Nx_new)"""
+
+        Z = np.asarray(Z)
+        rows = Z.reshape(-1,Z.shape[-1])
+        valid_all = np.isfinite(rows)
+
+        # all cells valid: a single matrix product, without copy of Z
+        if valid_all.all():
+            return (rows @ self.weights(valid_all[0]).T).reshape(Z.shape[:-1]+(self.x_new.size,))
+
+        # one matrix product per pattern of valid cells, on the rows with that pattern
+        Z_new = np.empty((rows.shape[0],self.x_new.size))
+        # patterns as bytes of packed bits, much faster to sort than boolean rows
+        packed = np.ascontiguousarray(np.packbits(valid_all,axis=1))
+        _, i_first, i_mask = np.unique(packed.view(np.dtype((np.void,packed.shape[1]))).ravel(),
+                                       return_index=True,return_inverse=True)
+        for i, valid in enumerate(valid_all[i_first]):
+            i_rows = np.flatnonzero(i_mask.ravel() == i)
+            if not valid.any():
+                Z_new[i_rows] = np.nan
+                continue
+            Z_new[i_rows] = rows[np.ix_(i_rows,np.flatnonzero(valid))] @ self.weights(valid).T
+
+        return Z_new.reshape(Z.shape[:-1]+(self.x_new.size,))
+
+class TriangulationRegridder():
+    """
+    Linear interpolation of scattered points onto new points, from the Delaunay
+    triangulation of source points. The enclosing triangle and barycentric
+    weights of each new point are computed once, so that interpolating new
+    values is a weighted gather. New points outside the convex hull of source
+    points are set to NaN.
+    """
+
+    def __init__(self, points, points_new):
+        self.points = np.asarray(points,dtype=float)
+        self.points_new = np.asarray(points_new,dtype=float)
+
+        from scipy.spatial import Delaunay
+        tri = Delaunay(self.points)
+        simplex = tri.find_simplex(self.points_new)
+        # barycentric coordinates in enclosing triangles
+        T = tri.transform[simplex]
+        b = np.einsum('nij,nj->ni',T[:,:2],self.points_new-T[:,2])
+        self.vertices = tri.simplices[simplex]
+        self.weights = np.column_stack([b,1-b.sum(axis=1)])
+        self.outside = simplex == -1
+
+    def __call__(self, Z):
+        """Interpolate Z of shape (...,N_points) onto new points, returns (...,N_new)"""
+
+        Z = np.asarray(Z)
+        Z_new = np.einsum('...nj,nj->...n',Z[...,self.vertices],self.weights)
+        Z_new[...,self.outside] = np.nan
+
+        return Z_new
+
+#---- Functions ----#
+
+_regridders = {}
+
+def _getCached(key, factory):
+    """Regridder stored under key, created by factory if absent"""
+
+    if key not in _regridders:
+        if len(_regridders) >= CACHE_SIZE:
+            _regridders.pop(next(iter(_regridders)))
+        _regridders[key] = factory()
+
+    return _regridders[key]
+
+def getRegridder(x, x_new, kind='cubic'):
+    """Regridder for this pair of grids, reused across calls with identical grids"""
+
+    x = np.ascontiguousarray(x,dtype=float)
+    x_new = np.ascontiguousarray(x_new,dtype=float)
+    key = ('spline',x.tobytes(),x_new.tobytes(),kind)
+
+    return _getCached(key,lambda: Regridder(x,x_new,kind=kind))
+
+def getTriangulationRegridder(points, points_new):
+    """TriangulationRegridder for these source and new points, reused across
+    calls with identical coordinates"""
+
+    points = np.ascontiguousarray(points,dtype=float)
+    points_new = np.ascontiguousarray(points_new,dtype=float)
+    key = ('delaunay',points.shape,points.tobytes(),points_new.shape,points_new.tobytes())
+
+    return _getCached(key,lambda: TriangulationRegridder(points,points_new))
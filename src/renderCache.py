@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module renderCache
+
+Content-addressed cache of rendered figures (PNG, PDF, ...), so that figures
+whose inputs did not change are copied from the cache instead of being drawn
+and saved again.
+
+The key of a figure hashes the content of its input arrays (buffers of numpy
+arrays, memory-mapped or not, RankAxis and store entries), all call
+parameters, the code of functions (so that edits of a figure function change
+its key), the output format, and the versions of numpy, matplotlib and of
+this library (hash of its source files). Files are stored in a local
+directory, evicted by least recent use when the cache exceeds maxbytes.
+Several processes can share the same cache directory.
+
+Example :
+
+cache = RenderCache('~/.cache/plotting',maxbytes=2**30)
+cache.render('fig.png',makeFigure,ranks,values,rankmax=99.99)
+print(cache.stats)
+
+@author: bfildier
+"""
+
+#---- Modules ----#
+
+import os
+import glob
+import shutil
+import types
+import hashlib
+import functools
+
+import numpy as np
+
+#---- Parameters ----#
+
+# default maximum size of the cache directory
+CACHE_MAXBYTES = 2**30
+
+# number of stores between two scans of the whole cache directory
+SCAN_INTERVAL = 64
+
+#---- Functions ----#
+
+@functools.lru_cache(maxsize=1)
+def libraryVersion():
+    """Versions of numpy, matplotlib and hash of the source files of this library"""
+
+    import matplotlib
+    h = hashlib.blake2b(digest_size=16)
+    for fname in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)),'*.py'))):
+        with open(fname,'rb') as f:
+            h.update(f.read())
+
+    return 'numpy-%s_matplotlib-%s_src-%s'%(np.__version__,matplotlib.__version__,h.hexdigest())
+
+def _updateCode(h, code):
+    """Feed a code object to hash h: bytecode, names and constants, nested code recursively"""
+
+    h.update(b'code')
+    h.update(code.co_code)
+    _update(h,code.co_names)
+    for const in code.co_consts:
+        if isinstance(const,types.CodeType):
+            _updateCode(h,const)
+        else:
+            _update(h,const)
+
+def _update(h, obj, seen=None):
+    """Feed obj to hash h: arrays by content, containers recursively, functions by code,
+    objects with a default repr by state, others by repr"""
+
+    from rankAxis import RankAxis
+    from store import StoreEntry
+
+    # objects being hashed, by id (kept alive so that ids are not reused)
+    if seen is None:
+        seen = {}
+    if id(obj) in seen:
+        h.update(b'cycle')
+        return
+
+    if isinstance(obj,np.ndarray):
+        h.update(b'ndarray%s%s'%(obj.dtype.str.encode(),str(obj.shape).encode()))
+        h.update(memoryview(np.ascontiguousarray(obj)).cast('B'))
+    elif isinstance(obj,RankAxis):
+        h.update(b'RankAxis')
+        _update(h,obj.k)
+    elif isinstance(obj,StoreEntry):
+        h.update(b'StoreEntry%s'%obj.kind.encode())
+        _update(h,{key:obj[key] for key in obj.files})
+    elif isinstance(obj,dict):
+        seen[id(obj)] = obj
+        h.update(b'dict')
+        for key in sorted(obj,key=str):
+            _update(h,key,seen)
+            _update(h,obj[key],seen)
+    elif isinstance(obj,(list,tuple)):
+        seen[id(obj)] = obj
+        h.update(b'%s%d'%(type(obj).__name__.encode(),len(obj)))
+        for item in obj:
+            _update(h,item,seen)
+    elif isinstance(obj,(set,frozenset)):
+        # in a fixed order, iteration order depends on the hash seed
+        seen[id(obj)] = obj
+        h.update(b'%s%d'%(type(obj).__name__.encode(),len(obj)))
+        for item in sorted(obj,key=repr):
+            _update(h,item,seen)
+    elif isinstance(obj,types.MethodType):
+        _update(h,obj.__func__,seen)
+        _update(h,obj.__self__,seen)
+    elif isinstance(obj,types.FunctionType):
+        # by code, so that edits of user functions change the key
+        seen[id(obj)] = obj
+        h.update(('function %s.%s'%(obj.__module__,obj.__qualname__)).encode())
+        _updateCode(h,obj.__code__)
+        _update(h,(obj.__defaults__,obj.__kwdefaults__),seen)
+        if obj.__closure__:
+            _update(h,[cell.cell_contents for cell in obj.__closure__],seen)
+    elif callable(obj) and hasattr(obj,'__qualname__'):
+        h.update(('%s.%s'%(getattr(obj,'__module__',''),obj.__qualname__)).encode())
+    elif type(obj).__repr__ is object.__repr__:
+        # default repr is the address: hash the state (e.g. Colormap, Normalize)
+        seen[id(obj)] = obj
+        h.update(('object %s.%s'%(type(obj).__module__,type(obj).__qualname__)).encode())
+        state = obj.__getstate__() if hasattr(obj,'__getstate__') else getattr(obj,'__dict__',None)
+        if state is None and not hasattr(obj,'__dict__'):
+            raise TypeError("cannot hash object of type %s without state"%type(obj).__name__)
+        _update(h,state,seen)
+    else:
+        h.update(('%s:%r'%(type(obj).__name__,obj)).encode())
+
+def hashInputs(*inputs):
+    """Hex digest of inputs (arrays, containers, scalars, functions) and library version"""
+
+    h = hashlib.blake2b(digest_size=20)
+    h.update(libraryVersion().encode())
+    _update(h,inputs)
+
+    return h.hexdigest()
+
+#---- Classes ----#
+
+class RenderCache():
+    """
+    Directory of rendered files named by their key, with size-based LRU eviction.
+
+    Arguments:
+        - path: cache directory, created if needed
+        - maxbytes: maximum total size of cached files
+
+    Hits, misses and evictions of this process are counted in self.stats.
+    """
+
+    def __init__(self, path, maxbytes=CACHE_MAXBYTES):
+        self.path = os.path.expanduser(path)
+        self.maxbytes = maxbytes
+        self.stats = {'hits':0,'misses':0,'evictions':0}
+        # size of the cache at the last scan plus files stored since
+        self._size = None
+        self._stores = 0
+        os.makedirs(self.path,exist_ok=True)
+
+    def _file(self, key, ext):
+
+        return os.path.join(self.path,key[:2],key+ext)
+
+    def fetch(self, key, output):
+        """Copy the cached file of key to output and return True, or return False"""
+
+        cached = self._file(key,os.path.splitext(output)[1])
+        try:
+            shutil.copyfile(cached,output)
+        except FileNotFoundError:
+            self.stats['misses'] += 1
+            return False
+        # last use, for eviction (the file may have been evicted by another process)
+        try:
+            os.utime(cached)
+        except FileNotFoundError:
+            pass
+        self.stats['hits'] += 1
+
+        return True
+
+    def store(self, key, output):
+        """Add rendered file output to the cache under key, and evict old files"""
+
+        cached = self._file(key,os.path.splitext(output)[1])
+        os.makedirs(os.path.dirname(cached),exist_ok=True)
+        tmp = '%s.%d.tmp'%(cached,os.getpid())
+        shutil.copyfile(output,tmp)
+        os.replace(tmp,cached)
+        # the directory is scanned when the estimated size exceeds maxbytes, or every
+        # SCAN_INTERVAL stores to account for other processes
+        self._stores += 1
+        if self._size is None or self._stores % SCAN_INTERVAL == 0:
+            self._size = self.size()
+        else:
+            self._size += os.path.getsize(cached)
+        if self._size > self.maxbytes:
+            self.evict()
+
+    def files(self):
+        """Cached files as (last use, size, path), least recently used first"""
+
+        entries = []
+        for sub in os.scandir(self.path):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime,st.st_size,entry.path))
+
+        return sorted(entries)
+
+    def size(self):
+
+        return sum(size for _,size,_ in self.files())
+
+    def evict(self):
+        """Remove least recently used files until the cache fits in maxbytes"""
+
+        entries = self.files()
+        total = sum(size for _,size,_ in entries)
+        for _, size, path in entries:
+            if total <= self.maxbytes:
+                break
+            try:
+                os.remove(path)
+                self.stats['evictions'] += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._size = total
+
+    def clear(self):
+
+        shutil.rmtree(self.path)
+        os.makedirs(self.path,exist_ok=True)
+
+    def render(self, output, func, *args, **kwargs):
+        """Copy output from the cache if func(output,*args,**kwargs) was already rendered
+        with the same inputs, otherwise call it (it must save output) and store the result.
+        Returns True on a hit"""
+
+        key = hashInputs(func,args,kwargs,os.path.splitext(output)[1])
+        if self.fetch(key,output):
+            return True
+        func(output,*args,**kwargs)
+        self.store(key,output)
+
+        return False
+
+    def summary(self):
+
+        n = self.stats['hits']+self.stats['misses']
+        rate = self.stats['hits']/n if n else 0.
+
+        return '%d hits, %d misses (hit rate %.0f%%), %d evictions'%(self.stats['hits'],
+               self.stats['misses'],100*rate,self.stats['evictions'])
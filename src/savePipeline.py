@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module savePipeline
+
+Background saving of finished figures, so that drawing and encoding (PNG
+compression, PDF writing) of a figure overlap with the computation and
+plotting of the next ones.
+
+Figures are handed to a bounded pool of threads, or of processes to which
+they are sent pickled. At most maxpending figures are in flight: submit
+blocks when the pool is full, so that memory stays capped. Figures are closed
+on the submitting thread, in the next submit or flush once written (threads),
+or once handed off (processes), since pyplot is not thread-safe; the pipeline
+keeps no reference to written figures. flush waits for all pending figures
+and raises the first error.
+
+With threads, a submitted figure must not be modified any more. Processes
+also parallelize drawing, at the cost of pickling the figure; figures with
+cached raster layers (rasterLayers) can only be saved with threads.
+
+Example :
+
+with SavePipeline(workers=2) as pipeline:
+    for name in names:
+        fig, ax = plt.subplots()
+        subplotRanksILog(ax,ranks,data[name])
+        pipeline.submit(fig,'figures/%s.png'%name,dpi=150)
+
+@author: bfildier
+"""
+
+#---- Modules ----#
+
+import sys
+import queue
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor,ProcessPoolExecutor
+
+#---- Functions ----#
+
+def closeFigure(fig):
+    """Release a figure from pyplot, if it was created there"""
+
+    if 'matplotlib.pyplot' in sys.modules:
+        sys.modules['matplotlib.pyplot'].close(fig)
+
+def _saveFigure(fig, fname, kwargs):
+
+    fig.savefig(fname,**kwargs)
+
+    return fname
+
+def _savePickledFigure(data, fname, kwargs):
+
+    import matplotlib
+    matplotlib.use('Agg')
+    fig = pickle.loads(data)
+    fig.savefig(fname,**kwargs)
+
+    return fname
+
+#---- Classes ----#
+
+class SavePipeline():
+    """
+    Bounded pool saving figures in the background.
+
+    Arguments:
+        - workers: number of threads (or processes)
+        - maxpending: maximum number of figures submitted and not yet written,
+        default 2*workers
+        - processes: save in processes instead of threads
+        - close: close figures after they are written or handed off
+        - **savefig_kwargs: default arguments of savefig (dpi, bbox_inches, ...)
+    """
+
+    def __init__(self, workers=2, maxpending=None, processes=False, close=True, **savefig_kwargs):
+        self.workers = workers
+        self.maxpending = 2*workers if maxpending is None else maxpending
+        self.processes = processes
+        self.close = close
+        self.savefig_kwargs = savefig_kwargs
+        self._slots = threading.BoundedSemaphore(self.maxpending)
+        # futures not finished at the last submit, and first error of finished ones
+        self._futures = []
+        self._error = None
+        # figures written by threads, closed on the submitting thread
+        self._written = queue.SimpleQueue()
+        self.count = 0
+        if processes:
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=workers,thread_name_prefix='savefig')
+
+    def _done(self, future):
+
+        self._slots.release()
+
+    def _save(self, fig, fname, kwargs):
+        """Save fig in a thread, and queue it to be closed on the submitting thread"""
+
+        try:
+            return _saveFigure(fig,fname,kwargs)
+        finally:
+            if self.close:
+                self._written.put(fig)
+
+    def _collect(self, future):
+        """Count a finished save, or keep its error if it is the first one"""
+
+        error = future.exception()
+        if error is None:
+            self.count += 1
+        elif self._error is None:
+            self._error = error
+
+    def _prune(self):
+        """Drop finished futures, so that nothing of written figures is kept"""
+
+        futures, self._futures = self._futures, []
+        for future in futures:
+            if future.done():
+                self._collect(future)
+            else:
+                self._futures.append(future)
+
+    def _closeWritten(self):
+        """Close figures written by threads since the last call"""
+
+        while True:
+            try:
+                fig = self._written.get_nowait()
+            except queue.Empty:
+                return
+            closeFigure(fig)
+
+    def submit(self, fig, fname, **kwargs):
+        """Save fig to fname in the background, blocking while maxpending figures
+        are in flight. Returns a Future of fname"""
+
+        kwargs = dict(self.savefig_kwargs,**kwargs)
+        self._closeWritten()
+        self._slots.acquire()
+        self._closeWritten()
+        self._prune()
+        try:
+            if self.processes:
+                data = pickle.dumps(fig)
+                if self.close:
+                    closeFigure(fig)
+                future = self._executor.submit(_savePickledFigure,data,fname,kwargs)
+            else:
+                future = self._executor.submit(self._save,fig,fname,kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        self._futures.append(future)
+        future.add_done_callback(self._done)
+
+        return future
+
+    @property
+    def pending(self):
+        """Number of figures submitted and not yet written"""
+
+        return sum(not future.done() for future in self._futures)
+
+    def flush(self):
+        """Wait until all submitted figures are written, and raise the first error"""
+
+        futures, self._futures = self._futures, []
+        for future in futures:
+            self._collect(future)
+        self._closeWritten()
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    wait = flush
+
+    def shutdown(self, raise_errors=True):
+        """Write pending figures and stop the pool"""
+
+        try:
+            self.flush()
+        except Exception:
+            if raise_errors:
+                raise
+        finally:
+            self._executor.shutdown(wait=True)
+            self._closeWritten()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *exc):
+
+        # errors of saves do not replace an error raised in the with block
+        self.shutdown(raise_errors=exc[0] is None)
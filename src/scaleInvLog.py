@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module scaleInvLog
+
+Native inverse-logarithmic axis scale for matplotlib, to display ranks
+(in %) so that extremes are spread out. A rank r is displayed at position
+k = -log10(1-r/100), so that 0, 90, 99, 99.9, ... are equally spaced.
+
+Importing this module registers the scale under the name 'invlog':
+
+    ax.set_xscale('invlog')
+    ax.plot(ranks,values)
+
+Data are then passed as ranks directly, without the 1/(1-ranks/100.)
+transformation or the twin-axes frame used previously.
+
+@author: bfildier
+"""
+
+#---- Modules ----#
+
+import functools
+
+import numpy as np
+from matplotlib import scale as mscale
+from matplotlib import ticker as mticker
+from matplotlib.transforms import Transform
+
+from rankAxis import ranksToInvLog,invLogToRanks,formatRank,_readOnly
+
+#---- Parameters ----#
+
+# largest rank that can be displayed, to avoid log10(0) at 100%
+RANK_MAX = 100*(1-1e-12)
+
+#---- Functions ----#
+
+@functools.lru_cache(maxsize=256)
+def _tickValues(vmin, vmax, subs, numdecs):
+    """Tick ranks of InvLogLocator, memoized on view limits so that identical
+    panels share them (read-only arrays)"""
+
+    vmin, vmax = sorted([vmin,min(vmax,RANK_MAX)])
+    k_min, k_max = ranksToInvLog([vmin,vmax])
+    if not np.isfinite(k_min) or not np.isfinite(k_max):
+        return _readOnly(np.array([]))
+    subs = np.asarray(subs)
+    decades = np.arange(np.floor(k_min),np.ceil(k_max)+1)
+    # skip decades and minor ticks when too many decades are shown
+    stride = max(1,int(np.ceil(len(decades)/numdecs)))
+    if stride > 1:
+        if len(subs) > 1 or subs[0] != 1.0:
+            return _readOnly(np.array([]))
+        decades = decades[::stride]
+    k = (decades[:,None]+np.log10(subs)[None,:]).flatten()
+    k = k[(k >= k_min-1e-7) & (k <= k_max+1e-7)]
+
+    return _readOnly(invLogToRanks(k))
+
+@functools.lru_cache(maxsize=1024)
+def _tickLabel(x, mindigits):
+    """Label of InvLogFormatter, memoized"""
+
+    k = ranksToInvLog(x)
+    if not np.isfinite(k) or abs(k-np.round(k)) > 1e-6:
+        return ''
+    return formatRank(x,k,mindigits)
+
+#---- Classes ----#
+
+class InvLogTransform(Transform):
+    """Transform ranks (in %) into -log10(1-ranks/100)"""
+
+    input_dims = output_dims = 1
+
+    def transform_non_affine(self, values):
+
+        return ranksToInvLog(values)
+
+    def inverted(self):
+
+        return InvertedInvLogTransform()
+
+class InvertedInvLogTransform(Transform):
+    """Transform -log10(1-ranks/100) back into ranks (in %)"""
+
+    input_dims = output_dims = 1
+
+    def transform_non_affine(self, values):
+
+        return invLogToRanks(values)
+
+    def inverted(self):
+
+        return InvLogTransform()
+
+class InvLogLocator(mticker.Locator):
+    """
+    Place ticks at ranks 0, 90, 99, 99.9, ... (subs=(1.0,)), or at
+    intermediate positions within each decade of the inverse-log axis
+    (e.g. subs=np.arange(2,10) for minor ticks, as on a log axis).
+    """
+
+    def __init__(self, subs=(1.0,), numdecs=10):
+        self.subs = np.asarray(subs,dtype=float)
+        self.numdecs = numdecs
+
+    def __call__(self):
+
+        vmin, vmax = self.axis.get_view_interval()
+        return self.tick_values(vmin,vmax)
+
+    def tick_values(self, vmin, vmax):
+
+        return _tickValues(float(vmin),float(vmax),tuple(self.subs),self.numdecs).copy()
+
+class InvLogFormatter(mticker.Formatter):
+    """Label ranks at whole decades of the inverse-log axis, leave others blank"""
+
+    def __init__(self, mindigits=0):
+        self.mindigits = mindigits
+
+    def __call__(self, x, pos=None):
+
+        return _tickLabel(float(x),self.mindigits)
+
+class InvLogScale(mscale.ScaleBase):
+    """
+    Inverse-logarithmic scale for ranks (in %), registered as 'invlog'.
+
+    Keyword arguments:
+        - mindigits: minimum number of decimals in tick labels
+        - subs: positions of minor ticks within each decade, e.g. np.arange(2,10)
+          (none by default, they are costly to draw on large grids of panels)
+    """
+
+    name = 'invlog'
+
+    # the axis is passed by matplotlib < 3.11 only and is unused; it is not named
+    # 'axis', so that register_scale takes the new signature without warning
+    def __init__(self, _axis=None, *, mindigits=0, subs=None):
+        self.mindigits = mindigits
+        self.subs = subs
+
+    def get_transform(self):
+
+        return InvLogTransform()
+
+    def set_default_locators_and_formatters(self, axis):
+
+        axis.set_major_locator(InvLogLocator())
+        axis.set_major_formatter(InvLogFormatter(mindigits=self.mindigits))
+        if self.subs is None:
+            axis.set_minor_locator(mticker.NullLocator())
+        else:
+            axis.set_minor_locator(InvLogLocator(subs=self.subs))
+        axis.set_minor_formatter(mticker.NullFormatter())
+
+    def limit_range_for_scale(self, vmin, vmax, minpos):
+
+        return min(vmin,RANK_MAX), min(vmax,RANK_MAX)
+
+mscale.register_scale(InvLogScale)
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module store
+
+Compact on-disk store of precomputed distributions: rank grids, percentile
+curves, joint histograms with their rank axes, and conditional profiles.
+
+A store is a directory with one .npy file per array and a manifest.json
+describing entries (kind, arrays and attributes). Arrays are loaded lazily
+with np.load(mmap_mode='r'), without copy, so that many plotting processes
+reading the same store share the page cache.
+
+Each save writes arrays to new, uniquely named files and then replaces the
+manifest atomically, so that readers never see a partially written entry or
+a mix of old and new arrays. Writers update the manifest under a file lock,
+so that concurrent saves of different entries are all kept. Files of a
+replaced entry are removed: arrays already memory-mapped stay valid, arrays
+of an entry opened before it was replaced and not yet loaded cannot be
+loaded any more.
+
+Entries are passed directly to subplotRanksILog, showJointHistogram and
+subplotConditionalProfiles in place of their arrays.
+
+Example :
+
+store = DistributionStore('dists')
+store.savePercentiles('pr_tropics',ranks,percentiles,units='mm/day')
+store.saveJointHistogram('pr_crh',counts,xranks,yranks,density=density)
+
+store = DistributionStore('dists')
+subplotRanksILog(ax,store['pr_tropics'])
+showJointHistogram(ax,store['pr_crh'],scale='log',vmin=0.01,vmax=100)
+
+@author: bfildier
+"""
+
+#---- Modules ----#
+
+import os
+import json
+import uuid
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import numpy as np
+
+#---- Parameters ----#
+
+MANIFEST = 'manifest.json'
+LOCKFILE = '.manifest.lock'
+VERSION = 1
+
+# arrays of each kind of entry, required ones first
+KINDS = {'ranks':(['ranks'],[]),
+         'percentiles':(['ranks','percentiles'],[]),
+         'joint':(['counts','xranks','yranks'],['density']),
+         'profiles':(['z','profiles','refbins'],['counts'])}
+
+#---- Classes ----#
+
+class StoreEntry():
+    """
+    Handle on an entry of a DistributionStore. Arrays are memory-mapped on
+    first access, as entry['ranks'] or entry.ranks.
+    """
+
+    def __init__(self, root, name, info):
+        self.root = root
+        self.name = name
+        self.kind = info['kind']
+        self.files = info['arrays']
+        self.attrs = info.get('attrs',{})
+        self._arrays = {}
+
+    def __getitem__(self, key):
+
+        if key not in self._arrays:
+            self._arrays[key] = np.load(os.path.join(self.root,self.files[key]),mmap_mode='r')
+        return self._arrays[key]
+
+    def __getattr__(self, key):
+
+        if key.startswith('_') or key not in self.__dict__.get('files',{}):
+            raise AttributeError(key)
+        return self[key]
+
+    def __contains__(self, key):
+
+        return key in self.files
+
+    def get(self, key, default=None):
+
+        return self[key] if key in self.files else default
+
+    def __repr__(self):
+
+        return "StoreEntry('%s', kind='%s', arrays=%s)"%(self.name,self.kind,list(self.files))
+
+class DistributionStore():
+    """
+    Directory of precomputed distributions with a JSON manifest.
+
+    Arguments:
+        - path: directory of the store, created when saving the first entry
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = {}
+        self._mtime = None
+
+    def _manifestPath(self):
+
+        return os.path.join(self.path,MANIFEST)
+
+    def manifest(self):
+        """Manifest of the store, read again if it changed on disk"""
+
+        path = self._manifestPath()
+        if not os.path.exists(path):
+            return {'version':VERSION,'entries':{}}
+        # the manifest is replaced, not modified: a new inode means new content
+        st = os.stat(path)
+        mtime = (st.st_mtime_ns,st.st_ino,st.st_size)
+        if mtime != self._mtime:
+            with open(path) as f:
+                self._manifest = json.load(f)
+            self._mtime = mtime
+            self._entries = {}
+
+        return self._manifest
+
+    def keys(self):
+
+        return list(self.manifest()['entries'])
+
+    def __contains__(self, name):
+
+        return name in self.manifest()['entries']
+
+    def __getitem__(self, name):
+
+        entries = self.manifest()['entries']
+        if name not in entries:
+            raise KeyError("no entry '%s' in store %s"%(name,self.path))
+        if name not in self._entries:
+            self._entries[name] = StoreEntry(self.path,name,entries[name])
+
+        return self._entries[name]
+
+    def save(self, name, kind, arrays, **attrs):
+        """Write arrays (dict) of an entry of given kind, with JSON-serializable attributes"""
+
+        required, optional = KINDS[kind]
+        missing = [key for key in required if arrays.get(key) is None]
+        if missing:
+            raise ValueError("missing arrays %s for entry of kind '%s'"%(missing,kind))
+        unknown = set(arrays)-set(required)-set(optional)
+        if unknown:
+            raise ValueError("unknown arrays %s for entry of kind '%s'"%(sorted(unknown),kind))
+
+        # new files, never seen by readers of the current manifest
+        os.makedirs(self.path,exist_ok=True)
+        token = uuid.uuid4().hex[:12]
+        files = {}
+        for key, array in arrays.items():
+            if array is None:
+                continue
+            files[key] = '%s.%s.%s.npy'%(name,key,token)
+            with open(os.path.join(self.path,files[key]),'wb') as f:
+                np.save(f,np.ascontiguousarray(array))
+
+        # update manifest atomically, from its current content on disk
+        with open(os.path.join(self.path,LOCKFILE),'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock,fcntl.LOCK_EX)
+            try:
+                path = self._manifestPath()
+                entries = {}
+                if os.path.exists(path):
+                    with open(path) as f:
+                        entries = json.load(f)['entries']
+                old = entries.get(name)
+                entries[name] = {'kind':kind,'arrays':files,'attrs':attrs}
+                tmp = '%s.%d.%s.tmp'%(path,os.getpid(),token)
+                with open(tmp,'w') as f:
+                    json.dump({'version':VERSION,'entries':entries},f,indent=1)
+                os.replace(tmp,path)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock,fcntl.LOCK_UN)
+
+        # files of the replaced entry
+        if old is not None:
+            for fname in old['arrays'].values():
+                try:
+                    os.remove(os.path.join(self.path,fname))
+                except FileNotFoundError:
+                    pass
+        self._entries.pop(name,None)
+
+        return self[name]
+
+    def saveRankGrid(self, name, ranks, **attrs):
+
+        return self.save(name,'ranks',{'ranks':ranks},**attrs)
+
+    def savePercentiles(self, name, ranks, percentiles, **attrs):
+        """Percentile curve (n) or curves (Ncurves,n) on ranks (n)"""
+
+        return self.save(name,'percentiles',{'ranks':ranks,'percentiles':percentiles},**attrs)
+
+    def saveJointHistogram(self, name, counts, xranks, yranks, density=None, **attrs):
+        """Joint histogram (Ny,Nx) as returned by jointDistribution.computeJointHistogram"""
+
+        return self.save(name,'joint',{'counts':counts,'xranks':xranks,'yranks':yranks,
+                                       'density':density},**attrs)
+
+    def saveConditionalProfiles(self, name, z, profiles, refbins, counts=None, **attrs):
+        """Profiles (z,Nbin) conditioned on reference bins, as returned by
+        condStats.computeConditionalProfiles"""
+
+        return self.save(name,'profiles',{'z':z,'profiles':profiles,'refbins':refbins,
+                                          'counts':counts},**attrs)
+
+#---- Functions ----#
+
+def isEntry(obj, kind=None):
+    """True if obj is a store entry (of given kind)"""
+
+    return isinstance(obj,StoreEntry) and (kind is None or obj.kind == kind)
+
+def openEntry(ref):
+    """Entry from its 'store_directory:name' reference"""
+
+    path, _, name = ref.rpartition(':')
+
+    return DistributionStore(path)[name]
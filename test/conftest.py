@@ -0,0 +1,12 @@
+"""Library modules in src/ and the benchmarks package are importable from tests"""
+
+import os
+import sys
+
+ROOTDIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in [os.path.join(ROOTDIR,'src'),ROOTDIR]:
+    if path not in sys.path:
+        sys.path.insert(0,path)
+
+import matplotlib
+matplotlib.use('Agg')
@@ -0,0 +1,80 @@
+"""Headless batch rendering from a figure spec (user-009)"""
+
+import json
+
+import numpy as np
+import pytest
+
+import batchRender
+from batchRender import renderSpec,loadArray,getFunction
+
+
+@pytest.fixture
+def spec(tmp_path):
+    ranks = 100*(1-np.logspace(0,-3,50))
+    np.savez(tmp_path/'dist.npz',ranks=ranks,percentiles=np.exp(ranks/20))
+    np.save(tmp_path/'ranks.npy',ranks)
+    panel = {'function':'plot1D.subplotRanksILog',
+             'arrays':{'ranks':str(tmp_path/'dist.npz')+':ranks','y':str(tmp_path/'dist.npz')+':percentiles'},
+             'kwargs':{'rankmax':99.9}}
+    spec = {'defaults':{'figsize':[4,3],'dpi':50},
+            'figures':[{'output':str(tmp_path/'out'/('fig%d.png'%i)),'panels':[[panel]],
+                        'set':[{'xlabel':'Ranks'}]} for i in range(3)]}
+    with open(tmp_path/'spec.json','w') as f:
+        json.dump(spec,f)
+    return tmp_path/'spec.json'
+
+
+@pytest.mark.parametrize('processes',[1,2])
+def test_renderSpec(spec, processes):
+    timings = list(renderSpec(str(spec),processes=processes))
+    assert [t['output'] for t in timings] == [str(spec.parent/'out'/('fig%d.png'%i)) for i in range(3)]
+    for t in timings:
+        assert 'error' not in t
+        assert t['total'] >= t['render'] > 0
+        with open(t['output'],'rb') as f:
+            assert f.read(8) == b'\x89PNG\r\n\x1a\n'
+
+
+def test_errors_reported_per_figure(spec, tmp_path):
+    data = json.loads(spec.read_text())
+    data['figures'][1]['panels'][0][0]['function'] = 'os.remove'
+    timings = list(renderSpec(data,processes=1))
+    assert 'error' not in timings[0] and 'error' not in timings[2]
+    assert timings[1]['error'].startswith('ValueError')
+
+
+def test_getFunction_restricted_to_library():
+    assert getFunction('plot1D.subplotRanksILog').__name__ == 'subplotRanksILog'
+    with pytest.raises(ValueError):
+        getFunction('os.system')
+
+
+def test_loaded_files_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(batchRender,'LOADED_MAXSIZE',3)
+    monkeypatch.setattr(batchRender,'_loaded',type(batchRender._loaded)())
+    for i in range(6):
+        np.savez(tmp_path/('a%d.npz'%i),x=np.arange(i+1))
+        np.testing.assert_array_equal(loadArray(str(tmp_path/('a%d.npz'%i))+':x'),np.arange(i+1))
+        if i == 0:
+            first = batchRender._loaded[str(tmp_path/'a0.npz')]
+    assert len(batchRender._loaded) == 3
+    # evicted npz files are closed
+    assert first.zip is None
+    np.testing.assert_array_equal(loadArray([str(tmp_path/'a5.npz')+':x']*2),[np.arange(6)]*2)
+
+
+def test_cache_created_once_per_worker(spec, tmp_path, monkeypatch):
+    from renderCache import RenderCache
+    cache = RenderCache(str(tmp_path/'cache'))
+    scans = []
+    monkeypatch.setattr(RenderCache,'size',lambda self: scans.append(self) or 0)
+    data = json.loads(spec.read_text())
+    for i, figspec in enumerate(data['figures']):
+        figspec['set'] = [{'xlabel':'Ranks %d'%i}]
+    timings = list(renderSpec(data,processes=1,cache=cache))
+    assert [t['cache'] for t in timings] == ['miss']*3
+    # one scan of the cache directory for all figures, in the given cache
+    assert scans == [cache]
+    assert batchRender._workerCache(cache.path,cache.maxbytes) is cache
+    assert [t['cache'] for t in renderSpec(data,processes=2,cache=cache)] == ['hit']*3
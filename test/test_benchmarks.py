@@ -0,0 +1,27 @@
+"""Consistency of the asv-style benchmark suite (user-011)"""
+
+import inspect
+
+import pytest
+
+from benchmarks.run import iterBenchmarks
+
+BENCHMARKS = sorted({(cls,methname) for _, cls, methname, _ in iterBenchmarks(quick=True)},
+                    key=lambda b: (b[0].__module__,b[0].__name__,b[1]))
+
+
+def test_suite_collected():
+    modules = {cls.__module__ for cls, _ in BENCHMARKS}
+    assert {'benchmarks.bench_plot1D','benchmarks.bench_plot2D','benchmarks.bench_plotCondPDFs'} <= modules
+
+
+@pytest.mark.parametrize('cls,methname',BENCHMARKS,ids=['%s.%s'%(c.__name__,m) for c, m in BENCHMARKS])
+def test_parameters_used(cls, methname):
+    params = getattr(cls,'params',[])
+    assert len(params) == len(getattr(cls,'param_names',[]))
+    for method in [getattr(cls,methname),getattr(cls,'setup',None)]:
+        if method is not None:
+            assert len(inspect.signature(method).parameters) == len(params)+1
+    # only savefig benchmarks are run for each output format
+    if 'format' in getattr(cls,'param_names',[]):
+        assert methname.endswith('savefig')
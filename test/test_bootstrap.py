@@ -0,0 +1,40 @@
+"""Bootstrap confidence bands of tail percentiles (user-014)"""
+
+import numpy as np
+import pytest
+
+from bootstrap import topValues,bootstrapPercentiles
+
+
+@pytest.fixture
+def values():
+    return np.random.default_rng(0).exponential(size=200000)
+
+
+def test_topValues(values):
+    values = values.copy()
+    values[::10] = np.nan
+    top, n = topValues(values,500,chunksize=7000)
+    valid = values[~np.isnan(values)]
+    assert n == valid.size
+    np.testing.assert_array_equal(top,np.sort(valid)[::-1][:500])
+
+
+def test_band_brackets_percentiles(values):
+    ranks, y_BCs = bootstrapPercentiles(values,rankmin=99,rankmax=99.99,nboot=200)
+    assert y_BCs.shape == (2,ranks.size)
+    assert ranks.min() >= 99
+    assert np.all(y_BCs[0] <= y_BCs[1])
+    exact = np.percentile(values,ranks,method='lower')
+    assert np.all((y_BCs[0] <= exact*1.001) & (exact <= y_BCs[1]*1.001))
+    # exponential tail: true percentiles -log(1-q) lie within the band at most ranks
+    true = -np.log(1-ranks/100)
+    assert np.mean((y_BCs[0] <= true) & (true <= y_BCs[1])) > 0.7
+
+
+def test_reproducible_across_processes(values):
+    serial = bootstrapPercentiles(values,rankmin=99,rankmax=99.9,nboot=120,seed=3)[1]
+    parallel = bootstrapPercentiles(values,rankmin=99,rankmax=99.9,nboot=120,seed=3,processes=2)[1]
+    np.testing.assert_array_equal(parallel,serial)
+    other = bootstrapPercentiles(values,rankmin=99,rankmax=99.9,nboot=120,seed=4)[1]
+    assert not np.array_equal(other,serial)
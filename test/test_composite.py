@@ -0,0 +1,72 @@
+"""Chunked composites of 3D fields on bins of a reference variable (user-023)"""
+
+import numpy as np
+import pytest
+
+from composite import computeComposite
+
+
+@pytest.fixture
+def fields(tmp_path):
+    rng = np.random.default_rng(0)
+    pr = rng.exponential(size=(40,300))
+    z = np.linspace(0,10,8)
+    hus = pr[:,None,:]*np.exp(-z/5)[None,:,None]+rng.normal(size=(40,8,300))
+    hus[rng.random(hus.shape) < 0.05] = np.nan
+    np.save(tmp_path/'hus.npy',hus)
+    np.save(tmp_path/'pr.npy',pr)
+    return hus, pr, z, tmp_path
+
+
+def bruteForce(hus, pr, edges):
+    values = np.moveaxis(hus,1,-1).reshape(-1,hus.shape[1])
+    ref = pr.ravel()
+    return np.array([np.nanmean(values[(ref >= a) & (ref < b)],axis=0)
+                     for a, b in zip(edges[:-1],edges[1:])]).T
+
+
+def test_composite_matches_brute_force(fields):
+    hus, pr, z, _ = fields
+    edges = np.array([0,0.5,1,2,4,np.inf])
+    x, y, Z, counts = computeComposite(hus,pr,ref_edges=edges,levels=z,chunksize=7,return_counts=True)
+    np.testing.assert_allclose(Z,bruteForce(hus,pr,edges))
+    np.testing.assert_array_equal(y,z)
+    assert Z.shape == counts.shape == (z.size,edges.size-1)
+    assert counts.sum() == np.isfinite(hus).sum()
+
+
+def test_files_in_processes(fields):
+    hus, pr, z, path = fields
+    edges = np.array([0,0.5,1,2,4,np.inf])
+    _, _, Z = computeComposite(str(path/'hus.npy'),str(path/'pr.npy'),ref_edges=edges,
+                               chunksize=5,processes=2)
+    np.testing.assert_allclose(Z,bruteForce(hus,pr,edges))
+
+
+def test_rank_bins(fields):
+    hus, pr, z, _ = fields
+    xranks = np.array([10,50,90,99])
+    x, y, Z, counts = computeComposite(hus,pr,xranks=xranks,return_counts=True)
+    np.testing.assert_array_equal(x,xranks)
+    np.testing.assert_array_equal(y,np.arange(z.size))
+    # highest bins of precipitation have highest humidity near the surface
+    assert np.all(np.diff(Z[0]) > 0)
+
+
+def test_mismatched_time_steps(fields):
+    hus, pr, _, _ = fields
+    with pytest.raises(ValueError):
+        computeComposite(hus,pr[:-1],ref_edges=[0,1,np.inf])
+
+
+def test_rank_bins_over_many_decades():
+    rng = np.random.default_rng(1)
+    # reference variable spanning about 14 decades
+    pr = rng.lognormal(0,4,(50,2000))
+    hus = np.repeat(np.log(pr)[:,None,:],3,axis=1)
+    xranks = np.array([1,10,50,90,99])
+    _, _, Z, counts = computeComposite(hus,pr,xranks=xranks,return_counts=True)
+    # every bin is populated, and composites of log(pr) increase with ranks
+    assert np.all(counts[0] > 0)
+    assert np.all(np.diff(Z[0]) > 0)
+    assert counts[0].sum() == pr.size
@@ -0,0 +1,103 @@
+"""Conditional profiles and statistics of condStats (user-007, user-018)"""
+
+import numpy as np
+import pytest
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+from condStats import computeConditionalProfiles,ConditionalStatistics,computeConditionalStatistics
+from plotCondPDFs import subplotConditionalProfiles
+
+
+@pytest.fixture
+def profiles():
+    rng = np.random.default_rng(0)
+    ref = rng.uniform(0,30,20000)
+    z = np.linspace(0,1,6)
+    P = ref[:,None]*z[None,:]+rng.normal(size=(ref.size,z.size))
+    P[rng.random(P.shape) < 0.05] = np.nan
+    return ref, P
+
+
+def bruteForce(ref, P, ref_edges, func):
+    return np.array([[func(P[(ref >= a) & (ref < b),j]) for a, b in zip(ref_edges[:-1],ref_edges[1:])]
+                     for j in range(P.shape[1])])
+
+
+def test_mean_and_counts(profiles):
+    ref, P = profiles
+    ref_edges = np.linspace(0,30,7)
+    refbins, mean, quant, counts = computeConditionalProfiles(P,ref,ref_edges,chunksize=3000)
+    np.testing.assert_allclose(refbins,np.arange(2.5,30,5))
+    np.testing.assert_allclose(mean,bruteForce(ref,P,ref_edges,np.nanmean))
+    np.testing.assert_array_equal(counts,bruteForce(ref,P,ref_edges,lambda v: np.isfinite(v).sum()))
+    assert quant is None
+
+
+def test_quantiles_within_value_bins(profiles):
+    ref, P = profiles
+    ref_edges = np.linspace(0,30,4)
+    # NaN first chunk: value edges are taken over all chunks
+    P[:3000] = np.nan
+    _, _, quant, _ = computeConditionalProfiles(P,ref,ref_edges,quantiles=[10,50,90],
+                                                nvaluebins=400,chunksize=3000)
+    width = (np.nanmax(P)-np.nanmin(P))/400
+    for q, expected in zip(quant,[10,50,90]):
+        np.testing.assert_allclose(q,bruteForce(ref,P,ref_edges,lambda v: np.nanpercentile(v,expected)),
+                                   atol=2*width)
+
+
+def test_chunk_size_invariant(profiles):
+    ref, P = profiles
+    ref_edges = np.linspace(0,30,5)
+    value_edges = np.linspace(-5,35,81)
+    a = computeConditionalProfiles(P,ref,ref_edges,quantiles=[50],value_edges=value_edges,chunksize=1000)
+    b = computeConditionalProfiles(P,ref,ref_edges,quantiles=[50],value_edges=value_edges,chunksize=20000)
+    for x, y in zip(a,b):
+        np.testing.assert_allclose(x,y)
+
+
+def test_subplotConditionalProfiles_single_collection():
+    fig = Figure()
+    ax = fig.add_subplot()
+    z = np.linspace(0,10,30)
+    profiles = z[:,None]*np.arange(1,6)[None,:]
+    lc, handles = subplotConditionalProfiles(ax,z,profiles,refbins=np.arange(5),labels=list('abcde'))
+    assert isinstance(lc,LineCollection) and list(ax.collections) == [lc]
+    # first bin drawn on top
+    np.testing.assert_allclose(lc.get_segments()[-1],np.column_stack([profiles[:,0],z]))
+    assert [h.get_label() for h in handles] == list('edcba')
+
+
+def test_statistics_merge_equals_single_pass(profiles):
+    ref, P = profiles
+    edges = np.linspace(0,30,7)
+    single = ConditionalStatistics(edges,P.shape[1],percentiles=[50,90]).update(ref,P)
+    merged = ConditionalStatistics(edges,P.shape[1],percentiles=[50,90])
+    for sl in np.array_split(np.arange(ref.size),5):
+        merged.merge(ConditionalStatistics(edges,P.shape[1],percentiles=[50,90]).update(ref[sl],P[sl]))
+    np.testing.assert_array_equal(merged.counts,single.counts)
+    np.testing.assert_allclose(merged.mean(),single.mean())
+    np.testing.assert_allclose(merged.variance(),single.variance())
+    np.testing.assert_array_equal(merged.quantiles(),single.quantiles())
+
+
+def test_statistics_against_numpy(profiles):
+    ref, P = profiles
+    edges = np.linspace(0,30,4)
+    refbins, mean, var, perc, counts = computeConditionalStatistics(P,ref,x_edges=edges,percentiles=[50],
+                                                                    alpha=0.001,chunksize=3000,processes=2)
+    np.testing.assert_allclose(refbins,[5,15,25])
+    np.testing.assert_allclose(mean,bruteForce(ref,P,edges,np.nanmean))
+    np.testing.assert_allclose(var,bruteForce(ref,P,edges,np.nanvar),rtol=1e-10)
+    median = bruteForce(ref,P,edges,np.nanmedian)
+    # relative accuracy alpha, except near zero where absolute values are small
+    np.testing.assert_allclose(perc[0],median,rtol=0.01,atol=0.05)
+
+
+def test_statistics_on_rank_bins(profiles):
+    ref, P = profiles
+    xranks = [10,50,90]
+    refbins, mean, var, perc, counts = computeConditionalStatistics(list(P.T[:2]),ref,xranks=xranks)
+    assert mean.shape == counts.shape == (2,3) and perc is None
+    np.testing.assert_array_equal(refbins,xranks)
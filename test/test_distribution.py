@@ -0,0 +1,90 @@
+"""Streaming quantile sketches of distribution (user-002, user-018)"""
+
+import numpy as np
+import pytest
+
+from distribution import QuantileSketch,GroupedQuantileSketch,computeSketch,mergeSketches
+
+RANKS = [1,10,50,90,99,99.9,99.99]
+
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(0)
+    return np.concatenate([rng.lognormal(0,1.5,200000),-rng.lognormal(0,1,50000),np.zeros(1000)])
+
+
+def assertRelativeAccuracy(estimate, values, ranks, alpha):
+    # within alpha of the samples around each rank
+    lo = np.percentile(values,ranks,method='lower')
+    hi = np.percentile(values,ranks,method='higher')
+    assert np.all(estimate >= np.minimum(lo*(1-alpha),lo*(1+alpha))-1e-12)
+    assert np.all(estimate <= np.maximum(hi*(1-alpha),hi*(1+alpha))+1e-12)
+
+
+@pytest.mark.parametrize('alpha',[0.01,0.001])
+def test_accuracy(values, alpha):
+    sketch = QuantileSketch(alpha=alpha).update(values)
+    assert sketch.count == values.size
+    assertRelativeAccuracy(sketch.quantiles(RANKS),values,RANKS,alpha)
+
+
+def test_merge_equals_single_pass(values):
+    chunks = np.array_split(values[np.random.default_rng(1).permutation(values.size)],7)
+    merged = mergeSketches([computeSketch([chunk],alpha=0.005) for chunk in chunks])
+    single = computeSketch([values],alpha=0.005)
+    assert merged.count == single.count
+    np.testing.assert_array_equal(merged.quantiles(RANKS),single.quantiles(RANKS))
+    assert (merged.min, merged.max) == (values.min(), values.max())
+
+
+def test_merge_different_alpha():
+    with pytest.raises(ValueError):
+        QuantileSketch(alpha=0.01).merge(QuantileSketch(alpha=0.02))
+
+
+def test_nan_ignored_and_empty():
+    sketch = QuantileSketch()
+    assert np.isnan(sketch.quantiles([50])).all()
+    sketch.update([np.nan,1.,np.nan])
+    assert sketch.count == 1
+    assert sketch.quantiles([50])[0] == 1.
+
+
+def test_maxbins_keeps_upper_tail(values):
+    sketch = QuantileSketch(alpha=0.001,maxbins=2000).update(values)
+    assert sketch.positive.counts.size <= 2000
+    assert sketch.count == values.size
+    assertRelativeAccuracy(sketch.quantiles([99,99.99]),values,[99,99.99],0.001)
+
+
+def test_percentiles_grid():
+    sketch = QuantileSketch().update(np.arange(1,10001.))
+    ranks, percentiles = sketch.percentiles(rankmin=0,rankmax=99.9)
+    assert ranks[-1] == pytest.approx(99.9)
+    assert np.all(np.diff(percentiles) >= 0)
+
+
+def test_grouped_equals_separate_sketches(values):
+    groups = np.random.default_rng(2).integers(0,4,values.size)
+    grouped = GroupedQuantileSketch(5,alpha=0.01)
+    for sl in np.array_split(np.arange(values.size),3):
+        grouped.merge(GroupedQuantileSketch(5,alpha=0.01).update(groups[sl],values[sl]))
+    quantiles = grouped.quantiles(RANKS)
+    assert quantiles.shape == (len(RANKS),5)
+    for g in range(4):
+        separate = QuantileSketch(alpha=0.01).update(values[groups == g])
+        np.testing.assert_array_equal(quantiles[:,g],separate.quantiles(RANKS))
+    # empty group
+    assert np.isnan(quantiles[:,4]).all()
+
+
+def test_grouped_maxbins_bounds_memory(values):
+    groups = np.zeros(values.size,dtype=int)
+    grouped = GroupedQuantileSketch(1,alpha=0.005,maxbins=400).update(groups,values)
+    assert grouped.positive.counts.shape == (1,400)
+    grouped.merge(GroupedQuantileSketch(1,alpha=0.005,maxbins=400).update(groups,values/1000))
+    assert grouped.positive.counts.shape == (1,400)
+    values = np.concatenate([values,values/1000])
+    assert grouped.count[0] == values.size
+    assertRelativeAccuracy(grouped.quantiles([99.9])[:,0],values,[99.9],0.005)
@@ -0,0 +1,58 @@
+"""Blitted rendering of frame series with FrameTemplate (user-008)"""
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import plot1D
+from frameTemplate import FrameTemplate,flattenArtists
+
+RANKS = 100*(1-np.logspace(0,-4,200))
+
+
+def rankFigure(values, decimate=None):
+    fig = Figure(figsize=(4,3),dpi=50)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    plot1D.setFrame(ax,rankmin=0,rankmax=99.99)
+    ax.set_ylim(-2,2)
+    h = plot1D.showData(ax,RANKS,values,decimate=decimate)
+    return fig, h
+
+
+def fullRender(values, decimate=None):
+    fig, _ = rankFigure(values,decimate)
+    fig.canvas.draw()
+    return np.array(fig.canvas.buffer_rgba())
+
+
+def test_flattenArtists():
+    assert flattenArtists([1,(2,[3]),[]]) == [1,2,3]
+
+
+def test_update_matches_full_render(tmp_path):
+    series = [np.sin(RANKS/10+i) for i in range(3)]
+    fig, h = rankFigure(series[0])
+    template = FrameTemplate(fig,h)
+    for i, values in enumerate(series):
+        template.update(values)
+        frame = template.rgba()
+        expected = fullRender(values)
+        # data are drawn over the frame instead of in z-order: spines may differ
+        assert np.mean(np.any(frame != expected,axis=-1)) < 0.005
+        template.saveFrame(str(tmp_path/('frame_%d.png'%i)))
+        assert (tmp_path/('frame_%d.png'%i)).stat().st_size > 0
+    template.close()
+    assert not h[0].get_animated()
+
+
+def test_update_long_curves_not_decimated(monkeypatch):
+    # curves longer than DECIMATE_MIN_POINTS are decimated by default
+    monkeypatch.setattr(plot1D,'DECIMATE_MIN_POINTS',50)
+    fig, h = rankFigure(np.sin(RANKS/10),decimate=False)
+    assert len(h[0].get_xdata()) == RANKS.size
+    template = FrameTemplate(fig,h)
+    values = np.cos(RANKS/10)
+    template.update(values)
+    assert np.mean(np.any(template.rgba() != fullRender(values,False),axis=-1)) < 0.005
+    template.close()
@@ -0,0 +1,76 @@
+"""Level-of-detail pyramid of joint histograms (user-021)"""
+
+import numpy as np
+import pytest
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from rankAxis import rankGrid
+from jointDistribution import countsToDensity
+from histogramPyramid import HistogramPyramid,downsampleEdges,downsampleSum
+import plot2D
+
+RANKS = rankGrid(0,99.99,0.005)
+
+
+@pytest.fixture
+def counts():
+    return np.random.default_rng(0).poisson(5,(RANKS.size,RANKS.size))
+
+
+def test_downsample():
+    a = np.arange(15).reshape(3,5)
+    np.testing.assert_array_equal(downsampleSum(a),[[0+1+5+6,2+3+7+8,4+9],[10+11,12+13,14]])
+    np.testing.assert_array_equal(downsampleEdges(np.arange(6)),[0,2,4,5])
+    np.testing.assert_array_equal(downsampleEdges(np.arange(5)),[0,2,4])
+
+
+def test_levels_consistent(counts):
+    pyramid = HistogramPyramid(counts,RANKS,RANKS)
+    assert pyramid.nlevels > 3 and max(pyramid.counts[-1].shape) <= 64
+    np.testing.assert_allclose(pyramid.values(0),countsToDensity(counts,RANKS,RANKS))
+    for level in range(pyramid.nlevels):
+        assert pyramid.counts[level].sum() == counts.sum()
+        assert pyramid.x_edges[level].size == pyramid.counts[level].shape[1]+1
+        np.testing.assert_allclose(pyramid.dqx[level].sum(),1)
+        # density integrates to 1 at every level
+        area = np.outer(pyramid.dqy[level],pyramid.dqx[level])
+        np.testing.assert_allclose(np.sum(pyramid.values(level)*area),1)
+
+
+def test_select_level_from_pixels(counts):
+    pyramid = HistogramPyramid(counts,RANKS,RANKS)
+    full = (RANKS[0],RANKS[-1])
+    level, ywin, xwin = pyramid.select(full,full,500,500)
+    assert level == int(np.ceil(np.log2(RANKS.size/500)))
+    assert pyramid.select(full,full,4000,4000)[0] == 0
+    # zooming in selects finer levels and narrower windows
+    zoom = (99,99.9)
+    level_zoom, _, xwin_zoom = pyramid.select(zoom,zoom,500,500)
+    assert level_zoom < level
+    edges = pyramid.x_edges[level_zoom]
+    assert edges[xwin_zoom.start] <= 99 and edges[min(xwin_zoom.stop,edges.size-1)] >= 99.9
+
+
+def test_view_follows_dpi_and_zoom(counts):
+    fig = Figure(figsize=(4,4),dpi=100)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    plot2D.setFrameIL(ax,RANKS,RANKS)
+    view = plot2D.showJointHistogramLOD(ax,counts,RANKS,RANKS,scale='log',vmin=1e-2,vmax=1e2)
+    fig.canvas.draw()
+    level = view.state[0]
+    assert view.mesh.get_array().size < counts.size
+    # the mesh does not change data limits
+    assert view.mesh not in ax.collections
+    fig.set_dpi(400)
+    fig.canvas.draw()
+    assert view.state[0] < level
+    ax.set_xlim(99,99.99)
+    ax.set_ylim(99,99.99)
+    fig.canvas.draw()
+    assert view.state[0] == 0
+    view.disconnect()
+    ax.set_xlim(0,99.99)
+    fig.canvas.draw()
+    assert view.state[0] == 0
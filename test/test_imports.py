@@ -0,0 +1,14 @@
+"""Pyplot-free imports of the library (user-010)
+
+Import times depend on the machine, their budgets are checked by
+python -m benchmarks.run --check-imports only.
+"""
+
+import pytest
+
+from benchmarks.bench_import import IMPORT_BUDGET,importedModules
+
+
+@pytest.mark.parametrize('module',list(IMPORT_BUDGET))
+def test_import_forbidden(module):
+    assert importedModules(module) == [], 'importing %s imports %s'%(module,importedModules(module))
@@ -0,0 +1,116 @@
+"""Joint histograms and KDE on inverse-log rank bins (user-004, user-020)"""
+
+import numpy as np
+import pytest
+
+from rankAxis import rankGrid
+from jointDistribution import binIndices,rankBinEdges,computeJointCounts,computeJointHistogram,percentileEdges
+from jointDistribution import gaussianKernel,gaussianSmooth,gridSpacing,smoothJointCounts,computeJointKDE
+
+
+@pytest.fixture
+def samples():
+    rng = np.random.default_rng(0)
+    x = rng.lognormal(0,1,100000)
+    y = x*rng.lognormal(0,0.5,x.size)
+    x[::97] = np.nan
+    return x, y
+
+
+def test_binIndices():
+    edges = np.array([0.,1.,2.])
+    np.testing.assert_array_equal(binIndices(np.array([-1,0,0.5,1,2,np.nan]),edges),[-1,0,0,1,-1,-1])
+
+
+def test_counts_match_histogram2d(samples):
+    x, y = samples
+    x_edges = np.linspace(0,5,21)
+    y_edges = np.linspace(0,10,31)
+    counts = computeJointCounts(x,y,x_edges,y_edges,chunksize=7000)
+    # histogram2d includes the last edge, binIndices does not
+    valid = (x < x_edges[-1]) & (y < y_edges[-1])
+    expected, _, _ = np.histogram2d(y[valid],x[valid],bins=[y_edges,x_edges])
+    np.testing.assert_array_equal(counts,expected)
+
+
+def test_parallel_equals_serial(samples):
+    x, y = samples
+    ranks = rankGrid(0,99.9,0.25)
+    x_edges, y_edges = percentileEdges(x,ranks), percentileEdges(y,ranks)
+    serial = computeJointCounts(x,y,x_edges,y_edges,chunksize=9000)
+    parallel = computeJointCounts(x,y,x_edges,y_edges,chunksize=9000,processes=2)
+    np.testing.assert_array_equal(parallel,serial)
+
+
+def test_percentileEdges_over_many_decades():
+    # about 14 decades of values
+    values = np.random.default_rng(3).lognormal(0,4,200000)
+    ranks = rankGrid(0,99.99)
+    edges = percentileEdges(values,ranks,alpha=0.001)
+    assert np.all(np.diff(edges) > 0)
+    inner = rankBinEdges(ranks)[1:-1]
+    lower = np.percentile(values,inner,method='lower')
+    higher = np.percentile(values,inner,method='higher')
+    assert np.all(edges[1:-1] >= lower*(1-0.001))
+    assert np.all(edges[1:-1] <= higher*(1+0.001))
+
+
+def test_independent_density_is_one():
+    rng = np.random.default_rng(1)
+    x, y = rng.random(400000), rng.random(400000)
+    ranks = rankGrid(0,90,0.5)
+    counts, density, _, _ = computeJointHistogram(x,y,ranks,ranks)
+    assert counts.sum() == x.size
+    # marginal densities of ranks are 1 in every bin
+    dqy = np.diff(rankBinEdges(ranks))/100.
+    np.testing.assert_allclose((density*dqy[:,None]).sum(axis=0),1,rtol=0.05)
+
+
+@pytest.mark.parametrize('sigma',[0.7,3,12.5])
+def test_gaussianSmooth_matches_direct_convolution(sigma):
+    a = np.random.default_rng(2).poisson(0.5,(4,60)).astype(float)
+    weights = gaussianKernel(sigma)
+    pad = len(weights)//2
+    padded = np.pad(a,[(0,0),(pad,pad)],mode='symmetric')
+    expected = np.array([np.convolve(row,weights,mode='valid') for row in padded])
+    smoothed = gaussianSmooth(a,sigma,axis=1)
+    np.testing.assert_allclose(smoothed,expected,atol=1e-12)
+    np.testing.assert_allclose(gaussianSmooth(a.T,sigma,axis=0),smoothed.T,atol=1e-12)
+    assert np.all(smoothed >= 0)
+
+
+def test_gaussianSmooth_exact_zeros_and_mass():
+    a = np.zeros(200)
+    a[100] = 1000.
+    smoothed = gaussianSmooth(a,2)
+    assert smoothed.sum() == pytest.approx(1000)
+    assert np.all(smoothed[:92] == 0) and np.all(smoothed[109:] == 0)
+
+
+def test_gridSpacing():
+    assert gridSpacing(rankGrid(0,99.99,0.25)) == pytest.approx(0.25)
+    with pytest.raises(ValueError):
+        gridSpacing([0,50,60,99])
+
+
+@pytest.mark.parametrize('adaptive',[False,True])
+def test_smoothing_conserves_counts(samples, adaptive):
+    ranks = rankGrid(0,99.9,0.05)
+    x, y = samples
+    smoothed, density, _, _ = computeJointKDE(x,y,ranks,ranks,bandwidth=0.1,adaptive=adaptive)
+    counts = computeJointHistogram(x,y,ranks,ranks)[0]
+    assert np.all(smoothed >= 0)
+    np.testing.assert_allclose(smoothed.sum(),counts.sum(),rtol=0.01)
+
+
+def test_adaptive_widens_sparse_regions():
+    ranks = rankGrid(0,99.9,0.05)
+    counts = np.zeros((ranks.size,ranks.size))
+    counts[20,20] = 10000
+    counts[50,50] = 1
+    fixed = smoothJointCounts(counts,ranks,ranks,bandwidth=0.1)
+    adaptive = smoothJointCounts(counts,ranks,ranks,bandwidth=0.1,adaptive=True)
+    # the isolated sample is spread wider, the dense peak is unchanged
+    assert adaptive[50,50] < fixed[50,50]
+    np.testing.assert_allclose(adaptive[10:31,10:31],fixed[10:31,10:31],atol=1e-3)
+    np.testing.assert_allclose(adaptive.sum(),fixed.sum())
@@ -0,0 +1,60 @@
+"""Live joint histograms and percentile curves (user-017)"""
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from rankAxis import rankGrid
+from distribution import QuantileSketch
+from jointDistribution import computeJointCounts
+from liveDistribution import LiveJointHistogram,LiveQuantiles
+
+
+def newAxes():
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    return fig.add_subplot()
+
+
+def batches(n=5, size=20000):
+    rng = np.random.default_rng(0)
+    for _ in range(n):
+        x = rng.lognormal(size=size)
+        yield x, x*rng.lognormal(size=size)
+
+
+def test_joint_histogram_equals_batch():
+    ranks = rankGrid(0,99,0.5)
+    data = list(batches())
+    live = LiveJointHistogram.fromSample(*data[0],ranks,ranks)
+    for x, y in data[1:]:
+        live.update(x,y)
+    x, y = np.concatenate([d[0] for d in data]), np.concatenate([d[1] for d in data])
+    np.testing.assert_array_equal(live.counts,computeJointCounts(x,y,live.x_edges,live.y_edges))
+    assert live.count == x.size
+
+
+def test_joint_histogram_refresh_sets_mesh():
+    ranks = rankGrid(0,99,0.5)
+    data = list(batches(2))
+    ax = newAxes()
+    live = LiveJointHistogram.fromSample(*data[0],ranks,ranks).show(ax,scale='log',vmin=1e-2,vmax=1e2)
+    mesh = live.artists[0]
+    live.update(*data[1])
+    live.refresh()
+    np.testing.assert_allclose(mesh.get_array().ravel(),live.values().ravel())
+    assert mesh.axes is ax
+
+
+def test_quantiles_refresh_sets_curve():
+    ranks = rankGrid(0,99.9)
+    ax = newAxes()
+    live = LiveQuantiles(ranks,alpha=0.01).update(np.arange(1,1001.)).show(ax,rankmax=99.9)
+    line = live.artists[0]
+    sketch = QuantileSketch(alpha=0.01).update(np.arange(1,1001.))
+    for x, _ in batches(3):
+        live.update(x)
+        sketch.update(x)
+    live.refresh(draw=False)
+    np.testing.assert_array_equal(line.get_ydata(),sketch.quantiles(ranks))
+    assert ax.get_ylim()[1] >= line.get_ydata().max()
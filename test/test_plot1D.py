@@ -0,0 +1,53 @@
+"""Curves of plot1D on inverse-log axes (user-003)"""
+
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba
+from matplotlib.figure import Figure
+
+import plot1D
+
+
+def newAxes():
+    fig = Figure(figsize=(6,4.5))
+    return fig, fig.add_subplot()
+
+
+def curves(ncurves, npoints=100):
+    ranks = 100*(1-np.logspace(0,-4,npoints))
+    return ranks, [np.sin(ranks/10)+i for i in range(ncurves)]
+
+
+def test_batch_single_collection():
+    fig, ax = newAxes()
+    ranks, y = curves(50)
+    _, (lc, handles) = plot1D.subplotRanksILog(ax,[ranks]*50,y,batch=True)
+    assert isinstance(lc,LineCollection)
+    assert list(ax.collections) == [lc] and handles == []
+    segments = lc.get_segments()
+    assert len(segments) == 50
+    np.testing.assert_allclose(segments[3],np.column_stack([ranks,y[3]]))
+    assert ax.get_xscale() == 'invlog'
+
+
+def test_batch_matches_individual_curves():
+    ranks, y = curves(5)
+    col = ['r','g','b','k','c']
+    fig, ax = newAxes()
+    _, lines = plot1D.subplotRanksILog(ax,[ranks]*5,y,col=col)
+    fig_b, ax_b = newAxes()
+    _, (lc, _) = plot1D.subplotRanksILog(ax_b,[ranks]*5,y,col=col,batch=True)
+    for h, segment, color in zip(lines,lc.get_segments(),lc.get_colors()):
+        np.testing.assert_allclose(h[0].get_xydata(),segment)
+        np.testing.assert_allclose(to_rgba(h[0].get_color()),color)
+    assert ax.get_xlim() == ax_b.get_xlim()
+
+
+def test_batch_labels_and_ragged_curves():
+    fig, ax = newAxes()
+    ranks = [100*(1-np.logspace(0,-3,n)) for n in [10,20,30]]
+    y = [np.arange(n,dtype=float) for n in [10,20,30]]
+    _, (lc, handles) = plot1D.subplotRanksILog(ax,ranks,y,batch=True,labels=['a',None,'c'])
+    assert [len(s) for s in lc.get_segments()] == [10,20,30]
+    assert [h.get_label() for h in handles] == ['a','c']
+    fig.canvas.draw()
@@ -0,0 +1,78 @@
+"""MidpointNormalize and histogram norms of plot2D (user-024)"""
+
+import numpy as np
+import pytest
+from matplotlib import colors
+
+from plot2D import MidpointNormalize,MidpointLogNorm,histogramNorm
+
+
+def reference(values, vmin, mid, vmax):
+    return np.interp(values,[vmin,mid,vmax],[0,0.5,1],left=np.nan,right=np.nan)
+
+
+def test_piecewise_linear():
+    norm = MidpointNormalize(vmin=-10,vmax=100,midpoint=0)
+    values = np.linspace(-10,100,1001)
+    np.testing.assert_allclose(norm(values),reference(values,-10,0,100),atol=1e-6)
+    # outside [vmin,vmax]: under and over colors, unless clip
+    np.testing.assert_allclose(norm(np.array([-20.,200.])),[-0.5,1.5])
+    np.testing.assert_allclose(MidpointNormalize(-10,100,0,clip=True)(np.array([-20.,200.])),[0,1])
+    assert norm(50.) == pytest.approx(0.75)
+
+
+def test_blocks_and_out():
+    norm = MidpointNormalize(vmin=-1,vmax=3,midpoint=0)
+    values = np.random.default_rng(0).uniform(-1,3,(300,400))
+    expected = reference(values,-1,0,3)
+    out = np.empty_like(values)
+    result = norm(values,out=out)
+    assert np.shares_memory(result,out)
+    np.testing.assert_allclose(out,expected,atol=1e-12)
+    # in place, and into a non-contiguous array
+    in_place = values.copy()
+    norm(in_place,out=in_place)
+    np.testing.assert_allclose(in_place,expected,atol=1e-12)
+    strided = np.empty((400,300)).T
+    norm(values,out=strided)
+    np.testing.assert_allclose(strided,expected,atol=1e-12)
+
+
+def test_inverse_round_trip():
+    norm = MidpointNormalize(vmin=-10,vmax=100,midpoint=0)
+    values = np.linspace(-10,100,57)
+    np.testing.assert_allclose(norm.inverse(norm(values)),values,atol=1e-4)
+    assert norm.inverse(0.5) == pytest.approx(0)
+    log_norm = MidpointLogNorm(vmin=1e-2,vmax=1e3,midpoint=1)
+    values = np.logspace(-2,3,31)
+    np.testing.assert_allclose(log_norm.inverse(log_norm(values)),values,rtol=1e-5)
+    assert log_norm(1.) == pytest.approx(0.5)
+
+
+def test_mask_nan_and_autoscale():
+    values = np.ma.masked_array([-2.,np.nan,1.,4.],mask=[False,False,True,False])
+    norm = MidpointNormalize(midpoint=0)
+    result = norm(values)
+    assert (norm.vmin, norm.vmax) == (-2, 4)
+    assert result.mask.tolist() == [False,False,True,False]
+    # the mask of the input is not modified
+    assert values.mask.tolist() == [False,False,True,False]
+    assert np.isnan(result.data[1])
+    np.testing.assert_allclose(result.data[[0,3]],[0,1])
+    log_norm = MidpointLogNorm(midpoint=1)
+    assert np.isnan(log_norm(np.array([0.,0.1,10.])).data[0])
+    assert (log_norm.vmin, log_norm.vmax) == (0.1, 10)
+
+
+def test_invalid_midpoint():
+    with pytest.raises(ValueError):
+        MidpointNormalize(vmin=0,vmax=1,midpoint=2)(np.array([0.5]))
+
+
+def test_histogramNorm():
+    assert type(histogramNorm('linear')) is colors.Normalize
+    assert type(histogramNorm('log',1e-2,1e2)) is colors.LogNorm
+    assert isinstance(histogramNorm('log',1e-2,1e2,midpoint=1),MidpointLogNorm)
+    assert isinstance(histogramNorm('linear',-1,1,midpoint=0),MidpointNormalize)
+    with pytest.raises(ValueError):
+        histogramNorm('sqrt')
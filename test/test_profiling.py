@@ -0,0 +1,54 @@
+"""Opt-in profiling of plotting calls (user-012)"""
+
+import csv
+import json
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import plot1D
+import profiling
+
+RANKS = 100*(1-np.logspace(0,-4,100))
+
+
+def newAxes():
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+
+def test_records_and_restores(tmp_path):
+    original = plot1D.showData
+    fig, ax = newAxes()
+    with profiling.profile(str(tmp_path/'timing.json')) as prof:
+        assert plot1D.showData is not original
+        plot1D.subplotRanksILog(ax,RANKS,np.arange(100.))
+        fig.canvas.draw()
+    assert plot1D.showData is original
+
+    calls = {r['function']:r for r in prof.records}
+    assert calls['plot1D.subplotRanksILog']['depth'] == 0
+    # nested calls through module attributes are recorded
+    assert calls['plot1D.showData']['depth'] == 1
+    assert calls['plot1D.showData']['n_elements'] == 200
+    assert calls['plot1D.subplotRanksILog']['n_artists_created'] >= 1
+    assert 'Figure.draw' in calls
+    summary = prof.summary()
+    assert [s['time'] for s in summary] == sorted([s['time'] for s in summary],reverse=True)
+
+    with open(tmp_path/'timing.json') as f:
+        assert len(json.load(f)['records']) == len(prof.records)
+
+
+def test_global_switch_csv(tmp_path):
+    profiling.enable()
+    fig, ax = newAxes()
+    plot1D.setFrame(ax)
+    prof = profiling.disable(str(tmp_path/'timing.csv'))
+    assert profiling.disable() is None
+    with open(tmp_path/'timing.csv') as f:
+        rows = list(csv.DictReader(f))
+    assert [r['function'] for r in rows] == [r['function'] for r in prof.records]
+    assert 'plot1D.setFrame' in [r['function'] for r in rows]
@@ -0,0 +1,109 @@
+"""Rank transforms, decimation and RankAxis of rankAxis (user-013, user-019)"""
+
+import numpy as np
+import pytest
+from matplotlib.figure import Figure
+
+import plot1D
+from rankAxis import decimateRanks,ranksToInvLog,invLogToRanks,rankGrid,rankEdges,RankAxis
+from scaleInvLog import InvLogLocator
+
+
+@pytest.fixture
+def curve():
+    rng = np.random.default_rng(0)
+    ranks = 100*(1-np.logspace(0,-6,10**6))
+    return ranks, np.cumsum(rng.normal(size=ranks.size))
+
+
+def test_envelope_preserved(curve):
+    ranks, values = curve
+    ncolumns = 500
+    i_keep = decimateRanks(ranks,values,ncolumns)
+    assert i_keep.size < values.size//100
+    assert np.all(np.diff(i_keep) > 0) and i_keep[0] == 0 and i_keep[-1] == values.size-1
+    # same minimum and maximum in every column
+    k = ranksToInvLog(ranks)
+    col = np.clip(np.floor((k-k[0])/(k[-1]-k[0])*ncolumns),0,ncolumns-1).astype(int)
+    starts = np.flatnonzero(np.diff(col,prepend=-1))
+    starts_kept = np.flatnonzero(np.diff(col[i_keep],prepend=-1))
+    np.testing.assert_array_equal(col[starts],col[i_keep][starts_kept])
+    for reduce in [np.minimum,np.maximum]:
+        np.testing.assert_array_equal(reduce.reduceat(values[i_keep],starts_kept),
+                                      reduce.reduceat(values,starts))
+
+
+def test_short_curves_and_rankfull(curve):
+    ranks, values = curve
+    np.testing.assert_array_equal(decimateRanks(ranks[:100],values[:100],50),np.arange(100))
+    i_keep = decimateRanks(ranks,values,100,rankfull=99.999)
+    tail = np.flatnonzero(ranks >= 99.999)
+    assert np.isin(tail,i_keep).all()
+
+
+def test_nan_values(curve):
+    ranks, values = curve
+    values = values.copy()
+    values[::3] = np.nan
+    i_keep = decimateRanks(ranks,values,200)
+    assert np.isfinite(values[i_keep]).sum() > 0
+    assert np.nanmax(values[i_keep]) == np.nanmax(values)
+    assert np.nanmin(values[i_keep]) == np.nanmin(values)
+
+
+def test_showData_decimates_long_curves(curve):
+    ranks, values = curve
+    fig = Figure(figsize=(4,3),dpi=100)
+    ax = fig.add_subplot()
+    h = plot1D.showData(ax,ranks,values,rankmax=99.9999)
+    assert len(h[0].get_xdata()) < ranks.size//10
+    h = plot1D.showData(ax,ranks,values,rankmax=99.9999,decimate=False)
+    assert len(h[0].get_xdata()) == ranks.size
+
+
+def test_RankAxis_matches_functions():
+    axis = RankAxis.grid(0,99.99,0.1)
+    ranks = rankGrid(0,99.99,0.1)
+    np.testing.assert_allclose(axis.ranks,ranks)
+    np.testing.assert_allclose(axis.edges,rankEdges(ranks))
+    np.testing.assert_allclose(axis.x,1/(1-ranks/100))
+    np.testing.assert_allclose(np.asarray(axis),ranks)
+    assert len(axis) == ranks.size
+
+
+def test_RankAxis_cached_and_immutable():
+    axis = RankAxis.grid(0,99.9)
+    assert RankAxis.grid(0,99.9) is axis
+    assert axis.edges is axis.edges
+    for array in [axis.ranks,axis.k,axis.x,axis.edges]:
+        assert not array.flags.writeable
+    with pytest.raises(AttributeError):
+        axis.k = np.zeros(3)
+    assert axis == RankAxis(k=axis.k) and hash(axis) == hash(RankAxis(k=axis.k))
+
+
+def test_RankAxis_float32_edges_distinct():
+    axis = RankAxis.grid(0,99.99999,0.1,dtype=np.float32)
+    assert axis.k.dtype == np.float32
+    assert axis.edges.dtype == np.float64
+    assert np.all(np.diff(axis.edges) > 0)
+
+
+def test_RankAxis_float32_ranks():
+    axis = RankAxis(k=np.arange(0,7,0.1),dtype=np.float32)
+    # indexing does not compute all ranks
+    assert axis[-1] == pytest.approx(100*(1-10**-axis.k[-1].astype(float)),rel=1e-12)
+    np.testing.assert_array_equal(axis[2:5],invLogToRanks(axis.k[2:5]))
+    assert 'ranks' not in vars(axis)
+    # ranks are computed once, in float64
+    assert axis.ranks is axis.ranks
+    assert axis.ranks.dtype == np.float64 and not axis.ranks.flags.writeable
+    np.testing.assert_array_equal(axis[2:5],axis.ranks[2:5])
+
+
+def test_ticks():
+    ranks, labels = RankAxis.grid(0,99.99).ticks()
+    np.testing.assert_allclose(ranks,[0,90,99,99.9,99.99])
+    assert labels[-1] == '99.99'
+    ticks = InvLogLocator().tick_values(0,99.99)
+    assert ticks.flags.writeable
@@ -0,0 +1,87 @@
+"""Cached rasterization of heavy data layers (user-015)"""
+
+import io
+
+import numpy as np
+import pytest
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import plot1D
+import rasterLayers
+from rasterLayers import RasterLayer,rasterizeLayer,setRasterization
+
+
+def curvesFigure(rasterized, ncurves=200):
+    fig = Figure(figsize=(4,3))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ranks = 100*(1-np.logspace(0,-3,500))
+    y = [np.sin(ranks/10)+i/ncurves for i in range(ncurves)]
+    _, h = plot1D.subplotRanksILog(ax,[ranks]*ncurves,y,rankmax=99.9,rasterized=rasterized)
+    return fig, ax, h
+
+
+def pdfBytes(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer,format='pdf')
+    return buffer.getvalue()
+
+
+def test_layer_replaces_curves_in_pdf():
+    fig, ax, h = curvesFigure(rasterized=True)
+    layers = [a for a in ax.artists if isinstance(a,RasterLayer)]
+    assert len(layers) == 1 and len(layers[0].artists) == 200
+    vector = pdfBytes(curvesFigure(rasterized=False)[0])
+    assert len(pdfBytes(fig)) < len(vector)
+
+
+def test_render_cached_until_change(monkeypatch):
+    fig, ax, h = curvesFigure(rasterized=True,ncurves=5)
+    layer = ax.artists[0]
+    renders = []
+    render = layer._render
+    monkeypatch.setattr(layer,'_render',lambda: renders.append(1) or render())
+    fig.canvas.draw()
+    pdfBytes(fig)
+    assert len(renders) == 1
+    ax.set_ylim(-5,5)
+    fig.canvas.draw()
+    assert len(renders) == 2
+    h[0][0].set_ydata(np.zeros(500))
+    fig.canvas.draw()
+    assert len(renders) == 3
+
+
+def test_layer_out_of_data_limits():
+    fig, ax, h = curvesFigure(rasterized=True,ncurves=3)
+    fig.canvas.draw()
+    for line in [l[0] for l in h]:
+        line.set_ydata(line.get_ydata()+10)
+    ax.relim()
+    ax.autoscale_view()
+    assert ax.get_ylim()[0] > 8
+
+
+def test_remove_restores_vector_curves():
+    fig, ax, h = curvesFigure(rasterized=True,ncurves=3)
+    ax.artists[0].remove()
+    assert len(ax.artists) == 0
+    assert 'draw' not in vars(h[0][0])
+
+
+@pytest.fixture
+def defaults():
+    settings = dict(rasterLayers.RASTER_SETTINGS)
+    yield
+    rasterLayers.RASTER_SETTINGS.update(settings)
+
+
+def test_global_default(defaults):
+    setRasterization(True,dpi=100)
+    fig, ax, h = curvesFigure(rasterized=None,ncurves=3)
+    assert ax.artists[0].dpi == 100
+    setRasterization(True,cache=False)
+    fig = Figure()
+    line, = fig.add_subplot().plot([0,1])
+    assert rasterizeLayer(line) is None and line.get_rasterized()
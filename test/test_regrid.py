@@ -0,0 +1,108 @@
+"""Reusable regridding of 2D fields (user-005, user-006)"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip('scipy')
+from scipy.interpolate import make_interp_spline,griddata
+
+from regrid import Regridder,getRegridder,getTriangulationRegridder
+from plot2D import resampleVerticalData
+
+
+@pytest.fixture
+def field():
+    x = np.sort(np.random.default_rng(0).uniform(0,10,40))
+    y = np.linspace(0,1,15)
+    Z = np.sin(x)[None,:]*np.cos(3*y)[:,None]
+    return x, y, Z
+
+
+@pytest.mark.parametrize('kind,k',[('linear',1),('quadratic',2),('cubic',3)])
+def test_matches_make_interp_spline(field, kind, k):
+    x, y, Z = field
+    x_new = np.linspace(x[0],x[-1],101)
+    expected = make_interp_spline(x,Z,k=k,axis=1)(x_new)
+    np.testing.assert_allclose(Regridder(x,x_new,kind=kind)(Z),expected,atol=1e-10)
+
+
+def test_nan_columns_skipped(field):
+    x, y, Z = field
+    Z = Z.copy()
+    Z[:,:5] = np.nan
+    Z[:,20] = np.nan
+    x_new = np.linspace(0,10,51)
+    valid = np.ones(x.size,dtype=bool)
+    valid[:5] = valid[20] = False
+    expected = make_interp_spline(x[valid],Z[:,valid],k=3,axis=1)(x_new)
+    outside = (x_new < x[5]) | (x_new > x[-1])
+    expected[:,outside] = np.nan
+    np.testing.assert_allclose(Regridder(x,x_new)(Z),expected,atol=1e-10)
+
+
+def test_stacked_fields_with_different_masks(field):
+    x, y, Z = field
+    stack = np.stack([Z,Z.copy()])
+    stack[1][:,10] = np.nan
+    x_new = np.linspace(x[0],x[-1],30)
+    regridder = Regridder(x,x_new)
+    Z_new = regridder(stack)
+    assert Z_new.shape == (2,y.size,30)
+    np.testing.assert_allclose(Z_new[0],regridder(Z))
+    assert len(regridder._weights) == 2
+
+
+def test_nan_cells_skipped_per_row(field):
+    x, y, Z = field
+    Z = Z.copy()
+    Z[2,10] = np.nan
+    x_new = np.linspace(x[0],x[-1],41)
+    Z_new = Regridder(x,x_new)(Z)
+    # other rows are unaffected, row 2 is interpolated from its valid cells
+    expected = make_interp_spline(x,Z[[0,1,3]],k=3,axis=1)(x_new)
+    np.testing.assert_allclose(Z_new[[0,1,3]],expected,atol=1e-10)
+    valid = np.arange(x.size) != 10
+    np.testing.assert_allclose(Z_new[2],make_interp_spline(x[valid],Z[2,valid],k=3)(x_new),atol=1e-10)
+    assert np.isfinite(Z_new).all()
+
+
+def test_weights_cache_bounded(field, monkeypatch):
+    import regrid
+    monkeypatch.setattr(regrid,'WEIGHTS_CACHE_SIZE',4)
+    x, y, Z = field
+    regridder = Regridder(x,np.linspace(x[0],x[-1],20))
+    for i in range(10):
+        Z_nan = Z.copy()
+        Z_nan[:,i] = np.nan
+        regridder(Z_nan)
+    assert len(regridder._weights) == 4
+
+
+def test_getRegridder_cached(field):
+    x = field[0]
+    x_new = np.linspace(0,10,11)
+    assert getRegridder(x,x_new) is getRegridder(x.copy(),list(x_new))
+    assert getRegridder(x,x_new) is not getRegridder(x,x_new,kind='linear')
+
+
+def test_triangulation_matches_griddata():
+    rng = np.random.default_rng(1)
+    points = rng.random((300,2))
+    points_new = rng.uniform(-0.1,1.1,(500,2))
+    values = np.sin(4*points[:,0])+points[:,1]**2
+    expected = griddata(points,values,points_new,method='linear')
+    Z_new = getTriangulationRegridder(points,points_new)(np.stack([values,2*values]))
+    np.testing.assert_allclose(Z_new[0],expected,atol=1e-10)
+    np.testing.assert_allclose(Z_new[1],2*expected,atol=1e-10)
+
+
+def test_resampleVerticalData_time_series():
+    x = np.array([0.,1.,3.,6.])
+    y = np.array([0.,0.5,2.])
+    X, Y = np.meshgrid(x,y)
+    # fields linear in x and y are resampled exactly
+    Z = np.stack([(X+2*Y).ravel()*t for t in range(1,4)])
+    Z_new = resampleVerticalData(x,y,Z)
+    assert Z_new.shape == (3,y.size,x.size)
+    Xr, Yr = np.meshgrid(np.linspace(0,6,x.size),np.linspace(0,2,y.size))
+    np.testing.assert_allclose(Z_new[2],3*(Xr+2*Yr),atol=1e-10)
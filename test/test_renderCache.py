@@ -0,0 +1,95 @@
+"""Content-addressed render cache (user-022)"""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+from matplotlib.colors import LogNorm
+
+import renderCache
+from renderCache import RenderCache,hashInputs
+from rankAxis import RankAxis
+
+
+def writeFigure(output, values, scale=1.):
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(2,2),dpi=30)
+    fig.add_subplot().plot(values*scale)
+    fig.savefig(output)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return RenderCache(str(tmp_path/'cache'))
+
+
+def test_hit_and_miss(cache, tmp_path):
+    values = np.arange(10.)
+    output = str(tmp_path/'fig.png')
+    assert not cache.render(output,writeFigure,values)
+    os.remove(output)
+    assert cache.render(output,writeFigure,values)
+    assert os.path.getsize(output) > 0
+    # other array content, parameter or format
+    assert not cache.render(output,writeFigure,values+1)
+    assert not cache.render(output,writeFigure,values,scale=2.)
+    assert not cache.render(str(tmp_path/'fig.pdf'),writeFigure,values)
+    assert cache.stats == {'hits':1,'misses':4,'evictions':0}
+
+
+def test_keys_by_content():
+    a = np.arange(10.)
+    assert hashInputs(a) == hashInputs(a.copy())
+    assert hashInputs(a) != hashInputs(a.astype(np.float32))
+    assert hashInputs(a) != hashInputs(a.reshape(2,5))
+    assert hashInputs(RankAxis.grid(0,99.9)) == hashInputs(RankAxis(k=RankAxis.grid(0,99.9).k))
+    assert hashInputs({'a':1,'b':2}) == hashInputs({'b':2,'a':1})
+    assert hashInputs(LogNorm(1,10)) == hashInputs(LogNorm(1,10))
+    assert hashInputs(LogNorm(1,10)) != hashInputs(LogNorm(1,100))
+    cycle = []
+    cycle.append(cycle)
+    hashInputs(cycle)
+
+
+def test_function_code_in_key():
+    def f(x):
+        return x+1
+    key = hashInputs(f)
+
+    def f(x):
+        return x+2
+    assert hashInputs(f) != key
+
+    def g(y):
+        return y*scale
+    scale = 1
+    key = hashInputs(g)
+    scale = 2
+    assert hashInputs(g) != key
+
+
+def test_key_stable_across_processes():
+    code = ('import sys; sys.path.insert(0,%r); import numpy as np; from renderCache import hashInputs; '
+            'print(hashInputs({"x":np.arange(3.),"s":{"a","b","c"}},"png"))'%os.path.dirname(renderCache.__file__))
+    keys = {subprocess.run([sys.executable,'-c',code],capture_output=True,text=True,check=True,
+                           env=dict(os.environ,PYTHONHASHSEED=str(seed))).stdout for seed in [1,2]}
+    assert len(keys) == 1
+
+
+def test_lru_eviction(tmp_path):
+    cache = RenderCache(str(tmp_path/'cache'),maxbytes=2500)
+    sources = []
+    for i in range(4):
+        source = tmp_path/('f%d.bin'%i)
+        source.write_bytes(bytes(1000))
+        sources.append(str(source))
+        cache.store('%040x'%i,sources[-1])
+        # distinct last-use times
+        os.utime(cache._file('%040x'%i,'.bin'),(i,i))
+    cache.evict()
+    assert cache.size() <= 2500
+    assert not cache.fetch('%040x'%0,str(tmp_path/'out.bin'))
+    assert cache.fetch('%040x'%3,str(tmp_path/'out.bin'))
+    assert cache.stats['evictions'] >= 2
@@ -0,0 +1,128 @@
+"""Background saving of figures with SavePipeline (user-025)"""
+
+import gc
+import time
+import weakref
+import threading
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+from matplotlib.figure import Figure
+
+from savePipeline import SavePipeline
+
+
+def newFigure(i=0):
+    fig, ax = plt.subplots(figsize=(2,2),dpi=30)
+    ax.plot(np.arange(10)*i)
+    return fig
+
+
+@pytest.mark.parametrize('processes',[False,True])
+def test_all_figures_written_and_closed(tmp_path, processes):
+    with SavePipeline(workers=2,processes=processes,dpi=30) as pipeline:
+        for i in range(6):
+            pipeline.submit(newFigure(i),str(tmp_path/('fig%d.png'%i)))
+    assert pipeline.count == 6
+    for i in range(6):
+        assert (tmp_path/('fig%d.png'%i)).read_bytes()[:4] == b'\x89PNG'
+    assert plt.get_fignums() == []
+
+
+def test_backpressure(tmp_path, monkeypatch):
+    import savePipeline
+    release = threading.Event()
+    in_flight = []
+    save = savePipeline._saveFigure
+
+    def slowSave(fig, fname, kwargs):
+        in_flight.append(fname)
+        release.wait(5)
+        return save(fig,fname,kwargs)
+
+    monkeypatch.setattr(savePipeline,'_saveFigure',slowSave)
+    pipeline = SavePipeline(workers=1,maxpending=2)
+    pipeline.submit(newFigure(),str(tmp_path/'a.png'))
+    pipeline.submit(newFigure(),str(tmp_path/'b.png'))
+    assert pipeline.pending == 2
+    blocked = threading.Thread(target=pipeline.submit,args=(newFigure(),str(tmp_path/'c.png')))
+    blocked.start()
+    blocked.join(0.2)
+    # third submit waits for a free slot
+    assert blocked.is_alive()
+    release.set()
+    blocked.join(5)
+    pipeline.shutdown()
+    assert pipeline.count == 3 and len(in_flight) == 3
+    plt.close('all')
+
+
+def test_errors_raised_on_flush(tmp_path):
+    pipeline = SavePipeline(workers=1)
+    pipeline.submit(newFigure(),str(tmp_path/'missing'/'fig.png'))
+    pipeline.submit(newFigure(),str(tmp_path/'fig.png'))
+    with pytest.raises(FileNotFoundError):
+        pipeline.flush()
+    assert pipeline.count == 1
+    pipeline.shutdown()
+    assert plt.get_fignums() == []
+
+
+def test_block_error_not_masked(tmp_path):
+    with pytest.raises(KeyError):
+        with SavePipeline(workers=1) as pipeline:
+            pipeline.submit(newFigure(),str(tmp_path/'missing'/'fig.png'))
+            raise KeyError('in block')
+    assert plt.get_fignums() == []
+
+
+def test_figures_without_pyplot(tmp_path):
+    fig = Figure(figsize=(2,2),dpi=30)
+    fig.add_subplot().plot([0,1])
+    with SavePipeline(workers=1) as pipeline:
+        pipeline.submit(fig,str(tmp_path/'fig.pdf'))
+    assert (tmp_path/'fig.pdf').read_bytes()[:4] == b'%PDF'
+
+
+def waitCollected(refs, timeout=5):
+    """Number of referents still alive, after waiting for them to be collected"""
+
+    deadline = time.monotonic()+timeout
+    while True:
+        gc.collect()
+        alive = sum(ref() is not None for ref in refs)
+        if alive == 0 or time.monotonic() > deadline:
+            return alive
+        time.sleep(0.01)
+
+
+def test_written_figures_released(tmp_path):
+    pipeline = SavePipeline(workers=2)
+    refs, futures = [], []
+    for i in range(20):
+        fig = newFigure(i)
+        refs.append(weakref.ref(fig))
+        futures.append(pipeline.submit(fig,str(tmp_path/('fig%d.png'%i))))
+    del fig
+    for future in futures:
+        future.result()
+    # written figures are closed and dropped in the next submit, before any flush
+    pipeline.submit(newFigure(),str(tmp_path/'last.png'))
+    assert waitCollected(refs) == 0
+    pipeline.shutdown()
+    assert pipeline.count == 21
+
+
+def test_written_figures_released_without_close(tmp_path):
+    pipeline = SavePipeline(workers=1,close=False)
+    refs = []
+    for i in range(10):
+        fig = Figure(figsize=(2,2),dpi=30)
+        fig.add_subplot().plot([0,i])
+        refs.append(weakref.ref(fig))
+        future = pipeline.submit(fig,str(tmp_path/('fig%d.png'%i)))
+    del fig
+    future.result()
+    assert waitCollected(refs) == 0
+    pipeline.shutdown()
@@ -0,0 +1,77 @@
+"""Inverse-log axis scale and frames of plot1D (user-001)"""
+
+import os
+import sys
+import subprocess
+
+import numpy as np
+import pytest
+from matplotlib.figure import Figure
+
+import plot1D
+from scaleInvLog import InvLogScale,InvLogTransform,InvLogLocator,InvLogFormatter
+
+
+def newAxes():
+    fig = Figure(figsize=(6,4.5))
+    return fig, fig.add_subplot()
+
+
+def test_transform_round_trip():
+    ranks = np.array([0,50,90,99,99.9,99.999])
+    k = InvLogTransform().transform_non_affine(ranks)
+    np.testing.assert_allclose(k,-np.log10(1-ranks/100))
+    np.testing.assert_allclose(InvLogTransform().inverted().transform_non_affine(k),ranks)
+
+
+def test_locator_decades():
+    ticks = InvLogLocator().tick_values(0,99.99)
+    np.testing.assert_allclose(ticks,[0,90,99,99.9,99.99])
+
+
+def test_locator_returns_writable_copy():
+    ticks = InvLogLocator().tick_values(0,99.9)
+    ticks[0] = -1
+    assert InvLogLocator().tick_values(0,99.9)[0] == 0
+
+
+def test_formatter_labels_decades_only():
+    formatter = InvLogFormatter()
+    assert formatter(99.9) != ''
+    assert formatter(95) == ''
+
+
+@pytest.mark.parametrize('axisIL',['x','y'])
+def test_setFrame_single_axes(axisIL):
+    fig, ax = newAxes()
+    plot1D.setFrame(ax,rankmin=0,rankmax=99.99,axisIL=axisIL)
+    axis = ax.xaxis if axisIL == 'x' else ax.yaxis
+    assert axis.get_scale() == 'invlog'
+    lim = ax.get_xlim() if axisIL == 'x' else ax.get_ylim()
+    np.testing.assert_allclose(lim,(0,99.99))
+    assert len(fig.axes) == 1
+
+
+def test_showData_shares_frame_axes():
+    fig, ax = newAxes()
+    ranks = 100*(1-np.logspace(0,-4,201))
+    plot1D.setFrame(ax,rankmin=0,rankmax=99.99)
+    h = plot1D.showData(ax,ranks,np.arange(201.))
+    assert h[0].axes is ax
+    fig.canvas.draw()
+    # curve drawn at k = -log10(1-r/100), linear in display coordinates
+    xy = ax.transData.transform(np.column_stack([ranks[[0,100,200]],[0,0,0]]))
+    np.testing.assert_allclose(xy[1,0]-xy[0,0],xy[2,0]-xy[1,0],rtol=1e-6)
+
+
+def test_scale_registered_without_warning():
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),'src')
+    subprocess.run([sys.executable,'-W','error','-c','import plot1D, plot2D'],cwd=src,check=True)
+
+
+def test_scale_with_and_without_axis():
+    ax = Figure().add_subplot()
+    ax.set_yscale('invlog',mindigits=2)
+    assert ax.yaxis.get_major_formatter().mindigits == 2
+    # signature of matplotlib < 3.11
+    assert InvLogScale(ax.yaxis,subs=[2]).subs == [2]
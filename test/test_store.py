@@ -0,0 +1,77 @@
+"""Memory-mapped store of precomputed distributions (user-016)"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+from matplotlib.figure import Figure
+
+import plot1D
+from store import DistributionStore,isEntry,openEntry
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DistributionStore(str(tmp_path/'dists'))
+
+
+def test_round_trip(store):
+    ranks = np.linspace(0,99.9,50)
+    percentiles = np.random.default_rng(0).random((3,50))
+    store.savePercentiles('pr',ranks,percentiles,units='mm/day')
+    counts = np.arange(12).reshape(3,4)
+    store.saveJointHistogram('pr_crh',counts,np.arange(4.),np.arange(3.))
+
+    reopened = DistributionStore(store.path)
+    assert sorted(reopened.keys()) == ['pr','pr_crh']
+    entry = reopened['pr']
+    assert isEntry(entry,'percentiles') and entry.attrs == {'units':'mm/day'}
+    assert isinstance(entry['percentiles'],np.memmap)
+    np.testing.assert_array_equal(entry.ranks,ranks)
+    np.testing.assert_array_equal(entry['percentiles'],percentiles)
+    assert 'density' not in reopened['pr_crh'] and reopened['pr_crh'].get('density') is None
+    np.testing.assert_array_equal(openEntry(store.path+':pr_crh')['counts'],counts)
+
+
+def test_invalid_entries(store):
+    with pytest.raises(ValueError):
+        store.savePercentiles('pr',np.arange(3.),None)
+    with pytest.raises(ValueError):
+        store.save('pr','ranks',{'ranks':np.arange(3.),'other':np.arange(3.)})
+    with pytest.raises(KeyError):
+        store['missing']
+
+
+def test_replace_entry(store):
+    old = store.saveRankGrid('grid',np.arange(3.))
+    old_ranks = old['ranks']
+    files = set(os.listdir(store.path))
+    new = store.saveRankGrid('grid',np.arange(5.))
+    assert new is not old and new['ranks'].size == 5
+    # already loaded arrays stay valid, files of the old entry are removed
+    np.testing.assert_array_equal(old_ranks,np.arange(3.))
+    assert set(old.files.values()) & set(os.listdir(store.path)) == set()
+    assert len(set(os.listdir(store.path))-files) == 1
+
+
+def _saveEntry(args):
+    path, i = args
+    DistributionStore(path).saveRankGrid('grid%d'%i,np.arange(i+1.))
+
+
+def test_concurrent_writers_keep_all_entries(store):
+    with ProcessPoolExecutor(4) as executor:
+        list(executor.map(_saveEntry,[(store.path,i) for i in range(16)]))
+    assert sorted(store.keys()) == sorted('grid%d'%i for i in range(16))
+    for i in range(16):
+        assert store['grid%d'%i]['ranks'].size == i+1
+
+
+def test_entry_plotted_directly(store):
+    ranks = 100*(1-np.logspace(0,-3,20))
+    store.savePercentiles('pr',ranks,np.stack([ranks,2*ranks]))
+    ax = Figure().add_subplot()
+    _, h = plot1D.subplotRanksILog(ax,store['pr'],rankmax=99.9)
+    assert len(h) == 2
+    np.testing.assert_array_equal(h[1][0].get_ydata(),2*ranks)